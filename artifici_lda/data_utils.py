@@ -1,4 +1,6 @@
 import copy
+import heapq
+from itertools import islice
 
 import numpy as np
 
@@ -11,10 +13,97 @@ def get_top_comments(comments, transformed_comments):
     :return: a list of the #1 top comment for each topic.
     """
     top_comments_idx = transformed_comments.argmax(0)  # top probability's index for each topic
-    top_comments_strings = np.array(comments)[top_comments_idx].tolist()
+    # The comments are indexed as a list: an array of them would be a copy as wide as the longest comment.
+    top_comments_strings = [comments[i] for i in top_comments_idx]
     return top_comments_strings
 
 
+def get_top_k_comments(comments, transformed_comments, k):
+    """
+    Get the k most representative comments of each topic.
+
+    :param comments: a list of comments.
+    :param transformed_comments: the topic probabilities of the comments, of shape [comments, topics].
+    :param k: the number of comments to get per topic.
+    :return: a list of the top k comments for each topic (or of all the comments if there are fewer than k), sorted by
+        decreasing probability. Equal probabilities are sorted by the order of the comments.
+    """
+    return [[comments[i] for i in top_comments_idx]
+            for top_comments_idx in _get_top_k_comments_indices(np.asarray(transformed_comments), k)]
+
+
+class TopCommentsAccumulator(object):
+    """
+    Keep the k most representative comments of each topic while the topic probabilities of the comments arrive in
+    chunks (such as the batches of a stream), with a memory bounded by k * topics comments.
+
+        accumulator = TopCommentsAccumulator(n_topics, k)
+        for comments_chunk, transformed_chunk in chunks:
+            accumulator.update(comments_chunk, transformed_chunk)
+        top_comments = accumulator.get_top_comments()
+
+    The result is the same as `get_top_k_comments` on all the chunks concatenated.
+    """
+
+    def __init__(self, n_topics, k=1):
+        """
+        :param n_topics: the number of topics.
+        :param k: the number of comments to keep per topic.
+        """
+        self.n_topics = n_topics
+        self.k = k
+
+        self.n_comments_seen = 0
+        # A min-heap per topic of (probability, -comment_index, comment): its root is the least representative comment.
+        self._heaps = [[] for _ in range(n_topics)]
+
+    def update(self, comments, transformed_comments):
+        """
+        :param comments: a chunk of comments.
+        :param transformed_comments: the topic probabilities of the comments of the chunk, of shape [comments, topics].
+        :return: self
+        """
+        transformed_comments = np.asarray(transformed_comments)
+        top_comments_indices = _get_top_k_comments_indices(transformed_comments, self.k)
+        for topic, (heap, top_comments_idx) in enumerate(zip(self._heaps, top_comments_indices)):
+            for i in top_comments_idx.tolist():
+                item = (float(transformed_comments[i, topic]), -(self.n_comments_seen + i), comments[i])
+                if len(heap) < self.k:
+                    heapq.heappush(heap, item)
+                elif item[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, item)
+                else:
+                    # The chunk's next comments are even less representative of this topic.
+                    break
+        self.n_comments_seen += len(comments)
+        return self
+
+    def get_top_comments(self):
+        """
+        :return: a list of the top k comments seen for each topic, sorted by decreasing probability.
+        """
+        return [[comment for _, _, comment in sorted(heap, reverse=True)] for heap in self._heaps]
+
+
+def _get_top_k_comments_indices(transformed_comments, k):
+    # For each topic, the indexes of its top k comments by decreasing probability, the first ones winning the ties.
+    n_comments, n_topics = transformed_comments.shape
+    k = min(k, n_comments)
+    if k == 0:
+        return [np.zeros(0, dtype=np.intp) for _ in range(n_topics)]
+
+    kth_comments_idx = np.argpartition(-transformed_comments, k - 1, axis=0)[k - 1]
+    kth_probabilities = transformed_comments[kth_comments_idx, np.arange(n_topics)]
+    top_comments_indices = []
+    for topic in range(n_topics):
+        probabilities = transformed_comments[:, topic]
+        above_idx = np.flatnonzero(probabilities > kth_probabilities[topic])
+        tied_idx = np.flatnonzero(probabilities == kth_probabilities[topic])[:k - len(above_idx)]
+        idx = np.concatenate([above_idx, tied_idx])
+        top_comments_indices.append(idx[np.lexsort((idx, -probabilities[idx]))])
+    return top_comments_indices
+
+
 def split_1_grams_from_n_grams(topics_weightings):
     """
     Pair every words with their weightings for topics into dicts, for each topic.
@@ -76,7 +165,8 @@ def get_params_from_prefix_dict(param_prefix, lda_pipeline_params):
 
 
 def get_lda_params_with_specific_n_cluster_or_language(lda_pipeline_params,
-                                                       n_topics=None, language=None, stopwords=None):
+                                                       n_topics=None, language=None, stopwords=None, dtype=None,
+                                                       early_stopping=None):
     lda_pipeline_params = copy.copy(lda_pipeline_params)
     if n_topics is not None:
         assert 'lda__n_components' in list(lda_pipeline_params.keys())
@@ -87,6 +177,12 @@ def get_lda_params_with_specific_n_cluster_or_language(lda_pipeline_params,
     if stopwords is not None:
         assert 'stopwords__stopwords' in list(lda_pipeline_params.keys())
         lda_pipeline_params['stopwords__stopwords'] = stopwords
+    if dtype is not None:
+        assert 'count_vect__dtype' in list(lda_pipeline_params.keys())
+        lda_pipeline_params['count_vect__dtype'] = dtype
+    if early_stopping is not None:
+        assert 'lda__early_stopping' in list(lda_pipeline_params.keys())
+        lda_pipeline_params['lda__early_stopping'] = early_stopping
     return lda_pipeline_params
 
 
@@ -94,4 +190,56 @@ def get_word_weightings(lda_pipeline):
     lda = lda_pipeline.named_steps['lda']
     topics = lda.components_
     topic_words_weighting = [list(reversed(sorted(t))) for t in topics]
-    return topic_words_weighting
\ No newline at end of file
+    return topic_words_weighting
+
+
+def get_topics_top_words(lda_pipeline):
+    """
+    Get the top words of every topic along with their weightings, without sorting the whole vocabulary of the topics.
+
+    :param lda_pipeline: a fitted pipeline that ends with an 'lda' step.
+    :return: the words (a 2D list of shape [topics, top_words]) and their weightings (a 2D array of the same shape),
+        aligned such that they can be given as-is to `link_topics_and_weightings`.
+    """
+    lda = lda_pipeline.named_steps['lda']
+    top_words_ids, top_words_weightings = lda.get_top_words()
+    topic_words = lda_pipeline[:-1].inverse_transform(top_words_ids)
+    return topic_words, top_words_weightings
+
+
+def iter_batches(iterable, batch_size):
+    """
+    Split an iterable (such as a generator) into lists of at most batch_size items, consuming it lazily.
+
+    :param iterable: an iterable, such as a list or a generator.
+    :param batch_size: the maximum number of items per batch.
+    :return: a generator of lists.
+    """
+    iterator = iter(iterable)
+    batch = list(islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, batch_size))
+
+
+def deduplicate_comments(comments):
+    """
+    Find the distinct comments, up to their case and their spaces: "Merci !" and "  merci ! " are duplicates.
+
+    :param comments: a list of comments.
+    :return: the distinct comments (each one as it first appears, in the order of their first appearance), and an
+        array of the index in those distinct comments of each of the comments, such that
+        `[distinct_comments[i] for i in inverse_indexes]` gives back the comments, up to their case and their spaces.
+    """
+    distinct_comments = []
+    normalized_comment_to_index = dict()
+    inverse_indexes = np.empty(len(comments), dtype=np.intp)
+    for i, comment in enumerate(comments):
+        normalized_comment = " ".join(comment.split()).casefold()
+        index = normalized_comment_to_index.get(normalized_comment)
+        if index is None:
+            index = len(distinct_comments)
+            normalized_comment_to_index[normalized_comment] = index
+            distinct_comments.append(comment)
+        inverse_indexes[i] = index
+    return distinct_comments, inverse_indexes
@@ -0,0 +1,293 @@
+"""
+Score comments against a pipeline on words saved with `artifici_lda.persistence.save_lda_pipeline`, with NumPy and
+the stemmer only: neither scikit-learn nor the training code is imported, so that short-lived processes (such as
+command lines or serverless functions) that only transform comments start quickly.
+
+    model = InferenceModel.load("path/to/saved/pipeline")
+    transformed_comments = model.transform(["Les chats sont ronrons", "Un super-chien aboie"])
+
+The comments go through the same steps as in the saved pipeline: the stop words removal, the stemming, and the
+counting of the n-grams of the vocabulary. Their topic probabilities then come from the same E-step as the one of
+the LDA's `transform`, so they are the ones of `load_lda_pipeline(directory).transform(comments)` up to the floating
+point rounding.
+
+Run with: `python -m artifici_lda.inference path/to/saved/pipeline "Les chats sont ronrons" "Un super-chien aboie"`
+(or with the comments on the standard input, one per line), which prints the topic probabilities of each comment.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+
+import numpy as np
+
+from artifici_lda.logic.language_detection import AUTO, detect_language
+from artifici_lda.logic.stemming import FRENCH, ENGLISH, split_words, stem_word
+from artifici_lda.logic.stop_words_engine import CompiledStopWords
+from artifici_lda.persistence import EXP_DIRICHLET_COMPONENT_FILENAME, VOCABULARY_NAME, load_metadata, load_strings
+
+# The classes of the steps of the pipelines on words, see `artifici_lda.lda_service._create_lda_pipeline_on_words`.
+STOPWORDS_CLASSES = ('StopWordsRemover', 'LanguageDetectingStopWordsRemover')
+STEMMER_CLASSES = ('Stemmer', 'LanguageRoutingStemmer')
+COUNT_VECT_CLASS = 'CountVectorizer'
+LDA_CLASS = 'LDA'
+
+# The smallest argument of the asymptotic series of the digamma function, see `digamma`.
+_DIGAMMA_SERIES_MIN = 6.0
+
+
+class InferenceModel(object):
+    def __init__(self, stopwords, language, languages, analyzer_params, vocabulary, exp_dirichlet_component,
+                 doc_topic_prior, max_doc_update_iter=100, mean_change_tol=1e-3):
+        """
+        A fitted pipeline on words, reduced to what's needed to transform comments. See `InferenceModel.load`.
+
+        :param stopwords: a list of stop words.
+        :param language: the stemmer's language, or `AUTO` to detect the language of each comment among `languages`.
+        :param languages: the languages that can be detected when the language is `AUTO`, the first one being the
+            fallback.
+        :param analyzer_params: a dict of the CountVectorizer's parameters that split a stemmed comment into n-grams:
+            'lowercase', 'strip_accents', 'token_pattern', 'ngram_range', 'stop_words' and 'binary'.
+        :param vocabulary: a list of the n-grams, ordered by feature index.
+        :param exp_dirichlet_component: the LDA's `exp_dirichlet_component_`, of shape [n_topics, n_features].
+        :param doc_topic_prior: the LDA's `doc_topic_prior_`.
+        :param max_doc_update_iter: the LDA's maximal number of iterations of the E-step.
+        :param mean_change_tol: the LDA's tolerance of the E-step's convergence.
+        """
+        self.stopwords = stopwords
+        self.language = language
+        self.languages = languages
+        self.analyzer_params = analyzer_params
+        self.vocabulary = vocabulary
+        self.exp_dirichlet_component = exp_dirichlet_component
+        self.doc_topic_prior = doc_topic_prior
+        self.max_doc_update_iter = max_doc_update_iter
+        self.mean_change_tol = mean_change_tol
+
+        self.safe_stopwords = CompiledStopWords(stopwords)
+        self.vocabulary_ids = {term: i for i, term in enumerate(vocabulary)}
+        self.analyze = build_analyzer(**analyzer_params)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Load a pipeline on words saved with `save_lda_pipeline`, without loading its inverse stemming.
+
+        :param directory: the directory where the pipeline was saved.
+        :param mmap_mode: the `numpy.load` memory-map mode of the LDA's array. The default 'r' maps it read-only.
+        :return: an InferenceModel.
+        """
+        steps = load_metadata(directory)['steps']
+        classes = [step['class'] for step in steps]
+        if len(steps) != 4 or classes[0] not in STOPWORDS_CLASSES or classes[1] not in STEMMER_CLASSES or \
+                classes[2] != COUNT_VECT_CLASS or classes[3] != LDA_CLASS:
+            raise ValueError("Only the pipelines on words can be loaded for inference, not a pipeline of: {}.".format(
+                ", ".join(classes)))
+        stopwords_step, stemmer_step, count_vect_step, lda_step = steps
+
+        count_vect_params = count_vect_step['params']
+        if count_vect_params.get('analyzer', 'word') != 'word':
+            raise ValueError("Unsupported CountVectorizer analyzer for inference: {}.".format(
+                count_vect_params['analyzer']))
+        analyzer_params = {
+            'lowercase': count_vect_params.get('lowercase', True),
+            'strip_accents': count_vect_params.get('strip_accents'),
+            'token_pattern': count_vect_params.get('token_pattern', r"(?u)\b\w\w+\b"),
+            'ngram_range': tuple(count_vect_params.get('ngram_range', (1, 1))),
+            'stop_words': count_vect_params.get('stop_words'),
+            'binary': count_vect_params.get('binary', False),
+        }
+
+        stemmer_params = stemmer_step['params']
+        return cls(
+            stopwords=stopwords_step['stopwords'],
+            language=stemmer_params.get('language', FRENCH),
+            languages=tuple(stemmer_params.get('languages', (FRENCH, ENGLISH))),
+            analyzer_params=analyzer_params,
+            vocabulary=load_strings(directory, VOCABULARY_NAME),
+            exp_dirichlet_component=np.load(
+                os.path.join(directory, EXP_DIRICHLET_COMPONENT_FILENAME), mmap_mode=mmap_mode),
+            doc_topic_prior=lda_step['fitted']['doc_topic_prior_'],
+            max_doc_update_iter=lda_step['params'].get('max_doc_update_iter', 100),
+            mean_change_tol=lda_step['params'].get('mean_change_tol', 1e-3),
+        )
+
+    def preprocess(self, comments):
+        """
+        Remove the stop words of the comments then stem them, like the 'stopwords' and 'stemmer' steps do.
+
+        :param comments: a list of strings.
+        :return: the list of the stemmed comments.
+        """
+        stemmed_comments = []
+        for comment in comments:
+            cleaned_comment = self.safe_stopwords.remove_from_string(comment)
+            language = self.language
+            if language == AUTO:
+                # Detected before the stop words removal, like the `LanguageDetectingStopWordsRemover` does.
+                language = detect_language(comment, self.languages)
+            stemmed_comments.append(" ".join([stem_word(language, word) for word in split_words(cleaned_comment)]))
+        return stemmed_comments
+
+    def vectorize(self, stemmed_comments):
+        """
+        Count the n-grams of the vocabulary in the stemmed comments, like the 'count_vect' step does.
+
+        :param stemmed_comments: a list of strings, as returned by `preprocess`.
+        :return: the document-term matrix in the coordinate format: three aligned arrays of the comments' indexes,
+            of the n-grams' feature indexes and of their counts, sorted by comment.
+        """
+        vocabulary_ids = self.vocabulary_ids
+        doc_ids, word_ids, counts = [], [], []
+        for i, stemmed_comment in enumerate(stemmed_comments):
+            word_counts = dict()
+            for feature in self.analyze(stemmed_comment):
+                word_id = vocabulary_ids.get(feature)
+                if word_id is not None:
+                    word_counts[word_id] = word_counts.get(word_id, 0) + 1
+            doc_ids.extend([i] * len(word_counts))
+            word_ids.extend(word_counts.keys())
+            counts.extend(word_counts.values())
+        counts = np.array(counts, dtype=self.exp_dirichlet_component.dtype)
+        if self.analyzer_params['binary']:
+            counts = np.minimum(counts, 1)
+        return np.array(doc_ids, dtype=np.intp), np.array(word_ids, dtype=np.intp), counts
+
+    def transform(self, comments):
+        """
+        :param comments: a list of strings.
+        :return: an array of the topic probabilities of each comment, of shape [n_comments, n_topics].
+        """
+        comments = list(comments)
+        doc_ids, word_ids, counts = self.vectorize(self.preprocess(comments))
+        doc_topic = self._e_step(doc_ids, word_ids, counts, len(comments))
+        return doc_topic / doc_topic.sum(axis=1, keepdims=True)
+
+    def _e_step(self, doc_ids, word_ids, counts, n_documents):
+        # The E-step of scikit-learn's LatentDirichletAllocation (from a uniform doc-topic distribution), on every
+        # document at once: the non-zero counts are grouped by document with `np.bincount`, and the documents leave the
+        # iterations as soon as they converge, like each document does in the original loop.
+        dtype = self.exp_dirichlet_component.dtype
+        eps = np.finfo(dtype).eps
+        n_topics = self.exp_dirichlet_component.shape[0]
+        doc_topic = np.ones((n_documents, n_topics), dtype=dtype)
+        exp_doc_topic = _exp_dirichlet_expectation(doc_topic)
+        word_topic = np.asarray(self.exp_dirichlet_component).T[word_ids]
+
+        # The documents that didn't converge yet, and their non-zero counts' (local) document indexes.
+        documents = np.arange(n_documents)
+        local_doc_ids = doc_ids
+        for _ in range(self.max_doc_update_iter):
+            if len(documents) == 0:
+                break
+            n_active = len(documents)
+            last_doc_topic = doc_topic[documents]
+            norm_phi = np.einsum('ij,ij->i', exp_doc_topic[local_doc_ids], word_topic) + eps
+            weighted_word_topic = word_topic * (counts / norm_phi)[:, np.newaxis]
+            sums = np.empty((n_active, n_topics), dtype=dtype)
+            for topic in range(n_topics):
+                sums[:, topic] = np.bincount(local_doc_ids, weights=weighted_word_topic[:, topic], minlength=n_active)
+            new_doc_topic = exp_doc_topic * sums + self.doc_topic_prior
+            doc_topic[documents] = new_doc_topic
+            exp_doc_topic = _exp_dirichlet_expectation(new_doc_topic)
+
+            not_converged = np.abs(new_doc_topic - last_doc_topic).mean(axis=1) >= self.mean_change_tol
+            if not not_converged.all():
+                kept_entries = not_converged[local_doc_ids]
+                local_doc_ids = (np.cumsum(not_converged) - 1)[local_doc_ids[kept_entries]]
+                word_topic = word_topic[kept_entries]
+                counts = counts[kept_entries]
+                documents = documents[not_converged]
+                exp_doc_topic = exp_doc_topic[not_converged]
+        return doc_topic
+
+
+def build_analyzer(lowercase=True, strip_accents=None, token_pattern=r"(?u)\b\w\w+\b", ngram_range=(1, 1),
+                   stop_words=None, binary=False):
+    """
+    Build the function that splits a document into its n-grams of words, like scikit-learn's CountVectorizer does
+    with `analyzer='word'` and the same parameters.
+
+    :return: a callable taking a string and returning the list of its n-grams.
+    """
+    if strip_accents not in (None, 'ascii', 'unicode'):
+        raise ValueError("Unsupported strip_accents for inference: {}.".format(strip_accents))
+    if isinstance(stop_words, str):
+        raise ValueError("Unsupported built-in stop_words list for inference: {}.".format(stop_words))
+    token_pattern = re.compile(token_pattern)
+    stop_words = frozenset(stop_words) if stop_words else None
+    min_n, max_n = ngram_range
+
+    def analyze(doc):
+        if lowercase:
+            doc = doc.lower()
+        if strip_accents == 'unicode':
+            doc = _strip_accents_unicode(doc)
+        elif strip_accents == 'ascii':
+            doc = unicodedata.normalize('NFKD', doc).encode('ASCII', 'ignore').decode('ASCII')
+        tokens = token_pattern.findall(doc)
+        if stop_words is not None:
+            tokens = [token for token in tokens if token not in stop_words]
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+    return analyze
+
+
+def digamma(x):
+    """
+    The digamma function (the derivative of the logarithm of the gamma function) of positive numbers, with NumPy only.
+
+    The small numbers are shifted up with the recurrence psi(x) = psi(x + 1) - 1 / x, then the asymptotic series gives
+    the digamma of the numbers of at least `_DIGAMMA_SERIES_MIN`, with an absolute error below 1e-11.
+
+    :param x: an array of positive numbers.
+    :return: an array of the digamma of each number, of the same shape and type.
+    """
+    x = np.array(x, dtype=np.float64)
+    result = np.zeros_like(x)
+    small = x < _DIGAMMA_SERIES_MIN
+    while small.any():
+        result[small] -= 1.0 / x[small]
+        x[small] += 1.0
+        small = x < _DIGAMMA_SERIES_MIN
+    inverse_square = 1.0 / (x * x)
+    result += np.log(x) - 0.5 / x - inverse_square * (
+        1.0 / 12 - inverse_square * (1.0 / 120 - inverse_square * (1.0 / 252 - inverse_square * (
+            1.0 / 240 - inverse_square * (1.0 / 132)))))
+    return result
+
+
+def _exp_dirichlet_expectation(alpha):
+    # exp(E[log(theta)]) of each row of a Dirichlet's parameters, like sklearn's `_dirichlet_expectation_2d`.
+    return np.exp(digamma(alpha) - digamma(alpha.sum(axis=1))[:, np.newaxis]).astype(alpha.dtype, copy=False)
+
+
+def _strip_accents_unicode(doc):
+    try:
+        doc.encode('ASCII', errors='strict')
+        return doc
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize('NFKD', doc)
+        return ''.join([char for char in normalized if not unicodedata.combining(char)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="the directory of a pipeline on words saved with save_lda_pipeline.")
+    parser.add_argument("comments", nargs="*", help="the comments, else they are read from the standard input.")
+    args = parser.parse_args(argv)
+
+    comments = args.comments or [line.rstrip("\n") for line in sys.stdin]
+    model = InferenceModel.load(args.directory)
+    for topics in model.transform(comments).tolist():
+        print(json.dumps(topics))
+
+
+if __name__ == "__main__":
+    main()
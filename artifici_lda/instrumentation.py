@@ -0,0 +1,91 @@
+"""
+Opt-in instrumentation of the pipelines' steps: their timing, memory and data sizes.
+
+Nothing of this is run unless a `stats_callback` is given to the training functions of `lda_service`, such as:
+
+    stats = []
+    train_lda_pipeline_on_words(comments, stats_callback=stats.append)
+    for stage_stats in stats:
+        print(stage_stats)
+"""
+
+from collections import namedtuple
+import time
+import tracemalloc
+
+import numpy as np
+import scipy.sparse as sp
+
+StageStats = namedtuple('StageStats', [
+    'name',  # the name of the pipeline's step, such as 'stemmer'.
+    'wall_time',  # in seconds.
+    'cpu_time',  # in seconds, of the current process only (not of the processes of a pool).
+    'input_size',  # see `get_data_size`.
+    'output_size',  # see `get_data_size`.
+    'peak_memory',  # in bytes, the peak of the memory allocated during the step on top of what was allocated before,
+                    # or None if the caller was already tracing the memory (see `measure_stage`).
+    'n_iter',  # the number of iterations the step actually ran (such as the LDA's `n_iter_`), or None.
+])
+
+
+def measure_stage(name, function, data, get_size=None):
+    """
+    Call `function(data)` while measuring it.
+
+    The peak memory is traced with `tracemalloc`, which slows down the allocations of Python objects: the timings are
+    thus a bit pessimistic for the steps that allocate many small objects, such as the stemming.
+
+    If the caller is already tracing the memory, its peak isn't reset, so as not to disturb the caller's own measures
+    (`tracemalloc` can't restore a peak once reset). The peak of the stage can't then be told apart from a peak that
+    predates it, so the peak memory is None.
+
+    :param name: the name of the stage.
+    :param function: a callable taking data.
+    :param data: the input of the stage.
+    :param get_size: the function measuring the size of the input and of the output. If None, it's `get_data_size`.
+    :return: the result of `function(data)`, and its StageStats (whose n_iter is None).
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+        memory_before, _ = tracemalloc.get_traced_memory()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        result = function(data)
+    finally:
+        cpu_time = time.process_time() - cpu_start
+        wall_time = time.perf_counter() - wall_start
+        peak_memory = None
+        if not was_tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peak_memory = max(peak - memory_before, 0)
+
+    if get_size is None:
+        get_size = get_data_size
+    stats = StageStats(
+        name=name,
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        input_size=get_size(data),
+        output_size=get_size(result),
+        peak_memory=peak_memory,
+        n_iter=None,
+    )
+    return result, stats
+
+
+def get_data_size(data):
+    """
+    Get the size of the data flowing between the pipelines' steps.
+
+    :param data: a sparse matrix, an array, or a list of strings or of lists of strings.
+    :return: the number of non-zero values of a sparse matrix, the number of values of an array, or else the total
+        number of characters of the strings.
+    """
+    if sp.issparse(data):
+        return int(data.nnz)
+    if isinstance(data, np.ndarray):
+        return int(data.size)
+    return sum(len(item) if isinstance(item, str) else get_data_size(item) for item in data)
@@ -1,12 +1,32 @@
+from contextlib import nullcontext
+import json
+import os
+import tempfile
+import time
+
+from joblib import Parallel, delayed, effective_n_jobs, parallel_backend
+import numpy as np
+
 from artifici_lda.data_utils import link_topics_and_weightings, get_top_comments, split_1_grams_from_n_grams, \
-    get_lda_params_with_specific_n_cluster_or_language, get_word_weightings
-from artifici_lda.logic.letter_splitter import LetterSplitter
-from artifici_lda.logic.stop_words_remover import StopWordsRemover
+    get_lda_params_with_specific_n_cluster_or_language, get_topics_top_words, iter_batches, deduplicate_comments, \
+    TopCommentsAccumulator
+from artifici_lda.instrumentation import get_data_size, measure_stage
+from artifici_lda.logic.doc_term_matrix import DocTermMatrixWriter, get_float_dtype, iter_row_batches, \
+    load_doc_term_matrix, save_doc_term_matrix
+from artifici_lda.logic.language_routing_stemmer import AUTO, LanguageDetectingStopWordsRemover, LanguageRoutingStemmer
+from artifici_lda.logic.letter_ngram_vectorizer import LetterNGramVectorizer
+from artifici_lda.logic.stop_words_remover import StopWordsRemover, load_default_stopwords
 from artifici_lda.logic.stemmer import Stemmer, FRENCH
-from artifici_lda.logic.lda import LDA
+from artifici_lda.logic.lda import LDA, split_validation
 from artifici_lda.logic.count_vectorizer import CountVectorizer
+from artifici_lda.logic.parallel_preprocessing import parallel_fit_transform
 
 from sklearn.pipeline import Pipeline
+from sklearn.utils import check_random_state
+from sklearn.utils.validation import has_fit_parameter
+
+WORDS = 'words'
+LETTERS = 'letters'
 
 LDA_PIPELINE_PARAMS_WORDS = {
     'stopwords__stopwords': None,
@@ -16,6 +36,7 @@ LDA_PIPELINE_PARAMS_WORDS = {
     'count_vect__max_features': 10000,
     'count_vect__ngram_range': (1, 2),
     'count_vect__strip_accents': None,
+    'count_vect__dtype': np.int64,  # Use np.float32 to halve the memory of the counts and of the LDA's statistics.
     'lda__n_components': 2,
     'lda__max_iter': 750,
     'lda__learning_decay': 0.5,
@@ -23,6 +44,7 @@ LDA_PIPELINE_PARAMS_WORDS = {
     'lda__learning_offset': 10,
     'lda__batch_size': 25,
     'lda__n_jobs': -1,  # Use all CPUs
+    'lda__early_stopping': False,  # Set to True to stop before max_iter once the topics converged.
 }
 
 LDA_PIPELINE_PARAMS_LETTERS = {
@@ -33,6 +55,7 @@ LDA_PIPELINE_PARAMS_LETTERS = {
     'count_vect__max_features': 10000,
     'count_vect__ngram_range': (1, 2),
     'count_vect__strip_accents': None,
+    'count_vect__dtype': np.int64,  # Use np.float32 to halve the memory of the counts and of the LDA's statistics.
     'lda__n_components': 2,
     'lda__max_iter': 750,
     'lda__learning_decay': 0.5,
@@ -40,28 +63,93 @@ LDA_PIPELINE_PARAMS_LETTERS = {
     'lda__learning_offset': 10,
     'lda__batch_size': 25,
     'lda__n_jobs': -1,  # Use all CPUs
+    'lda__early_stopping': False,  # Set to True to stop before max_iter once the topics converged.
 }
 
 
-def train_lda_pipeline_default(comments, n_topics=2, language=FRENCH, stopwords=None):
+def train_lda_pipeline_default(comments, n_topics=2, language=FRENCH, stopwords=None, preprocessing_n_jobs=None,
+                               mode_callback=None, prune_inverse_stemming=False, dtype=None, cache=None,
+                               early_stopping=None):
     """
     Try to train a pipeline on ngrams of words, and if it fails (because no words were found), try on ngrams of letters.
 
+    The mode is chosen with a cheap pre-flight check before any LDA iteration: the comments are cleaned from their
+    stop words, stemmed and vectorized, and only if the vocabulary of words is empty the letters are used instead. The
+    comments cleaned from their stop words are reused by the letters' pipeline rather than being cleaned again.
+
     :param comments: a list of strings
     :param n_topics: the number of clusters (categories, groups, or topics) to find.
     :param language: the language, refer to snowball lemmatizer's documentation for a list
         of languages. Example: 'french', 'english'. http://snowball.tartarus.org/texts/stemmersoverview.html
+        Use `AUTO` to detect the language of each comment among French and English instead.
+    :param preprocessing_n_jobs: if not None, the preprocessing is done on this number of processes (-1 means using
+        all CPUs) instead of on the current process only.
+    :param mode_callback: if not None, it's called with the chosen mode (`WORDS` or `LETTERS`), and with the time saved
+        (in seconds) by not cleaning the comments from their stop words a second time when falling back on letters.
+    :param prune_inverse_stemming: if True, once the vocabulary is learned, the inverse stemming is pruned to the
+        stemmed words of the vocabulary and stored compactly (see `prune_inverse_stemming_to_vocabulary`).
+    :param dtype: the type of the counts, such as `np.float32` to train the LDA and transform the comments in float32
+        from end to end, which roughly halves their memory. If None, the counts are integers and the LDA uses float64.
+    :param early_stopping: if not None, whether the LDA stops before its `max_iter` iterations once its topics
+        converged (see `artifici_lda.logic.lda.LDA`), instead of the 'lda__early_stopping' of the pipeline's params.
+    :param cache: if not None, an `artifici_lda.result_cache.ResultCache` where the results are looked up before
+        training, and stored after. The results are cached by the comments, the stop words, the language, the number
+        of topics, the dtype, the early stopping and the `LDA_PIPELINE_PARAMS_WORDS` and `LDA_PIPELINE_PARAMS_LETTERS`.
+        On a hit, the mode_callback is called with the cached mode and 0 seconds saved.
     :return: a list containing the topic probabilities for each comment, and another list containing topics if it
         trained on words, where each topic is a list of tuples, where each of those tuples are of the form
         (str('word'), float(importance_of_word)), sorted by the importance of each word (most important comes first).
     """
+    if cache is not None:
+        return _train_lda_pipeline_default_with_cache(
+            cache, comments, n_topics, language, stopwords, preprocessing_n_jobs, mode_callback, prune_inverse_stemming,
+            dtype, early_stopping)
+
+    lda_pipeline = _create_lda_pipeline_on_words(
+        n_topics=n_topics, language=language, stopwords=stopwords, dtype=dtype, early_stopping=early_stopping)
+    mode = WORDS
+    seconds_saved = 0.0
+
+    start = time.perf_counter()
+    cleaned_comments = _fit_transform_steps(lda_pipeline, comments, 0, 1, preprocessing_n_jobs)
+    cleaning_time = time.perf_counter() - start
+
+    stemmed_comments = _fit_transform_steps(lda_pipeline, cleaned_comments, 1, 2, preprocessing_n_jobs)
     try:
-        return train_lda_pipeline_on_words(comments, n_topics=n_topics, language=language, stopwords=stopwords)
-    except:
-        return train_lda_pipeline_on_letters(comments, n_topics=n_topics, stopwords=stopwords)
+        vectorized_comments = lda_pipeline.named_steps['count_vect'].fit_transform(stemmed_comments)
+    except ValueError:
+        # The vocabulary is empty: no words were found, so let's use letters.
+        stopwords_step = lda_pipeline.steps[0]
+        if isinstance(stopwords_step[1], LanguageDetectingStopWordsRemover):
+            # The letters don't need the languages.
+            stopwords_step = ('stopwords', StopWordsRemover(stopwords=stopwords_step[1].stopwords).fit())
+            cleaned_comments = [cleaned_comment for _, cleaned_comment in cleaned_comments]
+        lda_pipeline = _create_lda_pipeline_on_letters(
+            n_topics=n_topics, stopwords=stopwords, dtype=dtype, early_stopping=early_stopping)
+        lda_pipeline.steps[0] = stopwords_step
+        mode = LETTERS
+        seconds_saved = cleaning_time
+
+        n_preprocessing_steps = _get_n_preprocessing_steps(lda_pipeline)
+        preprocessed_comments = _fit_transform_steps(
+            lda_pipeline, cleaned_comments, 1, n_preprocessing_steps, preprocessing_n_jobs)
+        vectorized_comments = lda_pipeline.named_steps['count_vect'].fit_transform(preprocessed_comments)
+    # Out of the try block: a pruning error must be raised rather than taken for an empty vocabulary.
+    if mode == WORDS and prune_inverse_stemming:
+        prune_inverse_stemming_to_vocabulary(lda_pipeline)
+
+    transformed_comments = lda_pipeline.named_steps['lda'].fit_transform(vectorized_comments)
+    if mode_callback is not None:
+        mode_callback(mode, seconds_saved)
 
+    if mode == WORDS:
+        return _get_results_on_words(lda_pipeline, comments, transformed_comments)
+    return _get_results_on_letters(comments, transformed_comments)
 
-def train_lda_pipeline_on_words(comments, n_topics=2, language=FRENCH, stopwords=None):
+
+def train_lda_pipeline_on_words(comments, n_topics=2, language=FRENCH, stopwords=None, preprocessing_n_jobs=None,
+                                stats_callback=None, prune_inverse_stemming=False, dtype=None,
+                                deduplicate=False, preprocessing_cache=None, early_stopping=None):
     """
     Train an LDA and transform the comments.
 
@@ -70,36 +158,124 @@ def train_lda_pipeline_on_words(comments, n_topics=2, language=FRENCH, stopwords
     :param n_topics: the number of clusters (categories, groups, or topics) to find.
     :param language: the language, refer to snowball lemmatizer's documentation for a list
         of languages. Example: 'french', 'english'. http://snowball.tartarus.org/texts/stemmersoverview.html
+        Use `AUTO` to detect the language of each comment among French and English instead.
+    :param preprocessing_n_jobs: if not None, the stop words removal and the stemming are done on this number of
+        processes (-1 means using all CPUs) instead of on the current process only.
+    :param stats_callback: if not None, it's called with the `artifici_lda.instrumentation.StageStats` of each step
+        of the pipeline, in order, as soon as the step is fitted. Leaving it None costs nothing.
+    :param prune_inverse_stemming: if True, once the vocabulary is learned, the inverse stemming is pruned to the
+        stemmed words of the vocabulary and stored compactly (see `prune_inverse_stemming_to_vocabulary`).
+    :param dtype: the type of the counts, such as `np.float32` to train the LDA and transform the comments in float32
+        from end to end, which roughly halves their memory. If None, the counts are integers and the LDA uses float64.
+    :param early_stopping: if not None, whether the LDA stops before its `max_iter` iterations once its topics
+        converged (see `artifici_lda.logic.lda.LDA`), instead of the 'lda__early_stopping' of the pipeline's params.
+    :param deduplicate: if True, the duplicated comments (up to their case and their spaces) are preprocessed,
+        vectorized and transformed only once, and their number of duplicates is counted in the inverse stemming and in
+        the vocabulary. The results still have one row per comment.
+    :param preprocessing_cache: if not None, a `artifici_lda.preprocessing_cache.PreprocessingCache` in which the
+        cleaned and stemmed comments are looked up, so that only the comments missing from it are cleaned and stemmed
+        (on the current process, whatever preprocessing_n_jobs) then added to it. If there is a stats_callback, the
+        stop words removal and the stemming are reported as a single 'preprocessing_cache' stage.
     :return: a list containing the topic probabilities for each comment, and another list containing topics, where each
         topic is a list of tuples, where each of those tuples are of the form (str('word'), float(importance_of_word)),
         sorted by the importance of each word (most important comes first).
     """
-    params = get_lda_params_with_specific_n_cluster_or_language(
-        LDA_PIPELINE_PARAMS_WORDS, n_topics=n_topics, language=language, stopwords=stopwords)
+    lda_pipeline, transformed_comments = fit_lda_pipeline_on_words(
+        comments, n_topics=n_topics, language=language, stopwords=stopwords,
+        preprocessing_n_jobs=preprocessing_n_jobs, stats_callback=stats_callback,
+        prune_inverse_stemming=prune_inverse_stemming, dtype=dtype, deduplicate=deduplicate,
+        preprocessing_cache=preprocessing_cache, early_stopping=early_stopping)
+    return _get_results_on_words(lda_pipeline, comments, transformed_comments)
 
-    lda_pipeline = Pipeline([
-        ('stopwords', StopWordsRemover()),
-        ('stemmer', Stemmer()),
-        ('count_vect', CountVectorizer()),
-        ('lda', LDA()),
-    ]).set_params(**params)
 
-    # Fit the data
-    transformed_comments = lda_pipeline.fit_transform(comments)
-    top_comments = get_top_comments(comments, transformed_comments)
+def train_lda_pipeline_on_words_streaming(comments, n_topics=2, language=FRENCH, stopwords=None,
+                                          batch_size=1000, n_passes=None, prune_inverse_stemming=False, dtype=None,
+                                          doc_term_matrix_directory=None):
+    """
+    Train an LDA and transform the comments, without ever holding all of them in memory.
 
-    # Extract information about data
-    topic_words = lda_pipeline.inverse_transform(Xt=None)
-    topic_words_weighting = get_word_weightings(lda_pipeline)
-    topics_words_and_weightings = link_topics_and_weightings(topic_words, topic_words_weighting)
+    A first pass over the comments cleans and stems them, learns the vocabulary from their term counts and spools the
+    stemmed comments to a temporary file. A second pass vectorizes the spooled comments by batches, appending them to
+    a document-term matrix on the disk (see `artifici_lda.logic.doc_term_matrix`). The LDA is then trained with
+    minibatches sliced from that memory-mapped matrix, so the peak memory is bounded by the batch size (and the
+    vocabulary size) rather than by the number of comments, and the comments are tokenized only once.
 
-    # Manipulations on the information for a clean return.
-    _1_grams, _2_grams = split_1_grams_from_n_grams(topics_words_and_weightings)
+    :param comments: an iterable of strings, such as a generator or the lines of a huge file. It's iterated only once.
+    :param n_topics: the number of clusters (categories, groups, or topics) to find.
+    :param language: the language, refer to snowball lemmatizer's documentation for a list
+        of languages. Example: 'french', 'english'. http://snowball.tartarus.org/texts/stemmersoverview.html
+        Use `AUTO` to detect the language of each comment among French and English instead.
+    :param batch_size: the number of comments processed at once.
+    :param n_passes: the number of training passes over the comments. If None, it's the 'lda__max_iter' parameter,
+        which gives as much training as `train_lda_pipeline_on_words`.
+    :param prune_inverse_stemming: if True, once the vocabulary is learned, the inverse stemming is pruned to the
+        stemmed words of the vocabulary and stored compactly (see `prune_inverse_stemming_to_vocabulary`).
+    :param dtype: the type of the counts, such as `np.float32` to train the LDA and transform the comments in float32
+        from end to end, which roughly halves their memory. If None, the counts are integers and the LDA uses float64.
+    :param doc_term_matrix_directory: if not None, the directory where the document-term matrix is written and kept,
+        such as a directory on a disk bigger than the temporary one. Else, it's written to a temporary directory.
+    :return: the same things as `train_lda_pipeline_on_words`.
+    """
+    lda_pipeline = _create_lda_pipeline_on_words(
+        n_topics=n_topics, language=language, stopwords=stopwords, dtype=dtype)
+    stopwords_remover = lda_pipeline.named_steps['stopwords']
+    stemmer = lda_pipeline.named_steps['stemmer']
+    count_vect = lda_pipeline.named_steps['count_vect']
+    lda = lda_pipeline.named_steps['lda']
+    if n_passes is None:
+        n_passes = lda.max_iter
+
+    stopwords_remover.fit()
+    matrix_directory_context = (
+        tempfile.TemporaryDirectory() if doc_term_matrix_directory is None else nullcontext(doc_term_matrix_directory))
+    with tempfile.TemporaryFile(mode='w+', encoding='utf-8') as spool, matrix_directory_context as matrix_directory:
+        # First pass: preprocess the comments, spool them to disk, and learn the vocabulary.
+        n_comments = [0]
+
+        def stemmed_batches():
+            for batch in iter_batches(comments, batch_size):
+                stemmed_batch = stemmer.fit_transform(stopwords_remover.transform(batch))
+                for comment, stemmed_comment in zip(batch, stemmed_batch):
+                    spool.write(json.dumps([comment, stemmed_comment]) + "\n")
+                n_comments[0] += len(batch)
+                yield stemmed_batch
+
+        count_vect.fit_from_batches(stemmed_batches())
+        if prune_inverse_stemming:
+            prune_inverse_stemming_to_vocabulary(lda_pipeline)
+
+        # Second pass: vectorize the spooled comments into the document-term matrix on the disk.
+        with DocTermMatrixWriter(
+                matrix_directory, len(count_vect.vocabulary_), dtype=get_float_dtype(count_vect.dtype)) as writer:
+            for batch in _read_spooled_batches(spool, batch_size):
+                writer.append(count_vect.transform([stemmed_comment for _, stemmed_comment in batch]))
+        doc_term_matrix = load_doc_term_matrix(matrix_directory)
+
+        # Next passes: train the LDA on minibatches of the document-term matrix.
+        lda.set_params(total_samples=n_comments[0])
+        for _ in range(n_passes):
+            for vectorized_batch in iter_row_batches(doc_term_matrix, batch_size):
+                lda.partial_fit(vectorized_batch)
+        lda.n_documents_seen_ = n_comments[0]
+
+        # Last pass: transform the comments and find the top comment of each topic.
+        transformed_batches = []
+        top_comments_accumulator = TopCommentsAccumulator(lda.n_components)
+        for batch, vectorized_batch in zip(
+                _read_spooled_batches(spool, batch_size), iter_row_batches(doc_term_matrix, batch_size)):
+            transformed_batch = lda.transform(vectorized_batch)
+            transformed_batches.append(transformed_batch)
+            top_comments_accumulator.update([comment for comment, _ in batch], transformed_batch)
+    transformed_comments = np.concatenate(transformed_batches)
+    top_comments = [topic_top_comments[0] for topic_top_comments in top_comments_accumulator.get_top_comments()]
+
+    _1_grams, _2_grams = _get_topics_1_grams_and_2_grams(lda_pipeline)
 
     return transformed_comments, top_comments, _1_grams, _2_grams
 
 
-def train_lda_pipeline_on_letters(comments, n_topics=2, stopwords=None):
+def train_lda_pipeline_on_letters(comments, n_topics=2, stopwords=None, preprocessing_n_jobs=None,
+                                  stats_callback=None, dtype=None, deduplicate=False, early_stopping=None):
     """
     Train an LDA and transform the comments.
 
@@ -107,25 +283,507 @@ def train_lda_pipeline_on_letters(comments, n_topics=2, stopwords=None):
     :param n_topics: the number of clusters (categories, groups, or topics) to find.
     :param language: the language, refer to snowball lemmatizer's documentation for a list
         of languages. Example: 'french', 'english'.
+    :param preprocessing_n_jobs: if not None, the stop words removal is done on this number
+        of processes (-1 means using all CPUs) instead of on the current process only.
+    :param stats_callback: if not None, it's called with the `artifici_lda.instrumentation.StageStats` of each step
+        of the pipeline, in order, as soon as the step is fitted. Leaving it None costs nothing.
+    :param dtype: the type of the counts, such as `np.float32` to train the LDA and transform the comments in float32
+        from end to end, which roughly halves their memory. If None, the counts are integers and the LDA uses float64.
+    :param early_stopping: if not None, whether the LDA stops before its `max_iter` iterations once its topics
+        converged (see `artifici_lda.logic.lda.LDA`), instead of the 'lda__early_stopping' of the pipeline's params.
+    :param deduplicate: if True, the duplicated comments (up to their case and their spaces) are preprocessed,
+        vectorized and transformed only once, and their number of duplicates is counted in the inverse stemming and in
+        the vocabulary. The results still have one row per comment.
     :return: a list containing the topic probabilities for each comment, and another list that is empty but that
         would normally contain topics' descriptions.
     """
+    _, transformed_comments = fit_lda_pipeline_on_letters(
+        comments, n_topics=n_topics, stopwords=stopwords, preprocessing_n_jobs=preprocessing_n_jobs,
+        stats_callback=stats_callback, dtype=dtype, deduplicate=deduplicate, early_stopping=early_stopping)
+    # print("score:", lda_pipeline.score(comments))
+
+    return _get_results_on_letters(comments, transformed_comments)
+
+
+def fit_lda_pipeline_on_words(comments, n_topics=2, language=FRENCH, stopwords=None, preprocessing_n_jobs=None,
+                              stats_callback=None, prune_inverse_stemming=False, dtype=None,
+                              deduplicate=False, preprocessing_cache=None, early_stopping=None):
+    """
+    Train an LDA on ngrams of words, keeping the fitted pipeline (to save it, or to transform new comments with it).
+
+    :param comments: a list of strings
+    :param n_topics: the number of clusters (categories, groups, or topics) to find.
+    :param language: the language, refer to snowball lemmatizer's documentation for a list
+        of languages. Example: 'french', 'english'. http://snowball.tartarus.org/texts/stemmersoverview.html
+        Use `AUTO` to detect the language of each comment among French and English instead.
+    :param preprocessing_n_jobs: if not None, the stop words removal and the stemming are done on this number of
+        processes (-1 means using all CPUs) instead of on the current process only.
+    :param stats_callback: if not None, it's called with the `artifici_lda.instrumentation.StageStats` of each step
+        of the pipeline, in order, as soon as the step is fitted. If the inverse stemming is pruned, its pruning is
+        reported as a 'prune_inverse_stemming' stage whose input and output sizes are the memory (in bytes) used by
+        the inverse stemming before and after.
+    :param prune_inverse_stemming: if True, once the vocabulary is learned, the inverse stemming is pruned to the
+        stemmed words of the vocabulary and stored compactly (see `prune_inverse_stemming_to_vocabulary`).
+    :param dtype: the type of the counts, such as `np.float32` to train the LDA and transform the comments in float32
+        from end to end, which roughly halves their memory. If None, the counts are integers and the LDA uses float64.
+    :param early_stopping: if not None, whether the LDA stops before its `max_iter` iterations once its topics
+        converged (see `artifici_lda.logic.lda.LDA`), instead of the 'lda__early_stopping' of the pipeline's params.
+    :param deduplicate: if True, the duplicated comments (up to their case and their spaces) are preprocessed,
+        vectorized and transformed only once, and their number of duplicates is counted in the inverse stemming and in
+        the vocabulary. The results still have one row per comment.
+    :param preprocessing_cache: if not None, a `artifici_lda.preprocessing_cache.PreprocessingCache` in which the
+        cleaned and stemmed comments are looked up, so that only the comments missing from it are cleaned and stemmed
+        (on the current process, whatever preprocessing_n_jobs) then added to it. If there is a stats_callback, the
+        stop words removal and the stemming are reported as a single 'preprocessing_cache' stage.
+    :return: the fitted scikit-learn Pipeline, and the topic probabilities for each comment.
+    """
+    lda_pipeline = _create_lda_pipeline_on_words(
+        n_topics=n_topics, language=language, stopwords=stopwords, dtype=dtype, early_stopping=early_stopping)
+
+    # Fit the data
+    transformed_comments = _fit_transform(
+        lda_pipeline, comments, preprocessing_n_jobs, stats_callback, prune_inverse_stemming, deduplicate,
+        preprocessing_cache)
+    return lda_pipeline, transformed_comments
+
+
+def fit_lda_pipeline_on_letters(comments, n_topics=2, stopwords=None, preprocessing_n_jobs=None,
+                                stats_callback=None, dtype=None, deduplicate=False, early_stopping=None):
+    """
+    Train an LDA on ngrams of letters, keeping the fitted pipeline (to save it, or to transform new comments with it).
+
+    :param comments: a list of strings
+    :param n_topics: the number of clusters (categories, groups, or topics) to find.
+    :param preprocessing_n_jobs: if not None, the stop words removal is done on this number
+        of processes (-1 means using all CPUs) instead of on the current process only.
+    :param stats_callback: if not None, it's called with the `artifici_lda.instrumentation.StageStats` of each step
+        of the pipeline, in order, as soon as the step is fitted.
+    :param dtype: the type of the counts, such as `np.float32` to train the LDA and transform the comments in float32
+        from end to end, which roughly halves their memory. If None, the counts are integers and the LDA uses float64.
+    :param early_stopping: if not None, whether the LDA stops before its `max_iter` iterations once its topics
+        converged (see `artifici_lda.logic.lda.LDA`), instead of the 'lda__early_stopping' of the pipeline's params.
+    :param deduplicate: if True, the duplicated comments (up to their case and their spaces) are preprocessed,
+        vectorized and transformed only once, and their number of duplicates is counted in the inverse stemming and in
+        the vocabulary. The results still have one row per comment.
+    :return: the fitted scikit-learn Pipeline, and the topic probabilities for each comment.
+    """
+    lda_pipeline = _create_lda_pipeline_on_letters(
+        n_topics=n_topics, stopwords=stopwords, dtype=dtype, early_stopping=early_stopping)
+
+    # Fit the data
+    transformed_comments = _fit_transform(
+        lda_pipeline, comments, preprocessing_n_jobs, stats_callback, deduplicate=deduplicate)
+    return lda_pipeline, transformed_comments
+
+
+def update_lda_pipeline(lda_pipeline, new_comments, n_passes=1, max_new_features=None,
+                        prune_inverse_stemming=False):
+    """
+    Keep training an already fitted pipeline (on words or on letters) on new comments only, such as the comments of
+    the day, rather than training a new pipeline on every comment from zero.
+
+    The inverse stemming counts of the stemmer are updated with the new comments, the new terms of the new comments
+    are added at the end of the vocabulary (their weights in the topics start at the LDA's topic-word prior), and the
+    LDA keeps learning from its current topics with `partial_fit`, as if the new comments were the last minibatches
+    of a corpus made of all the comments seen so far. The cost is proportional to the number of new comments.
+
+    :param lda_pipeline: a pipeline fitted such as by `fit_lda_pipeline_on_words`, or loaded with
+        `artifici_lda.persistence.load_lda_pipeline(directory, mmap_mode=None)`. It's updated in place.
+    :param new_comments: a list of strings
+    :param n_passes: the number of training passes over the new comments. Each pass is weighted as if the new
+        comments were part of every comment seen so far, so many passes over a few one-sided new comments would let
+        them override the topics learnt from the older comments.
+    :param max_new_features: if not None, at most this number of the most frequent new terms are added to the
+        vocabulary. The new terms are otherwise pruned with the vectorizer's `min_df` and `max_df` on the new comments.
+    :param prune_inverse_stemming: if True, the inverse stemming is pruned to the updated vocabulary (see
+        `prune_inverse_stemming_to_vocabulary`).
+    :return: the updated pipeline, and the topic probabilities for each new comment.
+    """
+    count_vect = lda_pipeline.named_steps['count_vect']
+    lda = lda_pipeline.named_steps['lda']
+
+    n_preprocessing_steps = _get_n_preprocessing_steps(lda_pipeline)
+    preprocessed_comments = _fit_transform_steps(lda_pipeline, new_comments, 0, n_preprocessing_steps)
+    new_terms = count_vect.extend_vocabulary(preprocessed_comments, max_new_features=max_new_features)
+    lda.add_features(len(new_terms))
+    if prune_inverse_stemming:
+        prune_inverse_stemming_to_vocabulary(lda_pipeline)
+
+    vectorized_comments = count_vect.transform(preprocessed_comments)
+    n_documents_seen = getattr(lda, 'n_documents_seen_', lda.total_samples) + len(new_comments)
+    lda.set_params(total_samples=n_documents_seen)
+    for _ in range(n_passes):
+        lda.partial_fit(vectorized_comments)
+    lda.n_documents_seen_ = n_documents_seen
+
+    return lda_pipeline, lda.transform(vectorized_comments)
+
+
+def prune_inverse_stemming_to_vocabulary(lda_pipeline):
+    """
+    Prune the inverse stemming of a pipeline on words to the stemmed words of its fitted vocabulary: the other stemmed
+    words can't be part of the topics, so only the winning original word of the vocabulary's stemmed words is kept, in
+    a compact table. The topics' words are unchanged. It's best done right after the 'count_vect' step is fitted.
+
+    :param lda_pipeline: a pipeline on words whose 'stemmer' and 'count_vect' steps are fitted.
+    :return: the memory used by the inverse stemming before and after pruning, in bytes.
+    """
+    vocabulary_stemmed_words = set()
+    for feature in lda_pipeline.named_steps['count_vect'].vocabulary_:
+        vocabulary_stemmed_words.update(feature.split(" "))
+    return lda_pipeline.named_steps['stemmer'].prune_inverse_stemming(vocabulary_stemmed_words)
+
+
+def select_n_topics_on_words(comments, n_topics_candidates, language=FRENCH, stopwords=None, n_jobs=-1,
+                             preprocessing_n_jobs=None, dtype=None, validation_fraction=0.2, early_stopping=None):
+    """
+    Train an LDA on ngrams of words for each candidate number of topics, so as to choose `n_topics`.
+
+    The candidates are compared on their perplexity on held-out comments: each one is fitted on the other comments, so
+    that more topics don't win by merely fitting the training comments better. The best candidate is then fitted again
+    on every comment.
+
+    The comments are cleaned from their stop words, stemmed and vectorized only once. The document-term matrices of
+    the training and of the held-out comments are then saved to a temporary directory that the worker processes
+    memory-map, so the LDAs of the candidates are fitted in parallel on the same matrices without them being pickled
+    to each worker.
+
+    :param comments: a list of strings
+    :param n_topics_candidates: the numbers of topics to try, such as `range(2, 11)`.
+    :param language: the language, refer to snowball lemmatizer's documentation for a list
+        of languages. Example: 'french', 'english'. http://snowball.tartarus.org/texts/stemmersoverview.html
+        Use `AUTO` to detect the language of each comment among French and English instead.
+    :param stopwords: the stop words, or None to use the default ones.
+    :param n_jobs: the number of processes fitting the candidates at once (-1 means using all CPUs). Each LDA is
+        then fitted on a single CPU.
+    :param preprocessing_n_jobs: if not None, the stop words removal and the stemming are done on this number of
+        processes (-1 means using all CPUs) instead of on the current process only.
+    :param dtype: the type of the counts, such as `np.float32` to train the LDA and transform the comments in float32
+        from end to end, which roughly halves their memory. If None, the counts are integers and the LDA uses float64.
+    :param early_stopping: if not None, whether the LDA stops before its `max_iter` iterations once its topics
+        converged (see `artifici_lda.logic.lda.LDA`), instead of the 'lda__early_stopping' of the pipeline's params.
+    :param validation_fraction: the fraction of the comments held out to score the candidates, drawn with the LDA's
+        `random_state`.
+    :return: the fitted scikit-learn Pipeline of the candidate having the lowest held-out perplexity, and a dict of
+        each candidate's number of topics to its perplexity on the held-out comments (the lower, the better).
+    """
+    n_topics_candidates = list(n_topics_candidates)
+    lda_pipeline = _create_lda_pipeline_on_words(
+        n_topics=n_topics_candidates[0], language=language, stopwords=stopwords, dtype=dtype,
+        early_stopping=early_stopping)
+
+    n_preprocessing_steps = _get_n_preprocessing_steps(lda_pipeline)
+    preprocessed_comments = _fit_transform_steps(
+        lda_pipeline, comments, 0, n_preprocessing_steps, preprocessing_n_jobs)
+    vectorized_comments = lda_pipeline.named_steps['count_vect'].fit_transform(preprocessed_comments)
+
+    lda = lda_pipeline.named_steps['lda']
+    lda_params = lda.get_params()
+    lda_params['n_jobs'] = 1  # The parallelism is across candidates.
+    train_comments, validation_comments = split_validation(
+        vectorized_comments, validation_fraction, check_random_state(lda_params['random_state']))
+    n_jobs = min(effective_n_jobs(n_jobs), len(n_topics_candidates))
+    with tempfile.TemporaryDirectory() as matrices_directory:
+        train_directory = os.path.join(matrices_directory, "train")
+        validation_directory = os.path.join(matrices_directory, "validation")
+        save_doc_term_matrix(train_comments, train_directory)
+        save_doc_term_matrix(validation_comments, validation_directory)
+        perplexities = Parallel(n_jobs=n_jobs)(
+            delayed(_get_held_out_perplexity)(
+                dict(lda_params, n_components=n_topics), train_directory, validation_directory)
+            for n_topics in n_topics_candidates)
+    perplexities = dict(zip(n_topics_candidates, perplexities))
+
+    lda.set_params(n_components=min(perplexities, key=perplexities.get)).fit(vectorized_comments)
+    return lda_pipeline, perplexities
+
+
+def predict_topics(lda_pipeline, comments, batch_size=64):
+    """
+    Get the topic probabilities of new comments with an already fitted pipeline, such as one returned by
+    `fit_lda_pipeline_on_words` or `artifici_lda.persistence.load_lda_pipeline`. The fitted state is left untouched.
+
+    The comments are transformed by micro-batches, on the current process only: for a few short comments, the
+    overhead of dispatching the work to other processes would be bigger than the work itself.
+
+    :param lda_pipeline: a fitted scikit-learn Pipeline.
+    :param comments: a list of strings
+    :param batch_size: the number of comments transformed at once.
+    :return: the topic probabilities for each comment, and a list of the latencies (in seconds) of each micro-batch.
+    """
+    transformed_batches = []
+    batch_latencies = []
+    with parallel_backend('sequential'):
+        for batch in iter_batches(comments, batch_size):
+            start = time.perf_counter()
+            transformed_batches.append(lda_pipeline.transform(batch))
+            batch_latencies.append(time.perf_counter() - start)
+
+    if not transformed_batches:
+        return np.zeros((0, lda_pipeline.named_steps['lda'].n_components)), batch_latencies
+    return np.concatenate(transformed_batches), batch_latencies
+
+
+def _create_lda_pipeline_on_words(n_topics, language, stopwords, dtype=None, early_stopping=None):
     params = get_lda_params_with_specific_n_cluster_or_language(
-        LDA_PIPELINE_PARAMS_LETTERS, n_topics=n_topics, stopwords=stopwords)
+        LDA_PIPELINE_PARAMS_WORDS, n_topics=n_topics, language=language, stopwords=stopwords, dtype=dtype,
+        early_stopping=early_stopping)
 
-    lda_pipeline = Pipeline([
-        ('stopwords', StopWordsRemover()),
-        ('letter_splitter', LetterSplitter()),
+    return Pipeline([
+        ('stopwords', LanguageDetectingStopWordsRemover() if language == AUTO else StopWordsRemover()),
+        ('stemmer', LanguageRoutingStemmer() if language == AUTO else Stemmer()),
         ('count_vect', CountVectorizer()),
         ('lda', LDA()),
     ]).set_params(**params)
 
-    # Fit the data
-    transformed_comments = lda_pipeline.fit_transform(comments)
-    # print("score:", lda_pipeline.score(comments))
 
+def _create_lda_pipeline_on_letters(n_topics, stopwords, dtype=None, early_stopping=None):
+    params = get_lda_params_with_specific_n_cluster_or_language(
+        LDA_PIPELINE_PARAMS_LETTERS, n_topics=n_topics, stopwords=stopwords, dtype=dtype,
+        early_stopping=early_stopping)
+
+    return Pipeline([
+        ('stopwords', StopWordsRemover()),
+        ('count_vect', LetterNGramVectorizer()),
+        ('lda', LDA()),
+    ]).set_params(**params)
+
+
+def _train_lda_pipeline_default_with_cache(cache, comments, n_topics, language, stopwords, preprocessing_n_jobs,
+                                           mode_callback, prune_inverse_stemming, dtype, early_stopping):
+    """
+    Same as `train_lda_pipeline_default`, but the results are looked up in the cache before training, and stored in it
+    after.
+    """
+    from artifici_lda.result_cache import hash_training_inputs
+
+    key = hash_training_inputs(
+        comments, n_topics=n_topics, language=language, dtype=np.dtype(dtype).name if dtype is not None else None,
+        early_stopping=early_stopping,
+        # The stop words are removed whatever their order. None means the current content of the default stop words'
+        # file, which is what's hashed.
+        stopwords=sorted(set(stopwords if stopwords is not None else load_default_stopwords())),
+        lda_pipeline_params_words=LDA_PIPELINE_PARAMS_WORDS, lda_pipeline_params_letters=LDA_PIPELINE_PARAMS_LETTERS)
+
+    cached = cache.get(key)
+    if cached is not None:
+        arrays, metadata = cached
+        if mode_callback is not None:
+            mode_callback(metadata['mode'], 0.0)
+        # JSON turned the tuples of words and weightings into lists.
+        _1_grams, _2_grams = [[[tuple(word_and_weighting) for word_and_weighting in topic] for topic in topics]
+                              for topics in (metadata['1_grams'], metadata['2_grams'])]
+        return arrays['transformed_comments'], metadata['top_comments'], _1_grams, _2_grams
+
+    modes = []
+
+    def record_mode(mode, seconds_saved):
+        modes.append(mode)
+        if mode_callback is not None:
+            mode_callback(mode, seconds_saved)
+
+    transformed_comments, top_comments, _1_grams, _2_grams = train_lda_pipeline_default(
+        comments, n_topics=n_topics, language=language, stopwords=stopwords,
+        preprocessing_n_jobs=preprocessing_n_jobs, mode_callback=record_mode,
+        prune_inverse_stemming=prune_inverse_stemming, dtype=dtype, early_stopping=early_stopping)
+    cache.put(key, {'transformed_comments': transformed_comments}, {
+        'mode': modes[0],
+        'top_comments': top_comments,
+        '1_grams': [[(word, float(weighting)) for word, weighting in topic] for topic in _1_grams],
+        '2_grams': [[(word, float(weighting)) for word, weighting in topic] for topic in _2_grams],
+    })
+    return transformed_comments, top_comments, _1_grams, _2_grams
+
+
+def _get_results_on_words(lda_pipeline, comments, transformed_comments):
+    top_comments = get_top_comments(comments, transformed_comments)
+
+    _1_grams, _2_grams = _get_topics_1_grams_and_2_grams(lda_pipeline)
+
+    return transformed_comments, top_comments, _1_grams, _2_grams
+
+
+def _get_results_on_letters(comments, transformed_comments):
     no_info_for_topics = [[] for _ in range(LDA_PIPELINE_PARAMS_LETTERS['lda__n_components'])]
 
     top_comments = get_top_comments(comments, transformed_comments)
 
     return transformed_comments, top_comments, no_info_for_topics, no_info_for_topics
+
+
+def _get_topics_1_grams_and_2_grams(lda_pipeline):
+    # Extract information about data
+    topic_words, topic_words_weighting = get_topics_top_words(lda_pipeline)
+    topics_words_and_weightings = link_topics_and_weightings(topic_words, topic_words_weighting)
+
+    # Manipulations on the information for a clean return.
+    return split_1_grams_from_n_grams(topics_words_and_weightings)
+
+
+def _read_spooled_batches(spool, batch_size):
+    spool.seek(0)
+    return iter_batches((json.loads(line) for line in spool), batch_size)
+
+
+def _fit_transform(lda_pipeline, comments, preprocessing_n_jobs=None, stats_callback=None,
+                   prune_inverse_stemming=False, deduplicate=False, preprocessing_cache=None):
+    """
+    Fit the pipeline and transform the comments, optionally running the preprocessing steps that come before the
+    'count_vect' step on a pool of processes, and pruning the inverse stemming once 'count_vect' is fitted.
+    """
+    if deduplicate:
+        return _fit_transform_deduplicated(
+            lda_pipeline, comments, preprocessing_n_jobs, stats_callback, prune_inverse_stemming, preprocessing_cache)
+    if preprocessing_cache is not None:
+        return _fit_transform_with_preprocessing_cache(
+            lda_pipeline, comments, preprocessing_cache, stats_callback, prune_inverse_stemming)
+    if stats_callback is not None:
+        return _fit_transform_with_stats(
+            lda_pipeline, comments, preprocessing_n_jobs, stats_callback, prune_inverse_stemming)
+    if preprocessing_n_jobs is None and not prune_inverse_stemming:
+        return lda_pipeline.fit_transform(comments)
+
+    n_preprocessing_steps = _get_n_preprocessing_steps(lda_pipeline)
+    preprocessed_comments = _fit_transform_steps(
+        lda_pipeline, comments, 0, n_preprocessing_steps, preprocessing_n_jobs)
+    if not prune_inverse_stemming:
+        return lda_pipeline[n_preprocessing_steps:].fit_transform(preprocessed_comments)
+
+    vectorized_comments = lda_pipeline.named_steps['count_vect'].fit_transform(preprocessed_comments)
+    prune_inverse_stemming_to_vocabulary(lda_pipeline)
+    return lda_pipeline.named_steps['lda'].fit_transform(vectorized_comments)
+
+
+def _fit_transform_with_stats(lda_pipeline, comments, preprocessing_n_jobs, stats_callback,
+                              prune_inverse_stemming=False):
+    """
+    Same as `_fit_transform`, but the steps are fitted one at a time so as to report each one's stats.
+    """
+    n_preprocessing_steps = _get_n_preprocessing_steps(lda_pipeline)
+    transformed = comments
+    for i, (name, _) in enumerate(lda_pipeline.steps):
+        n_jobs = preprocessing_n_jobs if i < n_preprocessing_steps else None
+        transformed, stats = measure_stage(
+            name, lambda data: _fit_transform_steps(lda_pipeline, data, i, i + 1, n_jobs), transformed)
+        stats_callback(stats._replace(n_iter=getattr(lda_pipeline.steps[i][1], 'n_iter_', None)))
+
+        if name == 'count_vect' and prune_inverse_stemming:
+            _prune_inverse_stemming_stage(lda_pipeline, stats_callback)
+    return transformed
+
+
+def _fit_transform_with_preprocessing_cache(lda_pipeline, comments, preprocessing_cache, stats_callback=None,
+                                            prune_inverse_stemming=False):
+    """
+    Same as `_fit_transform`, but the 'stopwords' and 'stemmer' steps only preprocess the comments missing from the
+    cache. Their fitting is reported as a single 'preprocessing_cache' stage.
+    """
+    preprocessed_comments = _run_stage(
+        lda_pipeline, stats_callback, 'preprocessing_cache',
+        lambda data: preprocessing_cache.fit_transform(
+            lda_pipeline.named_steps['stopwords'], lda_pipeline.named_steps['stemmer'], data),
+        comments)
+    vectorized_comments = _run_stage(
+        lda_pipeline, stats_callback, 'count_vect', lda_pipeline.named_steps['count_vect'].fit_transform,
+        preprocessed_comments)
+    if prune_inverse_stemming:
+        _prune_inverse_stemming_stage(lda_pipeline, stats_callback)
+    return _run_stage(
+        lda_pipeline, stats_callback, 'lda', lda_pipeline.named_steps['lda'].fit_transform, vectorized_comments)
+
+
+def _fit_transform_deduplicated(lda_pipeline, comments, preprocessing_n_jobs=None, stats_callback=None,
+                                prune_inverse_stemming=False, preprocessing_cache=None):
+    """
+    Same as `_fit_transform`, but on the distinct comments only, each weighted by its number of duplicates.
+
+    The LDA can't weight its documents, so it's still fitted on the rows of every comment, which are gathered from
+    the document-term matrix of the distinct comments.
+    """
+    # The size of the output of the 'deduplicate' stage is the size of the distinct comments.
+    distinct_comments, inverse_indexes = _run_stage(
+        lda_pipeline, stats_callback, 'deduplicate', deduplicate_comments, comments,
+        get_size=lambda data: get_data_size(data[0] if isinstance(data, tuple) else data))
+    n_duplicates = np.bincount(inverse_indexes, minlength=len(distinct_comments))
+
+    preprocessed_comments = distinct_comments
+    if preprocessing_cache is not None:
+        preprocessed_comments = _run_stage(
+            lda_pipeline, stats_callback, 'preprocessing_cache',
+            lambda data: preprocessing_cache.fit_transform(
+                lda_pipeline.named_steps['stopwords'], lda_pipeline.named_steps['stemmer'], data, n_duplicates),
+            preprocessed_comments)
+    else:
+        for i in range(_get_n_preprocessing_steps(lda_pipeline)):
+            preprocessed_comments = _run_stage(
+                lda_pipeline, stats_callback, lda_pipeline.steps[i][0],
+                lambda data: _fit_transform_steps(lda_pipeline, data, i, i + 1, preprocessing_n_jobs, n_duplicates),
+                preprocessed_comments)
+
+    vectorized_comments = _run_stage(
+        lda_pipeline, stats_callback, 'count_vect',
+        lambda data: lda_pipeline.named_steps['count_vect'].fit_transform_deduplicated(data, inverse_indexes),
+        preprocessed_comments)
+    if prune_inverse_stemming:
+        _prune_inverse_stemming_stage(lda_pipeline, stats_callback)
+
+    lda = lda_pipeline.named_steps['lda']
+    transformed_distinct_comments = _run_stage(
+        lda_pipeline, stats_callback, 'lda', lambda data: lda.fit(data[inverse_indexes]).transform(data),
+        vectorized_comments)
+    return transformed_distinct_comments[inverse_indexes]
+
+
+def _run_stage(lda_pipeline, stats_callback, name, function, data, get_size=None):
+    """
+    Call `function(data)`, measuring it as the stage `name` if there is a stats_callback.
+    """
+    if stats_callback is None:
+        return function(data)
+    result, stats = measure_stage(name, function, data, get_size)
+    stats_callback(stats._replace(n_iter=getattr(lda_pipeline.named_steps.get(name), 'n_iter_', None)))
+    return result
+
+
+def _prune_inverse_stemming_stage(lda_pipeline, stats_callback):
+    """
+    Prune the inverse stemming to the vocabulary, reporting it as a stage whose input and output sizes are the memory
+    used by the inverse stemming before and after if there is a stats_callback.
+    """
+    if stats_callback is None:
+        prune_inverse_stemming_to_vocabulary(lda_pipeline)
+        return
+    (memory_before, memory_after), stats = measure_stage(
+        'prune_inverse_stemming', lambda _: prune_inverse_stemming_to_vocabulary(lda_pipeline), None,
+        get_size=lambda _: None)
+    stats_callback(stats._replace(input_size=memory_before, output_size=memory_after))
+
+
+def _fit_transform_steps(lda_pipeline, comments, start, stop, preprocessing_n_jobs=None, sample_weight=None):
+    """
+    Fit the steps `lda_pipeline.steps[start:stop]` and transform the comments with them, optionally on a pool of
+    processes (in which case the fitted steps replace the original ones in the pipeline). If sample_weight is not
+    None, it's given to the steps that take a `sample_weight`.
+    """
+    if start >= stop:
+        return comments
+    if preprocessing_n_jobs is None:
+        fit_params = dict()
+        if sample_weight is not None:
+            fit_params = {name + '__sample_weight': sample_weight for name, step in lda_pipeline.steps[start:stop]
+                          if has_fit_parameter(step, 'sample_weight')}
+        return lda_pipeline[start:stop].fit_transform(comments, **fit_params)
+
+    preprocessed_comments, fitted_steps = parallel_fit_transform(
+        lda_pipeline.steps[start:stop], comments, n_jobs=preprocessing_n_jobs, sample_weight=sample_weight)
+    lda_pipeline.steps[start:stop] = fitted_steps
+    return preprocessed_comments
+
+
+def _get_held_out_perplexity(lda_params, train_directory, validation_directory):
+    lda = LDA(**lda_params).fit(load_doc_term_matrix(train_directory))
+    return lda.perplexity(load_doc_term_matrix(validation_directory))
+
+
+def _get_n_preprocessing_steps(lda_pipeline):
+    return [name for name, _ in lda_pipeline.steps].index('count_vect')
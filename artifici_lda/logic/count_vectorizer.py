@@ -1,3 +1,7 @@
+from collections import Counter
+from numbers import Integral
+
+import numpy as np
 from sklearn.feature_extraction.text import CountVectorizer as CV
 
 
@@ -10,9 +14,166 @@ class CountVectorizer(CV):
         Return a list of words for each document, keeping the order of the transformed words indexes.
         """
         self._check_vocabulary()
+        feature_names = self.get_cached_feature_names()
 
         all_undid = []  # Let's undo that.
         for doc in Xt:
-            undid_doc = [self.get_feature_names_out()[i] for i in doc]
+            undid_doc = feature_names[np.asarray(doc, dtype=np.intp)].tolist()
             all_undid.append(undid_doc)
         return all_undid
+
+    def get_cached_feature_names(self):
+        """
+        Same as `get_feature_names_out()`, but the array of feature names is built only once per fitted vocabulary.
+
+        :return: an array of the feature names, where the feature name of the index i is at the position i.
+        """
+        if getattr(self, '_feature_names_vocabulary', None) is not self.vocabulary_ or \
+                len(self._feature_names) != len(self.vocabulary_):
+            self._feature_names = self.get_feature_names_out()
+            self._feature_names_vocabulary = self.vocabulary_
+        return self._feature_names
+
+    def fit_from_batches(self, batches):
+        """
+        Learn the vocabulary from an iterable of batches of documents (such as a generator), keeping in memory only
+        the term counts: neither the documents nor the document-term matrix. The learnt vocabulary is the same as
+        the one that `fit` would learn on all the documents at once.
+
+        :param batches: an iterable of lists of documents.
+        :return: self
+        """
+        self._validate_params()
+        self._validate_ngram_range()
+        self._warn_for_unused_params()
+        self._validate_vocabulary()
+
+        analyze = self.build_analyzer()
+        term_counts = Counter()
+        document_counts = Counter()
+        n_doc = 0
+        for batch in batches:
+            for doc in batch:
+                features = analyze(doc)
+                term_counts.update(features)
+                document_counts.update(set(features))
+                n_doc += 1
+
+        if self.fixed_vocabulary_:
+            return self
+        if not term_counts:
+            raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+        # Prune the features exactly like CountVectorizer.fit_transform does, on features sorted by name.
+        terms = sorted(term_counts)
+        dfs = np.array([document_counts[term] for term in terms])
+        mask = self._get_kept_features_mask(
+            dfs, lambda: (dfs if self.binary else np.array([term_counts[term] for term in terms])).astype(self.dtype),
+            n_doc)
+
+        kept_terms = [term for term, keep in zip(terms, mask) if keep]
+        self.stop_words_ = set(term for term, keep in zip(terms, mask) if not keep)
+        self.vocabulary_ = {term: i for i, term in enumerate(kept_terms)}
+        return self
+
+    def fit_transform_deduplicated(self, raw_documents, inverse_indexes):
+        """
+        Same as `fit_transform` on the documents `[raw_documents[i] for i in inverse_indexes]`, but each distinct
+        document is analyzed only once: its duplicates still count in the document frequencies and the term counts
+        that prune the vocabulary, so the learnt vocabulary is the same.
+
+        :param raw_documents: a list of distinct documents.
+        :param inverse_indexes: for each of the documents (with their duplicates), the index of its distinct document
+            in raw_documents. See `artifici_lda.data_utils.deduplicate_comments`.
+        :return: the document-term matrix of the distinct documents. Index its rows with inverse_indexes to get the
+            document-term matrix of the documents with their duplicates.
+        """
+        self._validate_params()
+        self._validate_ngram_range()
+        self._warn_for_unused_params()
+        self._validate_vocabulary()
+
+        vocabulary, X = self._count_vocab(raw_documents, self.fixed_vocabulary_)
+        if self.binary:
+            X.data.fill(1)
+        if not self.fixed_vocabulary_:
+            X = self._sort_features(X, vocabulary)
+
+            # The weight of each non-zero count is the number of duplicates of its document.
+            n_duplicates = np.bincount(np.asarray(inverse_indexes, dtype=np.intp), minlength=X.shape[0])
+            nonzero_weights = np.repeat(n_duplicates, np.diff(X.indptr))
+            dfs = np.bincount(X.indices, weights=nonzero_weights, minlength=X.shape[1]).astype(np.int64)
+            mask = self._get_kept_features_mask(
+                dfs,
+                lambda: np.bincount(X.indices, weights=X.data * nonzero_weights, minlength=X.shape[1]).astype(X.dtype),
+                len(inverse_indexes))
+
+            terms = sorted(vocabulary, key=vocabulary.get)
+            self.stop_words_ = set(term for term, keep in zip(terms, mask) if not keep)
+            self.vocabulary_ = {term: i for i, term in enumerate(term for term, keep in zip(terms, mask) if keep)}
+            X = X[:, np.where(mask)[0]]
+        return X
+
+    def _get_kept_features_mask(self, dfs, get_tfs, n_doc):
+        """
+        Select the features to keep like CountVectorizer.fit_transform does.
+
+        :param dfs: the document frequencies of the features, sorted by name.
+        :param get_tfs: a callable returning the term counts of the features (in `self.dtype`), only called when
+            `max_features` requires them.
+        :param n_doc: the number of documents.
+        :return: a boolean mask of the features to keep.
+        """
+        max_doc_count = self.max_df if isinstance(self.max_df, Integral) else self.max_df * n_doc
+        min_doc_count = self.min_df if isinstance(self.min_df, Integral) else self.min_df * n_doc
+        if max_doc_count < min_doc_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+
+        mask = (dfs <= max_doc_count) & (dfs >= min_doc_count)
+        if self.max_features is not None and mask.sum() > self.max_features:
+            tfs = get_tfs()
+            mask_inds = (-tfs[mask]).argsort()[:self.max_features]
+            new_mask = np.zeros(len(dfs), dtype=bool)
+            new_mask[np.where(mask)[0][mask_inds]] = True
+            mask = new_mask
+
+        if not mask.any():
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        return mask
+
+    def extend_vocabulary(self, raw_documents, max_new_features=None):
+        """
+        Add the new terms of new documents at the end of the fitted vocabulary, such that the indexes of the known
+        terms don't change. The new terms are pruned with `min_df` and `max_df` on the new documents only.
+
+        :param raw_documents: an iterable of new documents.
+        :param max_new_features: if not None, only this number of the most frequent new terms are added.
+        :return: the list of the added terms, in the order of their new indexes.
+        """
+        self._check_vocabulary()
+        analyze = self.build_analyzer()
+        vocabulary = self.vocabulary_
+        term_counts = Counter()
+        document_counts = Counter()
+        n_doc = 0
+        for doc in raw_documents:
+            features = [feature for feature in analyze(doc) if feature not in vocabulary]
+            term_counts.update(features)
+            document_counts.update(set(features))
+            n_doc += 1
+
+        max_doc_count = self.max_df if isinstance(self.max_df, Integral) else self.max_df * n_doc
+        min_doc_count = self.min_df if isinstance(self.min_df, Integral) else self.min_df * n_doc
+        new_terms = sorted(term for term, df in document_counts.items() if min_doc_count <= df <= max_doc_count)
+        if max_new_features is not None and len(new_terms) > max_new_features:
+            counts = document_counts if self.binary else term_counts
+            new_terms = sorted(sorted(new_terms, key=lambda term: -counts[term])[:max_new_features])
+
+        if new_terms:
+            # A new dict, so that what's derived from the former vocabulary (such as the cached feature names) is
+            # rebuilt.
+            vocabulary = dict(vocabulary)
+            for term in new_terms:
+                vocabulary[term] = len(vocabulary)
+            self.vocabulary_ = vocabulary
+        return new_terms
@@ -0,0 +1,148 @@
+"""
+Document-term matrices stored on disk in the CSR format, to be memory-mapped.
+
+The `data`, `indices` and `indptr` arrays of the CSR matrix are raw binary files that are appended to by chunks of
+rows (see `DocTermMatrixWriter`), so a matrix bigger than the memory can be built one chunk at a time. Once the matrix
+is memory-mapped (see `load_doc_term_matrix`), slicing its rows (such as the LDA's minibatches) only reads the pages
+of those rows from the disk, and the processes mapping the same matrix share those pages.
+"""
+
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+DATA_FILENAME = "data.bin"
+INDICES_FILENAME = "indices.bin"
+INDPTR_FILENAME = "indptr.bin"
+METADATA_FILENAME = "doc_term_matrix.json"
+
+# The type of the indices and of the index pointers, which are the same so that scipy doesn't convert them to a common
+# type, and wide enough for any number of non-zero values.
+INDEX_DTYPE = np.int64
+
+
+class DocTermMatrixWriter(object):
+    """
+    Write a document-term matrix to a directory by chunks of rows:
+
+        with DocTermMatrixWriter(directory, n_features=len(count_vect.vocabulary_)) as writer:
+            for batch in batches:
+                writer.append(count_vect.transform(batch))
+        doc_term_matrix = load_doc_term_matrix(directory)
+    """
+
+    def __init__(self, directory, n_features, dtype=np.float64):
+        """
+        :param directory: the directory of the matrix. It's created if it doesn't exist.
+        :param n_features: the number of columns of the matrix.
+        :param dtype: the type of the values. The default floats are what the LDA works on, so that the
+            memory-mapped values are used as-is instead of being converted by each minibatch.
+        """
+        self.directory = directory
+        self.n_features = n_features
+        self.dtype = np.dtype(dtype)
+
+        self.n_rows = 0
+        self.nnz = 0
+        os.makedirs(directory, exist_ok=True)
+        self._data_file = open(os.path.join(directory, DATA_FILENAME), "wb")
+        self._indices_file = open(os.path.join(directory, INDICES_FILENAME), "wb")
+        self._indptr_file = open(os.path.join(directory, INDPTR_FILENAME), "wb")
+        self._indptr_file.write(np.zeros(1, dtype=INDEX_DTYPE).tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, rows):
+        """
+        Append rows at the end of the matrix.
+
+        :param rows: a sparse matrix (or an array) of `n_features` columns, such as `count_vect.transform(batch)`.
+        :return: self
+        """
+        rows = sp.csr_matrix(rows)
+        if rows.shape[1] != self.n_features:
+            raise ValueError("The rows have {} features instead of {}.".format(rows.shape[1], self.n_features))
+        self._data_file.write(np.ascontiguousarray(rows.data, dtype=self.dtype).tobytes())
+        self._indices_file.write(np.ascontiguousarray(rows.indices, dtype=INDEX_DTYPE).tobytes())
+        self._indptr_file.write((rows.indptr[1:].astype(INDEX_DTYPE) + self.nnz).tobytes())
+        self.n_rows += rows.shape[0]
+        self.nnz += rows.nnz
+        return self
+
+    def close(self):
+        """
+        Flush the arrays to the disk, and write the shape and the type of the matrix next to them.
+        """
+        for f in [self._data_file, self._indices_file, self._indptr_file]:
+            f.close()
+        metadata = {'shape': [self.n_rows, self.n_features], 'nnz': self.nnz, 'dtype': self.dtype.name}
+        with open(os.path.join(self.directory, METADATA_FILENAME), "w") as f:
+            json.dump(metadata, f)
+
+
+def save_doc_term_matrix(doc_term_matrix, directory, dtype=None):
+    """
+    Save a whole document-term matrix, to be loaded with `load_doc_term_matrix`.
+
+    :param doc_term_matrix: a sparse matrix.
+    :param directory: the directory of the matrix. It's created if it doesn't exist.
+    :param dtype: the type of the values. If None, the float values keep their type and the others become float64.
+    """
+    if dtype is None:
+        dtype = get_float_dtype(doc_term_matrix.dtype)
+    with DocTermMatrixWriter(directory, doc_term_matrix.shape[1], dtype=dtype) as writer:
+        writer.append(doc_term_matrix)
+
+
+def load_doc_term_matrix(directory, mmap_mode='r'):
+    """
+    Memory-map a document-term matrix written by a `DocTermMatrixWriter` (or by `save_doc_term_matrix`).
+
+    :param directory: the directory of the matrix.
+    :param mmap_mode: the `numpy.memmap` mode of the arrays. The default 'r' maps them read-only.
+    :return: a scipy CSR matrix whose arrays are memory-mapped.
+    """
+    with open(os.path.join(directory, METADATA_FILENAME)) as f:
+        metadata = json.load(f)
+    n_rows, n_features = metadata['shape']
+    nnz = metadata['nnz']
+    data = _memmap(os.path.join(directory, DATA_FILENAME), metadata['dtype'], nnz, mmap_mode)
+    indices = _memmap(os.path.join(directory, INDICES_FILENAME), INDEX_DTYPE, nnz, mmap_mode)
+    indptr = _memmap(os.path.join(directory, INDPTR_FILENAME), INDEX_DTYPE, n_rows + 1, mmap_mode)
+
+    # The arrays are assigned rather than given to the constructor, which would read them all to check whether their
+    # values fit in int32 indices, and then copy them in memory to such indices.
+    doc_term_matrix = sp.csr_matrix((n_rows, n_features), dtype=data.dtype)
+    doc_term_matrix.data, doc_term_matrix.indices, doc_term_matrix.indptr = data, indices, indptr
+    return doc_term_matrix
+
+
+def get_float_dtype(dtype):
+    """
+    :param dtype: the type of counts, such as a CountVectorizer's dtype.
+    :return: the float type that the LDA converts those counts to: float32 stays float32, the others become float64.
+    """
+    return np.float32 if np.dtype(dtype) == np.float32 else np.float64
+
+
+def iter_row_batches(doc_term_matrix, batch_size):
+    """
+    :param doc_term_matrix: a CSR matrix, such as a memory-mapped one.
+    :param batch_size: the number of rows of each batch.
+    :return: a generator of the consecutive slices of at most batch_size rows of the matrix.
+    """
+    for start in range(0, doc_term_matrix.shape[0], batch_size):
+        yield doc_term_matrix[start:start + batch_size]
+
+
+def _memmap(path, dtype, length, mmap_mode):
+    if length == 0:
+        # An empty file can't be memory-mapped.
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode=mmap_mode, shape=(length,))
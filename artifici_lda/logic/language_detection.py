@@ -0,0 +1,50 @@
+"""
+The detection of the language of documents, without the scikit-learn `LanguageRoutingStemmer` estimator of
+`artifici_lda.logic.language_routing_stemmer`, so that it can be imported without scikit-learn.
+"""
+
+from artifici_lda.logic.stemming import FRENCH, ENGLISH, split_words
+from artifici_lda.logic.stop_words_engine import safe_casefold
+
+# The language to give to the LanguageRoutingStemmer so that it detects the language of each document.
+AUTO = 'auto'
+
+# Very frequent words of each language, transliterated and lowercase. The words common to several languages (such as
+# "on", or "a" which is also French) are left out since they can't tell the languages apart.
+LANGUAGE_MARKERS = {
+    FRENCH: frozenset([
+        "le", "la", "les", "un", "une", "des", "du", "au", "aux", "et", "est", "sont", "etait", "pas", "ne", "pour",
+        "dans", "avec", "que", "qui", "sur", "mais", "tres", "je", "tu", "il", "elle", "nous", "vous", "ils", "ce",
+        "cette", "ces", "mon", "ma", "mes", "leur", "aussi", "avoir", "fait", "bien", "plus", "comme", "deux"]),
+    ENGLISH: frozenset([
+        "the", "an", "and", "is", "are", "was", "were", "not", "for", "in", "with", "that", "who", "but", "very",
+        "you", "he", "she", "we", "they", "this", "these", "it", "of", "to", "my", "their", "also", "have", "has",
+        "been", "do", "does", "well", "more", "like", "two", "would", "what"]),
+}
+# When no marker word is found, accented letters hint at French.
+_FRENCH_ACCENTS = frozenset("àâæçéèêëîïôœùûüÿÀÂÆÇÉÈÊËÎÏÔŒÙÛÜŸ")
+
+
+def detect_language(doc, languages=(FRENCH, ENGLISH)):
+    """
+    Detect the language of a document from the frequency of the `LANGUAGE_MARKERS` words in it. Documents without any
+    marker are French if they have French accents (and if French is one of the languages), else they are of the first
+    language.
+
+    :param doc: document string
+    :param languages: the languages that can be detected, the first one being the fallback.
+    :return: one of the languages.
+    """
+    marker_counts = dict.fromkeys(languages, 0)
+    for word in split_words(doc):
+        safe_word = safe_casefold(word)
+        for language in languages:
+            if safe_word in LANGUAGE_MARKERS.get(language, ()):
+                marker_counts[language] += 1
+
+    best_language = max(languages, key=lambda language: marker_counts[language])
+    if marker_counts[best_language] > 0:
+        return best_language
+    if FRENCH in languages and any(char in _FRENCH_ACCENTS for char in doc):
+        return FRENCH
+    return languages[0]
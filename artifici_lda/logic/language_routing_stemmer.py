@@ -0,0 +1,225 @@
+import sys
+
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from artifici_lda.logic.language_detection import AUTO, LANGUAGE_MARKERS, detect_language
+from artifici_lda.logic.stemmer import Stemmer, FRENCH, ENGLISH
+from artifici_lda.logic.stop_words_remover import StopWordsRemover
+
+
+class LanguageDetectingStopWordsRemover(StopWordsRemover):
+    def __init__(self, stopwords=None, languages=(FRENCH, ENGLISH)):
+        """
+        A `StopWordsRemover` that also detects the language of each document before removing its stop words, since
+        the stop words are the very words that tell the languages apart. It's the stop words step of the pipelines
+        whose 'stemmer' step is a `LanguageRoutingStemmer` detecting the languages.
+
+        Each cleaned document is a `(language, cleaned_document)` tuple, which the `LanguageRoutingStemmer` stems in
+        that language.
+
+        :param stopwords: the stop words, see `StopWordsRemover`.
+        :param languages: the languages that can be detected, the first one being the fallback (see
+            `detect_language`).
+        """
+        super().__init__(stopwords=stopwords)
+        self.languages = languages
+
+    def remove_from_string(self, text):
+        """
+        Detect the language of a string, then remove its stopwords.
+
+        :return: a `(language, cleaned_text)` tuple.
+        """
+        return detect_language(text, self.languages), super().remove_from_string(text)
+
+
+class LanguageRoutingStemmer(BaseEstimator, TransformerMixin):
+    def __init__(self, language=AUTO, languages=(FRENCH, ENGLISH)):
+        """
+        Stem documents of mixed languages: the language of each document is detected, then the documents are grouped
+        by language and each group is stemmed in bulk by a `Stemmer` of its language. The inverse stemming tables are
+        kept per language, in `self.stemmers_`.
+
+        The language is detected from the frequency of the `LANGUAGE_MARKERS` words in the document, which are mostly
+        stop words. The stop words step before this one should thus be a `LanguageDetectingStopWordsRemover`, which
+        detects the language before removing them: its `(language, document)` tuples are stemmed in their language.
+        The documents given as strings are detected as they are. Documents without any marker are French if they have
+        French accents (and if French is one of the languages), else they are of the first language.
+
+        :param language: `AUTO` to detect the language of each document, or a language to use for every document
+            (which then works just like a `Stemmer`).
+        :param languages: the languages that can be detected, the first one being the fallback. The languages without
+            markers are never detected, but they can be used as the fallback.
+        """
+        self.language = language
+        self.languages = languages
+
+        self.stemmers_ = dict()
+
+    def get_params(self, deep=True):
+        """
+        This function is implemented for the class to be usable by scikit-learn's Pipeline() behavior.
+        """
+        return {"language": self.language, "languages": self.languages}
+
+    def set_params(self, **parameters):
+        """
+        This function is implemented for the class to be usable by scikit-learn's Pipeline() behavior.
+        """
+        for parameter, value in parameters.items():
+            self.__setattr__(parameter, value)
+        return self
+
+    def fit(self, X=None, y=None, sample_weight=None):
+        """
+        This function is implemented for the class to be usable by scikit-learn's Pipeline() behavior.
+        y is ignored here, but required by convention.
+
+        :param sample_weight: if not None, the number of times each document counts for the inverse stemming, such as
+            the number of duplicates of each distinct document.
+        """
+        X = list(X)
+        for language, indexes in self._group_by_language(X).items():
+            self._get_stemmer(language).fit(
+                [_get_text(X[i]) for i in indexes], sample_weight=_get_group_weights(sample_weight, indexes))
+        return self
+
+    def fit_transform(self, X, y=None, sample_weight=None, **fit_params):
+        """
+        This function is implemented for the class to be usable by scikit-learn's Pipeline() behavior.
+
+        Same as `fit(X, sample_weight=sample_weight).transform(X)`, but each document is stemmed only once.
+        """
+        return self._route(X, lambda stemmer, documents, indexes: stemmer.fit_transform(
+            documents, sample_weight=_get_group_weights(sample_weight, indexes)))
+
+    def fit_from_stemmed(self, X, stemmed_documents, sample_weight=None):
+        """
+        Same as `fit(X, sample_weight=sample_weight)`, but from the already stemmed documents (such as cached ones)
+        instead of stemming them again. See `Stemmer.fit_from_stemmed`.
+        """
+        X = list(X)
+        stemmed_documents = list(stemmed_documents)
+        for language, indexes in self._group_by_language(X).items():
+            self._get_stemmer(language).fit_from_stemmed(
+                [_get_text(X[i]) for i in indexes], [stemmed_documents[i] for i in indexes],
+                sample_weight=_get_group_weights(sample_weight, indexes))
+        return self
+
+    def transform(self, documents):
+        """
+        This function is implemented for the class to be usable by scikit-learn's Pipeline() behavior.
+
+        Stem all the words in a list of document, each with the stemmer of its language. A document is a string.
+        """
+        return self._route(documents, lambda stemmer, group, _: stemmer.transform(group))
+
+    def detect_language(self, doc):
+        """
+        Detect the language of a document.
+
+        :param doc: document string, or a `(language, document)` tuple whose language was already detected.
+        :return: one of `self.languages`, or `self.language` if it's not `AUTO`.
+        """
+        if self.language != AUTO:
+            return self.language
+        if isinstance(doc, tuple):
+            return doc[0]
+        return detect_language(doc, self.languages)
+
+    def inverse_transform(self, stemmed_documents):
+        """
+        Stemmed words to a guess of the original words. Documents are lists of words.
+
+        :param stemmed_documents: a list of documents. Specially here, a document isn't a string, but a list of words.
+        :return: a guess of unstemmed documents. Each document is a list of words, not a string.
+        """
+        return [[self.find_orig_word(word) for word in stemmed_words] for stemmed_words in stemmed_documents]
+
+    def find_orig_word(self, word):
+        """
+        Guess what was the original word from the state saved during the fit(...) method: among every language where
+        the stemmed word was seen, the original word seen the most often wins.
+
+        :param word: a string
+        :return: a string of a guess of the original word.
+        """
+        if " " in word:
+            # If there is a space, this means some words were combined into n-grams.
+            # So let's undo each word by itself recursively:
+            return " ".join([self.find_orig_word(w) for w in word.split(" ")])
+
+        best_word, best_count = None, 0
+        for _, stemmer in sorted(self.stemmers_.items()):
+            orig_word_and_count = stemmer.find_orig_word_and_count(word)
+            if orig_word_and_count is not None:
+                orig_word, count = orig_word_and_count
+                if count > best_count:
+                    best_word, best_count = orig_word, count
+
+        if best_word is None:
+            print("Warning, language_routing_stemmer.py, find_orig_word('{}'): "
+                  "word '{}' not found in vocabulary for inverse stemming.".format(word, word), file=sys.stderr)
+            return ""
+        return best_word
+
+    def merge_stemmers(self, stemmers):
+        """
+        Add the inverse stemming tables of other stemmers to this router's ones, such as the stemmers fitted on another
+        shard of the documents (see `Stemmer.merge_equiv_word_counts`).
+
+        :param stemmers: a dict of languages to their fitted `Stemmer`.
+        :return: self
+        """
+        for language, stemmer in stemmers.items():
+            self._get_stemmer(language).merge_equiv_word_counts(stemmer.stemmed_word_to_equiv_word_count)
+        return self
+
+    def prune_inverse_stemming(self, stemmed_words):
+        """
+        Prune the inverse stemming tables of every language (see `Stemmer.prune_inverse_stemming`).
+
+        :param stemmed_words: a set of the stemmed words to keep.
+        :return: the memory used by the inverse stemming before and after pruning, in bytes.
+        """
+        memory_before, memory_after = 0, 0
+        for stemmer in self.stemmers_.values():
+            stemmer_memory_before, stemmer_memory_after = stemmer.prune_inverse_stemming(stemmed_words)
+            memory_before += stemmer_memory_before
+            memory_after += stemmer_memory_after
+        return memory_before, memory_after
+
+    def _get_stemmer(self, language):
+        stemmer = self.stemmers_.get(language)
+        if stemmer is None:
+            stemmer = Stemmer(language=language)
+            self.stemmers_[language] = stemmer
+        return stemmer
+
+    def _group_by_language(self, documents):
+        # The indexes of the documents of each language, in their original order.
+        documents_by_language = dict()
+        for i, doc in enumerate(documents):
+            documents_by_language.setdefault(self.detect_language(doc), []).append(i)
+        return documents_by_language
+
+    def _route(self, documents, stem_group):
+        documents = list(documents)
+        stemmed_documents = [None] * len(documents)
+        for language, indexes in self._group_by_language(documents).items():
+            stemmed_group = stem_group(
+                self._get_stemmer(language), [_get_text(documents[i]) for i in indexes], indexes)
+            for i, stemmed_document in zip(indexes, stemmed_group):
+                stemmed_documents[i] = stemmed_document
+        return stemmed_documents
+
+
+def _get_group_weights(sample_weight, indexes):
+    if sample_weight is None:
+        return None
+    return [sample_weight[i] for i in indexes]
+
+
+def _get_text(doc):
+    # The document of a `(language, document)` tuple of the `LanguageDetectingStopWordsRemover`.
+    return doc[1] if isinstance(doc, tuple) else doc
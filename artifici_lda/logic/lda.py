@@ -3,11 +3,199 @@
 #     (Which is available under the following license: BSD 3-Clause)
 
 import math
+from numbers import Integral, Real
+import time
 
+from joblib import effective_n_jobs
+import numpy as np
+from sklearn.base import _fit_context
 from sklearn.decomposition import LatentDirichletAllocation
+from sklearn.decomposition._online_lda_fast import _dirichlet_expectation_2d
+from sklearn.utils import gen_batches
+from sklearn.utils._param_validation import Interval, StrOptions
+from sklearn.utils.parallel import Parallel
+from sklearn.utils.validation import check_is_fitted
+
+PERPLEXITY = 'perplexity'
+COMPONENTS = 'components'
 
 
 class LDA(LatentDirichletAllocation):
+    """
+    scikit-learn's LatentDirichletAllocation, with the topics' top words as its inverse_transform, and an optional
+    early stopping mode.
+
+    With `early_stopping=True`, the convergence is checked every `validation_every` iterations (passes), and the
+    training stops once the improvement is below `early_stopping_tol`. The improvement is measured either on the
+    perplexity of a held-out sample of `validation_fraction` of the documents (with `early_stopping_metric` set to
+    `PERPLEXITY`, it's the relative decrease of that perplexity, and the model is then trained on the other documents
+    until it stops, then one last pass is run on every document so that the held-out ones are learnt too), or on the
+    topics' word distributions (with `COMPONENTS`, it's the mean L1 distance between each topic's word distributions,
+    and the model is then trained on every document), since the last check or since the initialization.
+
+    After fitting, `n_iter_` is the number of iterations actually run (without the last pass), `validation_scores_` holds the improvement of
+    each check (the values compared to `early_stopping_tol`, whatever the metric), and `time_saved_` estimates the
+    seconds saved by not running the remaining iterations up to `max_iter`.
+    """
+
+    _parameter_constraints = {
+        **LatentDirichletAllocation._parameter_constraints,
+        "early_stopping": ["boolean"],
+        "early_stopping_metric": [StrOptions({PERPLEXITY, COMPONENTS})],
+        "early_stopping_tol": [Interval(Real, 0, None, closed="left")],
+        "validation_fraction": [Interval(Real, 0, 1, closed="neither")],
+        "validation_every": [Interval(Integral, 1, None, closed="left")],
+    }
+
+    def __init__(
+        self,
+        n_components=10,
+        *,
+        doc_topic_prior=None,
+        topic_word_prior=None,
+        learning_method="batch",
+        learning_decay=0.7,
+        learning_offset=10.0,
+        max_iter=10,
+        batch_size=128,
+        evaluate_every=-1,
+        total_samples=1e6,
+        perp_tol=1e-1,
+        mean_change_tol=1e-3,
+        max_doc_update_iter=100,
+        n_jobs=None,
+        verbose=0,
+        random_state=None,
+        early_stopping=False,
+        early_stopping_metric=PERPLEXITY,
+        early_stopping_tol=1e-3,
+        validation_fraction=0.1,
+        validation_every=10,
+    ):
+        super().__init__(
+            n_components=n_components,
+            doc_topic_prior=doc_topic_prior,
+            topic_word_prior=topic_word_prior,
+            learning_method=learning_method,
+            learning_decay=learning_decay,
+            learning_offset=learning_offset,
+            max_iter=max_iter,
+            batch_size=batch_size,
+            evaluate_every=evaluate_every,
+            total_samples=total_samples,
+            perp_tol=perp_tol,
+            mean_change_tol=mean_change_tol,
+            max_doc_update_iter=max_doc_update_iter,
+            n_jobs=n_jobs,
+            verbose=verbose,
+            random_state=random_state,
+        )
+        self.early_stopping = early_stopping
+        self.early_stopping_metric = early_stopping_metric
+        self.early_stopping_tol = early_stopping_tol
+        self.validation_fraction = validation_fraction
+        self.validation_every = validation_every
+
+    def fit(self, X, y=None):
+        """
+        Learn the model for the data X, stopping early if `early_stopping` is True.
+        """
+        if not self.early_stopping:
+            super().fit(X, y)
+        else:
+            self._fit_with_early_stopping(X)
+        self.n_documents_seen_ = X.shape[0]
+        return self
+
+    def add_features(self, n_new_features):
+        """
+        Add new features (words) to the fitted model, such as the new terms of an extended vocabulary, so as to keep
+        training it with `partial_fit` on documents having those features. Their weights in every topic start at the
+        topic-word prior, which is what they would be if they had been in the vocabulary without ever being seen.
+
+        :param n_new_features: the number of features added after the existing ones.
+        :return: self
+        """
+        check_is_fitted(self)
+        new_components = np.full(
+            (self.n_components, n_new_features), self.topic_word_prior_, dtype=self.components_.dtype)
+        self.components_ = np.hstack([np.asarray(self.components_), new_components])
+        self.exp_dirichlet_component_ = np.exp(_dirichlet_expectation_2d(self.components_))
+        self.n_features_in_ = self.components_.shape[1]
+        return self
+
+    @_fit_context(prefer_skip_nested_validation=True)
+    def _fit_with_early_stopping(self, X):
+        # The same training loop as LatentDirichletAllocation.fit, but with convergence checks.
+        start_time = time.perf_counter()
+        X = self._check_non_neg_array(X, reset_n_features=True, whom="LDA.fit")
+        n_samples, n_features = X.shape
+        self._init_latent_vars(n_features, dtype=X.dtype)
+
+        X_train, X_validation = X, None
+        if self.early_stopping_metric == PERPLEXITY:
+            X_train, X_validation = self._split_validation(X)
+        n_train_samples = X_train.shape[0]
+
+        self.validation_scores_ = []
+        n_jobs = effective_n_jobs(self.n_jobs)
+        with Parallel(n_jobs=n_jobs, verbose=max(0, self.verbose - 1)) as parallel:
+            # The first check measures the improvement since the initialization.
+            last_score = self._get_convergence_score(X_validation, parallel)
+            for i in range(self.max_iter):
+                self._run_pass(X_train, parallel)
+                self.n_iter_ += 1
+
+                if (i + 1) % self.validation_every == 0:
+                    score = self._get_convergence_score(X_validation, parallel)
+                    improvement = self._get_relative_improvement(last_score, score)
+                    self.validation_scores_.append(improvement)
+                    if self.verbose:
+                        print("iteration: %d of max_iter: %d, %s improvement: %.6f" % (
+                            i + 1, self.max_iter, self.early_stopping_metric, improvement))
+                    if improvement < self.early_stopping_tol:
+                        break
+                    last_score = score
+
+            n_passes = self.n_iter_
+            if n_train_samples < n_samples:
+                # The held-out documents are learnt too, once they're no longer needed to check the convergence.
+                self._run_pass(X, parallel)
+                n_passes += 1
+                X_train = X
+
+            # calculate final perplexity value on train set
+            doc_topics_distr, _ = self._e_step(X_train, cal_sstats=False, random_init=False, parallel=parallel)
+            self.bound_ = self._perplexity_precomp_distr(X_train, doc_topics_distr, sub_sampling=False)
+
+        seconds_per_iter = (time.perf_counter() - start_time) / n_passes
+        self.time_saved_ = seconds_per_iter * (self.max_iter - self.n_iter_)
+        return self
+
+    def _run_pass(self, X, parallel):
+        # One iteration of LatentDirichletAllocation.fit over X.
+        n_samples = X.shape[0]
+        if self.learning_method == "online":
+            for idx_slice in gen_batches(n_samples, self.batch_size):
+                self._em_step(X[idx_slice, :], total_samples=n_samples, batch_update=False, parallel=parallel)
+        else:
+            self._em_step(X, total_samples=n_samples, batch_update=True, parallel=parallel)
+
+    def _split_validation(self, X):
+        return split_validation(X, self.validation_fraction, self.random_state_)
+
+    def _get_convergence_score(self, X_validation, parallel):
+        if X_validation is None:
+            # The topics' word distributions, to measure how much they change.
+            return self.components_ / self.components_.sum(axis=1, keepdims=True)
+        doc_topics_distr, _ = self._e_step(X_validation, cal_sstats=False, random_init=False, parallel=parallel)
+        return self._perplexity_precomp_distr(X_validation, doc_topics_distr, sub_sampling=False)
+
+    def _get_relative_improvement(self, last_score, score):
+        if self.early_stopping_metric == COMPONENTS:
+            # The mean L1 distance between the topics' previous and current word distributions.
+            return float(np.abs(score - last_score).mean() * score.shape[1])
+        return (last_score - score) / last_score
 
     def inverse_transform(self, documents=None):
         """
@@ -17,32 +205,27 @@ class LDA(LatentDirichletAllocation):
         The top words returned are selectionned carefully such that the returned list isn't too big.
         """
 
-        some_top_words = []
         if documents is None:
             # We want topics.
-            for topic in self.components_:
-                all_words_for_topic = topic.argsort()[::-1]  # arguments of the reverse sorting are the top words
-
-                # We just want to keep the most pertinent word features: half of them for near-zero counts,
-                # then sqrt of them as we approach 10 words. See:
-                #   Formula: y=floor(1.05^-x * (x/2) + (1-(1.05^-x))*(sqrt(x))+0.5)
-                #   http://www.wolframalpha.com/input/?i=y%3Dfloor(x%2F2%2B0.5),+y%3Dfloor(1.05%5E-x+*+(x%2F2)+%2B+(1-(1.05%5E-x))*(sqrt(x))%2B0.5),+from+x+%3D+0..25
-                x = len(all_words_for_topic)
-                exp = 1.05**(-x)  # transition from 1 to 0, fades slowly: half life of exp decay is near x=4.
-                y = int(
-                    exp * (x / 2) +  # at the beginning, we take half.
-                    (1 - exp) * (math.sqrt(x)) +  # after some time `(1 - exp)`, we transition to square root of words.
-                    0.5  # the 0.5 makes int() round up like if we dir round(). But let's avoid using `round()`.
-                )
-                half_or_sqrt_of_words = y
-
-                top_words_for_topic = all_words_for_topic[:half_or_sqrt_of_words]
-                some_top_words.append(top_words_for_topic)
+            top_words_ids, _ = self.get_top_words()
+            return list(top_words_ids)
         else:
             # we return documents as they are: indexes.
             return documents
 
-        return some_top_words
+    def get_top_words(self, n_top_words=None):
+        """
+        Get the top features (words ids) of every topic along with their weightings, in a single vectorized call.
+
+        :param n_top_words: number of words to keep per topic. If None, `get_n_top_words` decides from the number of
+            features.
+        :return: two aligned 2D arrays of shape [topics, n_top_words]: the words ids and their weightings, each row
+            being sorted from the best word to the worst one.
+        """
+        if n_top_words is None:
+            n_top_words = get_n_top_words(self.components_.shape[1])
+        top_words_ids = get_top_k_indices(self.components_, n_top_words)
+        return top_words_ids, np.take_along_axis(self.components_, top_words_ids, axis=1)
 
     def print_top_words(self, feature_names, n_top_words=None):
         """
@@ -55,7 +238,83 @@ class LDA(LatentDirichletAllocation):
         if n_top_words is None:
             n_top_words = int((len(feature_names) + 0.5) / 2)
 
-        for i, topic in enumerate(self.components_):
-            top_topics = topic.argsort()[:-n_top_words - 1:-1]
+        top_words_ids, _ = self.get_top_words(n_top_words)
+        for i, top_topics in enumerate(top_words_ids):
             escape = lambda x: "'" + x + "'"
             print("topic #{}:".format(i), " ".join([escape(feature_names[i]) for i in top_topics]))
+
+
+def split_validation(X, validation_fraction, random_state):
+    """
+    Hold out a random sample of the documents, such as to measure the perplexity of a model on unseen documents.
+
+    :param X: a document-term matrix.
+    :param validation_fraction: the fraction of the documents to hold out. At least one is held out, and at least one
+        is kept for training.
+    :param random_state: a numpy RandomState, which draws the held out documents.
+    :return: the training rows and the held out rows of X, each in their original order. With less than 2 documents,
+        both are X.
+    """
+    n_samples = X.shape[0]
+    n_validation_samples = int(round(n_samples * validation_fraction))
+    n_validation_samples = min(max(n_validation_samples, 1), n_samples - 1)
+    if n_validation_samples < 1:
+        # Too few documents to hold some out: let's validate on the training documents.
+        return X, X
+    permutation = random_state.permutation(n_samples)
+    validation_idx = np.sort(permutation[:n_validation_samples])
+    train_idx = np.sort(permutation[n_validation_samples:])
+    return X[train_idx], X[validation_idx]
+
+
+def get_n_top_words(n_features):
+    """
+    Number of top words to keep per topic: we just want to keep the most pertinent word features, that is half of them
+    for near-zero counts, then sqrt of them as we approach 10 words. See:
+      Formula: y=floor(1.05^-x * (x/2) + (1-(1.05^-x))*(sqrt(x))+0.5)
+      http://www.wolframalpha.com/input/?i=y%3Dfloor(x%2F2%2B0.5),+y%3Dfloor(1.05%5E-x+*+(x%2F2)+%2B+(1-(1.05%5E-x))*(sqrt(x))%2B0.5),+from+x+%3D+0..25
+
+    :param n_features: the number of features (words) of the topics.
+    :return: the number of words to keep.
+    """
+    x = n_features
+    exp = 1.05**(-x)  # transition from 1 to 0, fades slowly: half life of exp decay is near x=4.
+    y = int(
+        exp * (x / 2) +  # at the beginning, we take half.
+        (1 - exp) * (math.sqrt(x)) +  # after some time `(1 - exp)`, we transition to square root of words.
+        0.5  # the 0.5 makes int() round up like if we dir round(). But let's avoid using `round()`.
+    )
+    return y
+
+
+def get_top_k_indices(matrix, k):
+    """
+    Get the indices of the k greatest values of each row of a 2D array, without sorting the whole rows.
+
+    The k greatest values are first selected with `np.argpartition` in linear time, then only those are sorted. Ties
+    are ordered like the reversed `argsort()` of the row would order them: the greatest index first.
+
+    :param matrix: a 2D array.
+    :param k: the number of indices to keep per row. It's clipped to the number of columns.
+    :return: a 2D array of indices of shape [n_rows, k], each row being sorted from the greatest value to the lowest.
+    """
+    matrix = np.asarray(matrix)
+    n_rows, n_columns = matrix.shape
+    k = max(min(k, n_columns), 0)
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+    if k < n_columns:
+        top_k = np.argpartition(matrix, n_columns - k, axis=1)[:, n_columns - k:]
+        top_k.sort(axis=1)
+        # The values tied with the k-th greatest one were picked arbitrarily: pick the ones of greatest index instead.
+        kth_values = np.take_along_axis(matrix, top_k, axis=1).min(axis=1, keepdims=True)
+        n_greater = (matrix > kth_values).sum(axis=1)
+        n_tied = (matrix == kth_values).sum(axis=1)
+        for row in np.flatnonzero(n_greater + n_tied > k):
+            greater = np.flatnonzero(matrix[row] > kth_values[row])
+            tied = np.flatnonzero(matrix[row] == kth_values[row])[n_greater[row] + n_tied[row] - k:]
+            top_k[row] = np.sort(np.concatenate([greater, tied]))
+    else:
+        top_k = np.broadcast_to(np.arange(n_columns), (n_rows, n_columns))
+    order = np.argsort(np.take_along_axis(matrix, top_k, axis=1), axis=1, kind='stable')[:, ::-1]
+    return np.take_along_axis(top_k, order, axis=1)
@@ -0,0 +1,142 @@
+from collections import defaultdict
+import re
+
+import numpy as np
+import scipy.sparse as sp
+
+from artifici_lda.logic.count_vectorizer import CountVectorizer
+
+# The letters' trigrams are counted 3 times as much as the letters' bigrams.
+TRIGRAMS_WEIGHT = 3
+
+
+class LetterNGramVectorizer(CountVectorizer):
+    """
+    Count the n-grams of letters of the documents straight into a sparse matrix.
+
+    The features and their counts are the same as the ones of a `LetterSplitter` followed by a `CountVectorizer` (with
+    the same parameters), but without building the intermediate strings of n-grams nor tokenizing them again: each
+    distinct letters' n-gram is tokenized once, and the repeated trigrams are counted with an integer weight.
+    """
+
+    def build_analyzer(self):
+        """
+        Return a callable that splits a document into its features, each feature being repeated as many times as it
+        counts. This keeps the analyzer usable as a regular CountVectorizer's analyzer (such as in `fit_from_batches`).
+        """
+        analyze_weighted = self.build_weighted_analyzer()
+
+        def analyze(doc):
+            return [feature for feature, weight in analyze_weighted(doc).items() for _ in range(weight)]
+
+        return analyze
+
+    def build_weighted_analyzer(self):
+        """
+        Return a callable that counts the features of a document.
+
+        The letters' bigrams (and the first letter on its own) are followed by the letters' trigrams repeated
+        `TRIGRAMS_WEIGHT` times, and what were spaces are now underscores. Each of those n-grams of letters is then
+        tokenized like a word by the CountVectorizer's parameters, and the n-grams of those tokens are the features.
+
+        :return: a callable taking a string and returning a dict of its features' counts.
+        """
+        self._validate_ngram_range()
+        token_pattern = re.compile(self.token_pattern)
+        lowercase = self.lowercase
+        min_n, max_n = self.ngram_range
+        grams_tokens = dict()
+
+        def tokenize(grams):
+            tokens = []
+            for gram in grams:
+                gram_tokens = grams_tokens.get(gram)
+                if gram_tokens is None:
+                    gram_tokens = tuple(token_pattern.findall(gram.lower() if lowercase else gram))
+                    grams_tokens[gram] = gram_tokens
+                tokens.extend(gram_tokens)
+            return tokens
+
+        def analyze_weighted(doc):
+            chars = doc.replace(" ", "_")
+            bigrams_tokens = tokenize([chars[max(i - 1, 0):i + 1] for i in range(len(chars))])
+            trigrams_tokens = tokenize([chars[i - 2:i + 1] for i in range(2, len(chars))])
+            return _count_weighted_ngrams(bigrams_tokens, trigrams_tokens, TRIGRAMS_WEIGHT, min_n, max_n)
+
+        return analyze_weighted
+
+    def _count_vocab(self, raw_documents, fixed_vocab):
+        """
+        Create the sparse feature matrix and the vocabulary, like CountVectorizer does, but with weighted counts.
+        """
+        if fixed_vocab:
+            vocabulary = self.vocabulary_
+        else:
+            # Add a new value when a new vocabulary item is seen
+            vocabulary = defaultdict()
+            vocabulary.default_factory = vocabulary.__len__
+
+        analyze_weighted = self.build_weighted_analyzer()
+        j_indices = []
+        values = []
+        indptr = [0]
+        for doc in raw_documents:
+            for feature, weight in analyze_weighted(doc).items():
+                try:
+                    j_indices.append(vocabulary[feature])
+                    values.append(weight)
+                except KeyError:
+                    # Ignore out-of-vocabulary items for fixed_vocab=True
+                    continue
+            indptr.append(len(j_indices))
+
+        if not fixed_vocab:
+            # disable defaultdict behaviour
+            vocabulary = dict(vocabulary)
+            if not vocabulary:
+                raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+
+        indices_dtype = np.int64 if indptr[-1] > np.iinfo(np.int32).max else np.int32
+        X = sp.csr_matrix(
+            (np.asarray(values, dtype=np.intc), np.asarray(j_indices, dtype=indices_dtype),
+             np.asarray(indptr, dtype=indices_dtype)),
+            shape=(len(indptr) - 1, len(vocabulary)),
+            dtype=self.dtype,
+        )
+        X.sort_indices()
+        return vocabulary, X
+
+
+def _count_weighted_ngrams(head_tokens, tail_tokens, tail_weight, min_n, max_n):
+    """
+    Count the n-grams of the tokens of `head_tokens + tail_tokens * tail_weight` without building that list.
+
+    :return: a dict of the n-grams (tokens joined with spaces) to their counts.
+    """
+    counts = dict()
+
+    def add(ngrams, weight):
+        for ngram in ngrams:
+            counts[ngram] = counts.get(ngram, 0) + weight
+
+    def windows(tokens, n, starts=None):
+        if starts is None:
+            starts = range(len(tokens) - n + 1)
+        return (" ".join(tokens[i:i + n]) for i in starts)
+
+    n_tail = len(tail_tokens)
+    for n in range(min_n, max_n + 1):
+        if n == 1:
+            add(head_tokens, 1)
+            add(tail_tokens, tail_weight)
+        elif n_tail == 0 or tail_weight == 1 or n_tail >= n - 1:
+            # The n-grams of the head and the first tail, then the ones inside the other tails,
+            # then the ones across two consecutive tails.
+            add(windows(head_tokens + tail_tokens, n), 1)
+            if tail_weight > 1 and n_tail > 0:
+                add(windows(tail_tokens, n), tail_weight - 1)
+                add(windows(tail_tokens + tail_tokens, n, starts=range(n_tail - n + 1, n_tail)), tail_weight - 1)
+        else:
+            # A tail is so short that an n-gram can span more than two tails.
+            add(windows(head_tokens + tail_tokens * tail_weight, n), 1)
+    return counts
@@ -0,0 +1,61 @@
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.utils.validation import has_fit_parameter
+
+
+def parallel_fit_transform(steps, documents, n_jobs=-1, sample_weight=None):
+    """
+    Fit and transform the documents through some preprocessing steps of a Pipeline (such as the stop words remover
+    and the stemmer), sharding the documents across a pool of processes.
+
+    Each process fits its own copy of the steps on a contiguous shard of the documents. The shards are then put back
+    in order, and the fitted copies are merged: the partial inverse stemming tables of the stemmers are summed, which
+    gives exactly the same result as fitting the steps serially.
+
+    :param steps: a list of (name, transformer) tuples, as in a scikit-learn Pipeline.
+    :param documents: a list of strings.
+    :param n_jobs: the number of processes to use. -1 means using all CPUs.
+    :param sample_weight: if not None, the weight of each document, given to the steps that take a `sample_weight`.
+    :return: the transformed documents, and the list of fitted (name, transformer) tuples.
+    """
+    n_shards = min(effective_n_jobs(n_jobs), len(documents))
+    if n_shards <= 1:
+        return _fit_transform_shard(steps, documents, sample_weight)
+
+    shards = _split_in_shards(documents, n_shards)
+    weights_shards = _split_in_shards(sample_weight, n_shards) if sample_weight is not None else [None] * n_shards
+    results = Parallel(n_jobs=n_shards)(
+        delayed(_fit_transform_shard)(steps, shard, weights) for shard, weights in zip(shards, weights_shards))
+
+    transformed_documents = []
+    for transformed_shard, _ in results:
+        transformed_documents.extend(transformed_shard)
+
+    _, fitted_steps = results[0]
+    for _, other_fitted_steps in results[1:]:
+        for (_, step), (_, other_step) in zip(fitted_steps, other_fitted_steps):
+            if hasattr(step, "merge_equiv_word_counts"):
+                step.merge_equiv_word_counts(other_step.stemmed_word_to_equiv_word_count)
+            elif hasattr(step, "merge_stemmers"):
+                step.merge_stemmers(other_step.stemmers_)
+
+    return transformed_documents, fitted_steps
+
+
+def _fit_transform_shard(steps, shard, sample_weight=None):
+    for _, step in steps:
+        if sample_weight is not None and has_fit_parameter(step, "sample_weight"):
+            shard = step.fit_transform(shard, sample_weight=sample_weight)
+        else:
+            shard = step.fit_transform(shard)
+    return shard, steps
+
+
+def _split_in_shards(documents, n_shards):
+    shard_size, n_bigger_shards = divmod(len(documents), n_shards)
+    shards = []
+    start = 0
+    for i in range(n_shards):
+        end = start + shard_size + (1 if i < n_bigger_shards else 0)
+        shards.append(documents[start:end])
+        start = end
+    return shards
@@ -3,20 +3,99 @@
 # For more information on PyStemmer's license, see: https://github.com/snowballstem/pystemmer
 # (It's a mix of the MIT License and the BSD 3-Clause License)
 
-from string import punctuation
+from itertools import repeat
 import sys
 
-import translitcodec
+import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
-import Stemmer as st
 
-FRENCH = 'french'
-ENGLISH = 'english'
+from artifici_lda.logic.stemming import FRENCH, ENGLISH, STEM_CACHE_SIZE, get_snowball_stemmer, stem_word, split_words
 
 
-# More languages:
-# ['danish', 'dutch', 'english', 'finnish', 'french', 'german', 'hungarian', 'italian',
-#  'norwegian', 'porter', 'portuguese', 'romanian', 'russian', 'spanish', 'swedish', 'turkish']
+class InverseStemmingTable(object):
+    """
+    A compact, read-only inverse stemming table: for each stemmed word, only its winning original word (the one seen
+    the most often) and its count are kept. The stemmed words are interned to integer ids that index the arrays of the
+    original words and of their counts.
+    """
+
+    def __init__(self, stem_ids, words, counts):
+        """
+        :param stem_ids: a dict of the stemmed words to their integer ids.
+        :param words: a list of the winning original words, indexed by the stemmed words' ids.
+        :param counts: an array of the winning original words' counts, indexed by the stemmed words' ids.
+        """
+        self.stem_ids = stem_ids
+        self.words = words
+        self.counts = counts
+
+    @classmethod
+    def from_equiv_word_counts(cls, stemmed_word_to_equiv_word_count, stemmed_words=None):
+        """
+        Build the table from a dict of stemmed words to dicts of their original words' counts.
+
+        :param stemmed_word_to_equiv_word_count: such as `Stemmer.stemmed_word_to_equiv_word_count`.
+        :param stemmed_words: if not None, only those stemmed words are kept in the table.
+        :return: an InverseStemmingTable.
+        """
+        stem_ids = dict()
+        words = []
+        counts = []
+        for stemmed_word, equiv_word_count in stemmed_word_to_equiv_word_count.items():
+            if stemmed_words is not None and stemmed_word not in stemmed_words:
+                continue
+            # Compare original words on their count: the first one seen wins ties, like in `Stemmer.find_orig_word`.
+            word, count = max(list(equiv_word_count.items()), key=lambda item: item[-1])
+            stem_ids[stemmed_word] = len(words)
+            words.append(word)
+            counts.append(count)
+        return cls(stem_ids, words, np.array(counts, dtype=np.int64))
+
+    def get(self, stemmed_word):
+        """
+        :param stemmed_word: a stemmed word.
+        :return: a tuple of the winning original word and its count, or None if the stemmed word isn't in the table.
+        """
+        stem_id = self.stem_ids.get(stemmed_word)
+        if stem_id is None:
+            return None
+        return self.words[stem_id], int(self.counts[stem_id])
+
+    def items(self):
+        """
+        :return: an iterator of the stemmed words and of dicts of their (single) original word's count, in the
+            stemmed words' ids order, without building the whole dict of dicts of `to_equiv_word_counts`.
+        """
+        words = self.words
+        counts = self.counts
+        for stemmed_word, i in self.stem_ids.items():
+            yield stemmed_word, {words[i]: int(counts[i])}
+
+    def to_equiv_word_counts(self):
+        """
+        :return: the table as a dict of stemmed words to dicts of their (single) original word's count.
+        """
+        return {stemmed_word: {self.words[i]: int(self.counts[i])} for stemmed_word, i in self.stem_ids.items()}
+
+    def get_nbytes(self):
+        """
+        :return: an estimate of the memory used by the table, in bytes.
+        """
+        return (sys.getsizeof(self.stem_ids) + sum(sys.getsizeof(w) for w in self.stem_ids) +
+                sys.getsizeof(self.words) + sum(sys.getsizeof(w) for w in self.words) + self.counts.nbytes)
+
+
+def get_equiv_word_counts_nbytes(stemmed_word_to_equiv_word_count):
+    """
+    :param stemmed_word_to_equiv_word_count: a dict of stemmed words to dicts of their original words' counts.
+    :return: an estimate of the memory used by the dict of dicts, in bytes.
+    """
+    nbytes = sys.getsizeof(stemmed_word_to_equiv_word_count)
+    for stemmed_word, equiv_word_count in stemmed_word_to_equiv_word_count.items():
+        nbytes += sys.getsizeof(stemmed_word) + sys.getsizeof(equiv_word_count)
+        nbytes += sum(sys.getsizeof(word) + sys.getsizeof(count) for word, count in equiv_word_count.items())
+    return nbytes
+
 
 class Stemmer(BaseEstimator, TransformerMixin):
     def __init__(self, language=FRENCH):
@@ -30,6 +109,7 @@ class Stemmer(BaseEstimator, TransformerMixin):
         self.language = language
 
         self.stemmed_word_to_equiv_word_count = dict()
+        self.inverse_stemming_table = None
 
     def get_params(self, deep=True):
         """
@@ -45,16 +125,54 @@ class Stemmer(BaseEstimator, TransformerMixin):
             self.__setattr__(parameter, value)
         return self
 
-    def fit(self, X=None, y=None):
+    def fit(self, X=None, y=None, sample_weight=None):
         """
         This function is implemented for the class to be usable by scikit-learn's Pipeline() behavior.
         y is ignored here, but required by convention.
+
+        :param sample_weight: if not None, the number of times each document counts for the inverse stemming, such as
+            the number of duplicates of each distinct document.
+        """
+        self._unprune_inverse_stemming()
+
+        for document, weight in zip(X, _get_weights(sample_weight)):
+            self.stem_document(document, re_fit=True, weight=weight)
+
+        return self
+
+    def fit_transform(self, X, y=None, sample_weight=None, **fit_params):
+        """
+        This function is implemented for the class to be usable by scikit-learn's Pipeline() behavior.
+
+        Same as `fit(X, sample_weight=sample_weight).transform(X)`, but each document is stemmed only once.
         """
+        self._unprune_inverse_stemming()
+        stemmed_documents = []
+        for doc, weight in zip(X, _get_weights(sample_weight)):
+            words = split_words(doc)
+            stemmed_words = self._stem_words(words)
+            self._count_equiv_words(words, stemmed_words, weight)
+            stemmed_documents.append(" ".join(stemmed_words))
+        return stemmed_documents
 
-        # TODO: implement fit_transform which would be more optimized (in time) for this step.
-        for document in X:
-            self.stem_document(document, re_fit=True)
+    def fit_from_stemmed(self, X, stemmed_documents, sample_weight=None):
+        """
+        Same as `fit(X, sample_weight=sample_weight)`, but from the already stemmed documents (such as cached ones)
+        instead of stemming them again.
 
+        :param X: the documents, before stemming.
+        :param stemmed_documents: the documents, as returned by `transform(X)`.
+        :param sample_weight: if not None, the number of times each document counts for the inverse stemming.
+        :return: self
+        """
+        self._unprune_inverse_stemming()
+        for doc, stemmed_doc, weight in zip(X, stemmed_documents, _get_weights(sample_weight)):
+            words = split_words(doc)
+            stemmed_words = stemmed_doc.split(" ")
+            if len(stemmed_words) != len(words):
+                # A stemmed word has a space, so the words can't be paired from the stemmed document.
+                stemmed_words = self._stem_words(words)
+            self._count_equiv_words(words, stemmed_words, weight)
         return self
 
     def transform(self, documents):
@@ -70,52 +188,109 @@ class Stemmer(BaseEstimator, TransformerMixin):
             stemmed_documents.append(stemmed_document)
         return stemmed_documents
 
-    def stem_document(self, doc, re_fit):
+    def stem_document(self, doc, re_fit, weight=1):
         """
         Stem the documents, and prepare the stemmer for the inverse_transform by keeping track of
         a mapping back to the original expressions and their counts.
 
         :param doc: document string
         :param re_fit: boolean, if True, it will prepare the stemmer for the inverse_transform by saving state.
+        :param weight: the number of times the document counts for the inverse stemming, when re_fit is True.
         :return: stemmed document string
         """
-        # Ignore punctuation and split on spaces.
-        for punctuation_character in punctuation:
-            doc = doc.replace(
-                # punctuation_character, " {} ".format(punctuation_character)
-                punctuation_character, " ".format(punctuation_character)
-            )
-        doc = doc.replace("  ", " ").replace("  ", " ").strip()
+        words = split_words(doc)
+        stemmed_words = self._stem_words(words)
 
-        # words_or_punct = doc.split(" ")
-        # stemmer = st.Stemmer(self.language)
-        # stemmed_words = stemmer.stemWords(words_or_punct)
+        if re_fit:
+            self._count_equiv_words(words, stemmed_words, weight)
+        else:
+            stemmed_document = " ".join(stemmed_words)
+            return stemmed_document
 
-        # Stemmed words won't have accents nor capital letters anymore.
-        transformed_words = [translitcodec.long_encode(w)[0].lower() for w in doc.split(" ")]
-        words = doc.split(" ")
-        stemmer = st.Stemmer(self.language)
-        stemmed_words = stemmer.stemWords(transformed_words)
+    def _stem_words(self, words):
+        language = self.language
+        return [stem_word(language, w) for w in words]
+
+    def _count_equiv_words(self, words, stemmed_words, weight=1):
+        # Keep track of things for inverse stemming: each word has its count.
+        # But the inverse relationship is not deterministic: we need to count occurences
+        # because we need the TOP equivalent word back.
+        stemmed_word_to_equiv_word_count = self.stemmed_word_to_equiv_word_count
+        for (_word, _stemmed_word) in zip(words, stemmed_words):
+            equiv_word_count = stemmed_word_to_equiv_word_count.get(_stemmed_word)
+            if equiv_word_count is None:
+                stemmed_word_to_equiv_word_count[_stemmed_word] = {_word: weight}
+            else:
+                equiv_word_count[_word] = equiv_word_count.get(_word, 0) + weight
+
+    def merge_equiv_word_counts(self, stemmed_word_to_equiv_word_count):
+        """
+        Add the counts of another (partial) inverse stemming table to this stemmer's one, such as a table fitted on
+        another shard of the documents. Merging the tables of consecutive shards in order gives the same table
+        (and the same inverse stemming) as fitting on all the documents.
 
-        if re_fit:
-            # Keep track of things for inverse stemming: each word has its count.
-            # But the inverse relationship is not deterministic: we need to count occurences
-            # because we need the TOP equivalent word back.
-            for (_word, _stemmed_word) in zip(words, stemmed_words):
+        :param stemmed_word_to_equiv_word_count: a dict of stemmed words to dicts of their original words' counts.
+        :return: self
+        """
+        for _stemmed_word, other_equiv_word_count in stemmed_word_to_equiv_word_count.items():
+            equiv_word_count = self.stemmed_word_to_equiv_word_count.get(_stemmed_word)
+            if equiv_word_count is None:
+                self.stemmed_word_to_equiv_word_count[_stemmed_word] = dict(other_equiv_word_count)
+            else:
+                for _word, count in other_equiv_word_count.items():
+                    equiv_word_count[_word] = equiv_word_count.get(_word, 0) + count
+        return self
 
-                if _stemmed_word in self.stemmed_word_to_equiv_word_count:
+    def prune_inverse_stemming(self, stemmed_words):
+        """
+        Replace the inverse stemming dict of dicts by a compact `InverseStemmingTable` that keeps only the given
+        stemmed words, such as the ones of a fitted CountVectorizer's vocabulary, and their winning original word.
+        The inverse stemming of those words is unchanged. Fitting more documents afterwards starts again from the kept
+        words.
 
-                    if _word in self.stemmed_word_to_equiv_word_count[_stemmed_word]:
-                        count_yet = self.stemmed_word_to_equiv_word_count[_stemmed_word][_word]
-                        self.stemmed_word_to_equiv_word_count[_stemmed_word][_word] = count_yet + 1  # += 1
-                    else:
-                        self.stemmed_word_to_equiv_word_count[_stemmed_word][_word] = 1
-                else:
-                    self.stemmed_word_to_equiv_word_count[_stemmed_word] = {_word: 1}
+        :param stemmed_words: a set of the stemmed words to keep.
+        :return: the memory used by the inverse stemming before and after pruning, in bytes.
+        """
+        memory_before = self.get_inverse_stemming_nbytes()
+        self.inverse_stemming_table = InverseStemmingTable.from_equiv_word_counts(
+            self.get_equiv_word_counts(), stemmed_words)
+        self.stemmed_word_to_equiv_word_count = dict()
+        return memory_before, self.get_inverse_stemming_nbytes()
 
-        else:
-            stemmed_document = " ".join(stemmed_words)
-            return stemmed_document
+    def _unprune_inverse_stemming(self):
+        # To count more words after having pruned, the kept (winning) words' counts are the new starting point.
+        if self.inverse_stemming_table is not None:
+            self.stemmed_word_to_equiv_word_count = self.inverse_stemming_table.to_equiv_word_counts()
+            self.inverse_stemming_table = None
+
+    def get_equiv_word_counts(self):
+        """
+        If the inverse stemming was pruned, the dict of dicts is built anew from the compact table on each call: to
+        only read it, prefer `iter_equiv_word_counts`.
+
+        :return: the inverse stemming as a dict of stemmed words to dicts of their original words' counts (with only
+            the winning original word of each stemmed word if it was pruned).
+        """
+        if self.inverse_stemming_table is not None:
+            return self.inverse_stemming_table.to_equiv_word_counts()
+        return self.stemmed_word_to_equiv_word_count
+
+    def iter_equiv_word_counts(self):
+        """
+        :return: an iterator of the stemmed words and of dicts of their original words' counts, read from the compact
+            table if the inverse stemming was pruned (with only the winning original word of each stemmed word).
+        """
+        if self.inverse_stemming_table is not None:
+            return self.inverse_stemming_table.items()
+        return iter(self.stemmed_word_to_equiv_word_count.items())
+
+    def get_inverse_stemming_nbytes(self):
+        """
+        :return: an estimate of the memory used by the inverse stemming, in bytes.
+        """
+        if self.inverse_stemming_table is not None:
+            return self.inverse_stemming_table.get_nbytes()
+        return get_equiv_word_counts_nbytes(self.stemmed_word_to_equiv_word_count)
 
     def inverse_transform(self, stemmed_documents):
         """
@@ -149,12 +324,30 @@ class Stemmer(BaseEstimator, TransformerMixin):
                 [self.find_orig_word(w) for w in word.split(" ")]
             )
 
-        try:
-            # Note: a DefaultDict may be used here to remove this try/except.
-            orig_words = self.stemmed_word_to_equiv_word_count[word]
-        except:
+        orig_word_and_count = self.find_orig_word_and_count(word)
+        if orig_word_and_count is None:
             print("Warning, stemmer.py, find_orig_word('{}'): "
                   "word '{}' not found in vocabulary for inverse stemming.".format(word, word), file=sys.stderr)
             return ""
+        return orig_word_and_count[0]
+
+    def find_orig_word_and_count(self, word):
+        """
+        :param word: a stemmed word (not an n-gram).
+        :return: a tuple of the original word seen the most often for this stemmed word and of its count, or None if
+            the stemmed word wasn't seen.
+        """
+        if self.inverse_stemming_table is not None:
+            return self.inverse_stemming_table.get(word)
+        orig_words = self.stemmed_word_to_equiv_word_count.get(word)
+        if not orig_words:
+            return None
         # Compare original words on their count which is the last "-1" item of tuples from the inner dicts.
-        return max(list(orig_words.items()), key=lambda item: item[-1])[0]
+        return max(list(orig_words.items()), key=lambda item: item[-1])
+
+
+def _get_weights(sample_weight):
+    # The integer weight of each document, or an endless 1 if there are no weights.
+    if sample_weight is None:
+        return repeat(1)
+    return (int(weight) for weight in sample_weight)
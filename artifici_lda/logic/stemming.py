@@ -0,0 +1,72 @@
+# Some code here is inspired from:
+# https://github.com/snowballstem/pystemmer/blob/master/docs/quickstart_python3.txt
+# For more information on PyStemmer's license, see: https://github.com/snowballstem/pystemmer
+# (It's a mix of the MIT License and the BSD 3-Clause License)
+
+"""
+The stemming of words, without the scikit-learn `Stemmer` estimator of `artifici_lda.logic.stemmer`, so that it can be
+imported without scikit-learn (such as by `artifici_lda.inference`).
+"""
+
+from functools import lru_cache
+from string import punctuation
+import threading
+
+import translitcodec
+import Stemmer as st
+
+FRENCH = 'french'
+ENGLISH = 'english'
+
+STEM_CACHE_SIZE = 2 ** 17
+
+_PUNCTUATION_TO_SPACES = str.maketrans(punctuation, " " * len(punctuation))
+# PyStemmer's objects must not be called concurrently: each thread has its own ones.
+_SNOWBALL_STEMMERS = threading.local()
+
+
+# More languages:
+# ['danish', 'dutch', 'english', 'finnish', 'french', 'german', 'hungarian', 'italian',
+#  'norwegian', 'porter', 'portuguese', 'romanian', 'russian', 'spanish', 'swedish', 'turkish']
+
+def get_snowball_stemmer(language):
+    """
+    Get the snowball stemmer of a language, created once per thread, so that threads (such as the workers of
+    `artifici_lda.server`) can stem at once.
+
+    :param language: the language, such as 'french' or 'english'.
+    :return: a PyStemmer `Stemmer` object, to be used by the current thread only.
+    """
+    stemmers = getattr(_SNOWBALL_STEMMERS, 'stemmers', None)
+    if stemmers is None:
+        stemmers = _SNOWBALL_STEMMERS.stemmers = dict()
+    stemmer = stemmers.get(language)
+    if stemmer is None:
+        stemmer = st.Stemmer(language)
+        stemmers[language] = stemmer
+    return stemmer
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem_word(language, word):
+    """
+    Stem a word as it appears in a document. The results are kept in a bounded LRU memo (per process),
+    as comments' vocabularies are very repetitive.
+
+    :param language: the language, such as 'french' or 'english'.
+    :param word: a word, that may have accents and capital letters.
+    :return: the stemmed word, that won't have accents nor capital letters anymore.
+    """
+    return get_snowball_stemmer(language).stemWord(translitcodec.long_encode(word)[0].lower())
+
+
+def split_words(doc):
+    """
+    Ignore punctuation and split on spaces.
+
+    :param doc: document string
+    :return: a list of words.
+    """
+    doc = doc.translate(_PUNCTUATION_TO_SPACES)
+    doc = doc.replace("  ", " ").replace("  ", " ").strip()
+    return doc.split(" ")
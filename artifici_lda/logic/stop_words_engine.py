@@ -0,0 +1,173 @@
+"""
+Compiled stop words removal engine, used by the `StopWordsRemover`.
+
+The gentle removal rules are the same as the original character-by-character algorithm (kept below as
+`remove_stopwords_char_by_char` for reference), but the work is done on whole documents:
+
+- pure ASCII documents (the most common case) are cleaned with a single substitution of a compiled regex,
+- otherwise, every character is mapped to a letter/non-letter mask with a single `str.translate` call using a
+  transliteration table that is filled lazily and then reused for every document, the words are found as runs of
+  letters in that mask, and each word is casefolded once (memoized) then looked up in a hashed set of stop words.
+"""
+
+import re
+import string
+from functools import lru_cache
+
+import translitcodec
+
+# A stop word also swallows the apostrophe or space that directly follows it.
+SWALLOWED_AFTER_STOPWORD = frozenset("’'‘’'' ")
+
+_LETTER = ord("a")
+_NOT_LETTER = ord(".")
+_WORD_PATTERN = re.compile("a+")
+
+
+class _LetterMaskTable(dict):
+    """
+    Translation table for `str.translate` mapping each character's ordinal to "a" if it's a letter, else to ".".
+
+    Characters are transliterated the first time they are seen, then the result is cached in the dict itself.
+    """
+
+    def __missing__(self, ordinal):
+        decoded_char = translitcodec.short_encode(chr(ordinal))[0].lower()
+        # Note: this is a substring test, exactly like the original algorithm.
+        mask = _LETTER if decoded_char in string.ascii_lowercase else _NOT_LETTER
+        self[ordinal] = mask
+        return mask
+
+
+_LETTER_MASK_TABLE = _LetterMaskTable()
+
+
+@lru_cache(maxsize=2 ** 17)
+def safe_casefold(word):
+    """
+    Transliterate and lowercase a word the way stop words are compared (e.g.: "Très" becomes "tres").
+
+    :param word: a string
+    :return: the transliterated lowercase string.
+    """
+    return translitcodec.long_encode(word)[0].lower()
+
+
+class CompiledStopWords(object):
+    """
+    A hashed set of transliterated lowercase stop words, compiled for the removal of stop words in whole documents.
+
+    It behaves like the set of the safe stop words, so `safe_word in compiled_stopwords` works as usual.
+    """
+
+    def __init__(self, stopwords):
+        """
+        :param stopwords: a list of stop words.
+        """
+        self.safe_stopwords = frozenset(safe_casefold(w) for w in stopwords)
+
+        # In pure ASCII documents, letters are exactly [A-Za-z] and transliterating does nothing but lowercasing,
+        # so every stop word (and what it swallows after itself) can be removed in a single regex substitution.
+        ascii_stopwords = sorted(
+            (w for w in self.safe_stopwords if w and w.isascii() and w.isalpha()),
+            key=lambda w: (-len(w), w))
+        ascii_swallowed = "".join(sorted(c for c in SWALLOWED_AFTER_STOPWORD if c.isascii()))
+        if ascii_stopwords:
+            self._ascii_pattern = re.compile(
+                "(?<![A-Za-z])(?:{})(?![A-Za-z])[{}]?".format(
+                    "|".join(ascii_stopwords), re.escape(ascii_swallowed)),
+                re.ASCII | re.IGNORECASE)
+        else:
+            self._ascii_pattern = None
+
+    def __contains__(self, safe_word):
+        return safe_word in self.safe_stopwords
+
+    def __iter__(self):
+        return iter(self.safe_stopwords)
+
+    def __len__(self):
+        return len(self.safe_stopwords)
+
+    def remove_from_string(self, text):
+        """
+        Remove stopwords from a string in the safest possible way to keep the text intact.
+
+        :param text: a string
+        :return: the string without its stop words.
+        """
+        if text.isascii():
+            if self._ascii_pattern is None:
+                return text
+            return self._ascii_pattern.sub("", text)
+
+        mask = text.translate(_LETTER_MASK_TABLE)
+
+        kept_pieces = []
+        kept_from = 0
+        for word_match in _WORD_PATTERN.finditer(mask):
+            word_start, word_end = word_match.span()
+            if safe_casefold(text[word_start:word_end]) in self.safe_stopwords:
+                # We remove the word (and the following apostrophe or space if there is one)!
+                kept_pieces.append(text[kept_from:word_start])
+                kept_from = word_end
+                if text[word_end:word_end + 1] in SWALLOWED_AFTER_STOPWORD:
+                    kept_from += 1
+
+        if kept_from == 0:
+            return text
+        kept_pieces.append(text[kept_from:])
+        return "".join(kept_pieces)
+
+
+def remove_stopwords_char_by_char(text, safe_stopwords):
+    """
+    Reference implementation of `CompiledStopWords.remove_from_string`, walking the text one character at a time.
+
+    It is kept to test that the compiled engine's output is byte-identical, and to benchmark it.
+    """
+
+    # In the following variables, text's characters will flow from bottom to top such as:
+    # text --> last_word|last_punct --> past_text
+    past_text = ""
+    last_punct = ""
+    last_word = ""
+
+    text += "."  # add a last punctuation to loop 1 last time closing the sentence.
+    for char in text:
+        decoded_char = translitcodec.short_encode(char)[0].lower()
+
+        char_is_letter = False
+        if decoded_char in string.ascii_lowercase:  # Lowercase alphabet
+            char_is_letter = True
+
+        # We loop if it's part of a word.
+        if char_is_letter:
+            # We're building a word.
+            # Loop
+            last_word += char
+
+        # Otherwise if it's punctuation, we're either somehow before or directly after a word.
+        elif not char_is_letter:
+
+            # We ignore N punctuations in a row before a word.
+            if last_word == "":
+                # Move on.
+                last_punct += char
+            # Otherwise we're closing a word. Let's process it now.
+            else:
+                full_word = last_word
+                safe_full_word = translitcodec.long_encode(full_word)[0].lower()
+                if safe_full_word in safe_stopwords:
+                    # We remove the word (and the following apostrophe or space if there is one)!
+                    full_word = ""
+                    if char in SWALLOWED_AFTER_STOPWORD:
+                        char = ""
+
+                # Loop
+                past_text += last_punct + full_word
+                last_punct = char
+                last_word = ""
+
+    past_text += last_punct
+    return past_text[:-1]
@@ -1,8 +1,8 @@
 import os
-import string
 
 from sklearn.base import BaseEstimator, TransformerMixin
-import translitcodec
+
+from artifici_lda.logic.stop_words_engine import CompiledStopWords
 
 STOPWORDS_FILENAME = "custom_FR_EN_stop_words.txt"
 
@@ -41,11 +41,8 @@ class StopWordsRemover(BaseEstimator, TransformerMixin):
         """
 
         if self.stopwords is None:
-            current_dir = os.path.dirname(os.path.realpath(__file__))
-            stop_words_file = os.path.join(current_dir, "..", "data", STOPWORDS_FILENAME)
-            with open(stop_words_file) as f:
-                self.stopwords = f.read().split("\n")
-        self.safe_stopwords = [translitcodec.long_encode(w)[0].lower() for w in self.stopwords]
+            self.stopwords = load_default_stopwords()
+        self.safe_stopwords = CompiledStopWords(self.stopwords)
 
         return self
 
@@ -74,51 +71,18 @@ class StopWordsRemover(BaseEstimator, TransformerMixin):
         """
         Remove stopwords from a string in the safest possible way to keep the text intact.
         """
-
-        # In the following variables, text's characters will flow from bottom to top such as:
-        # text --> last_word|last_punct --> past_text
-        past_text = ""
-        last_punct = ""
-        last_word = ""
-
-        text += "."  # add a last punctuation to loop 1 last time closing the sentence.
-        for char in text:
-            decoded_char = translitcodec.short_encode(char)[0].lower()
-
-            char_is_letter = False
-            if decoded_char in string.ascii_lowercase:  # Lowercase alphabet
-                char_is_letter = True
-
-            # We loop if it's part of a word.
-            if char_is_letter:
-                # We're building a word.
-                # Loop
-                last_word += char
-
-            # Otherwise if it's punctuation, we're either somehow before or directly after a word.
-            elif not char_is_letter:
-
-                # We ignore N punctuations in a row before a word.
-                if last_word == "":
-                    # Move on.
-                    last_punct += char
-                # Otherwise we're closing a word. Let's process it now.
-                else:
-                    full_word = last_word
-                    safe_full_word = translitcodec.long_encode(full_word)[0].lower()
-                    if safe_full_word in self.safe_stopwords:
-                        # We remove the word (and the following apostrophe or space if there is one)!
-                        full_word = ""
-                        if char in "’'‘’'' ":
-                            char = ""
-
-                    # Loop
-                    past_text += last_punct + full_word
-                    last_punct = char
-                    last_word = ""
-
-        past_text += last_punct
-        return past_text[:-1]
+        return self.safe_stopwords.remove_from_string(text)
 
     def inverse_transform(self, text):
         return text
+
+
+def load_default_stopwords():
+    """
+    :return: the list of the stop words of the file at the path of `STOPWORDS_FILENAME`, which are the ones used when
+        no stop words are given.
+    """
+    current_dir = os.path.dirname(os.path.realpath(__file__))
+    stop_words_file = os.path.join(current_dir, "..", "data", STOPWORDS_FILENAME)
+    with open(stop_words_file) as f:
+        return f.read().split("\n")
@@ -0,0 +1,252 @@
+"""
+Save and load fitted LDA pipelines (on words or on letters) to and from a directory.
+
+The arrays are stored as `.npy` files so that they can be memory-mapped when loading: loading is then almost
+instantaneous, and the worker processes that load the same model share its pages instead of each holding a copy.
+The lists of strings (the vocabulary and the inverse stemming's words) are each stored as one UTF-8 blob and the
+int64 offsets of the strings in it, rather than as fixed-width unicode arrays as wide as their longest string.
+The rest (hyperparameters, stop words, ...) is stored in a small `metadata.json` file.
+
+The pipeline's classes (and scikit-learn) are only imported when saving or loading a pipeline, so that the saved
+files can be read without them (see `artifici_lda.inference`).
+"""
+
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 2
+METADATA_FILENAME = "metadata.json"
+VOCABULARY_NAME = "vocabulary"
+EXP_DIRICHLET_COMPONENT_FILENAME = "exp_dirichlet_component.npy"
+_LDA_FITTED_SCALARS = ['n_batch_iter_', 'n_iter_', 'bound_', 'doc_topic_prior_', 'topic_word_prior_',
+                       'n_features_in_', 'n_documents_seen_']
+
+
+def save_lda_pipeline(lda_pipeline, directory):
+    """
+    Save a fitted pipeline, such as the one returned by `fit_lda_pipeline_on_words`.
+
+    :param lda_pipeline: a fitted scikit-learn Pipeline.
+    :param directory: the directory where to save the pipeline. It's created if it doesn't exist.
+    """
+    from artifici_lda.logic.count_vectorizer import CountVectorizer
+    from artifici_lda.logic.lda import LDA
+    from artifici_lda.logic.language_routing_stemmer import LanguageDetectingStopWordsRemover, LanguageRoutingStemmer
+    from artifici_lda.logic.stemmer import Stemmer
+    from artifici_lda.logic.stop_words_remover import StopWordsRemover
+
+    os.makedirs(directory, exist_ok=True)
+
+    steps_metadata = []
+    for name, step in lda_pipeline.steps:
+        step_metadata = {'name': name, 'class': type(step).__name__}
+        if isinstance(step, StopWordsRemover):
+            step_metadata['stopwords'] = list(step.stopwords) if step.stopwords is not None else None
+            if isinstance(step, LanguageDetectingStopWordsRemover):
+                step_metadata['languages'] = list(step.languages)
+        elif isinstance(step, Stemmer):
+            step_metadata['params'] = step.get_params()
+            _save_inverse_stemming_table(step, directory)
+        elif isinstance(step, LanguageRoutingStemmer):
+            step_metadata['params'] = _get_json_params(step)
+            step_metadata['stemmers_languages'] = list(step.stemmers_.keys())
+            for language, stemmer in step.stemmers_.items():
+                _save_inverse_stemming_table(stemmer, directory, prefix=language + "_")
+        elif isinstance(step, CountVectorizer):
+            step_metadata['params'] = _get_json_params(step)
+            save_strings(_get_vocabulary_terms(step), directory, VOCABULARY_NAME)
+        elif isinstance(step, LDA):
+            step_metadata['params'] = _get_json_params(step)
+            step_metadata['fitted'] = {attr: _to_json(getattr(step, attr)) for attr in _LDA_FITTED_SCALARS
+                                       if hasattr(step, attr)}
+            step_metadata['random_state'] = _save_random_state(step.random_state_, directory)
+            np.save(os.path.join(directory, "components.npy"), step.components_)
+            np.save(os.path.join(directory, EXP_DIRICHLET_COMPONENT_FILENAME), step.exp_dirichlet_component_)
+        steps_metadata.append(step_metadata)
+
+    metadata = {'format_version': FORMAT_VERSION, 'steps': steps_metadata}
+    with open(os.path.join(directory, METADATA_FILENAME), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def load_lda_pipeline(directory, mmap_mode='r'):
+    """
+    Load a pipeline saved with `save_lda_pipeline`.
+
+    :param directory: the directory where the pipeline was saved.
+    :param mmap_mode: the `numpy.load` memory-map mode of the LDA's arrays. The default 'r' maps them read-only,
+        which is what's needed to transform comments. Use None to load them in memory, so as to train them further.
+    :return: the fitted scikit-learn Pipeline.
+    """
+    from sklearn.pipeline import Pipeline
+
+    from artifici_lda.logic.count_vectorizer import CountVectorizer
+    from artifici_lda.logic.lda import LDA
+    from artifici_lda.logic.language_routing_stemmer import LanguageDetectingStopWordsRemover, LanguageRoutingStemmer
+    from artifici_lda.logic.letter_ngram_vectorizer import LetterNGramVectorizer
+    from artifici_lda.logic.letter_splitter import LetterSplitter
+    from artifici_lda.logic.stemmer import Stemmer
+    from artifici_lda.logic.stop_words_remover import StopWordsRemover
+
+    step_classes = {
+        cls.__name__: cls
+        for cls in [StopWordsRemover, LanguageDetectingStopWordsRemover, Stemmer, LanguageRoutingStemmer, LetterSplitter, CountVectorizer,
+                    LetterNGramVectorizer, LDA]
+    }
+    steps = []
+    for step_metadata in load_metadata(directory)['steps']:
+        step = step_classes[step_metadata['class']]()
+        if isinstance(step, StopWordsRemover):
+            if isinstance(step, LanguageDetectingStopWordsRemover):
+                step.set_params(languages=tuple(step_metadata['languages']))
+            step.set_params(stopwords=step_metadata['stopwords']).fit()
+        elif isinstance(step, Stemmer):
+            step.set_params(**step_metadata['params'])
+            _load_inverse_stemming_table(step, directory)
+        elif isinstance(step, LanguageRoutingStemmer):
+            step.set_params(**_from_json_params(step_metadata['params']))
+            for language in step_metadata['stemmers_languages']:
+                step.stemmers_[language] = Stemmer(language=language)
+                _load_inverse_stemming_table(step.stemmers_[language], directory, prefix=language + "_")
+        elif isinstance(step, CountVectorizer):
+            step.set_params(**_from_json_params(step_metadata['params']))
+            step.vocabulary_ = {term: i for i, term in enumerate(load_strings(directory, VOCABULARY_NAME))}
+        elif isinstance(step, LDA):
+            step.set_params(**_from_json_params(step_metadata['params']))
+            for attr, value in step_metadata['fitted'].items():
+                setattr(step, attr, value)
+            step.random_state_ = _load_random_state(step_metadata['random_state'], directory)
+            step.components_ = np.load(os.path.join(directory, "components.npy"), mmap_mode=mmap_mode)
+            step.exp_dirichlet_component_ = np.load(
+                os.path.join(directory, EXP_DIRICHLET_COMPONENT_FILENAME), mmap_mode=mmap_mode)
+        steps.append((step_metadata['name'], step))
+
+    return Pipeline(steps)
+
+
+def load_metadata(directory):
+    """
+    Read the metadata of a pipeline saved with `save_lda_pipeline`: its steps' names, classes and parameters.
+
+    :param directory: the directory where the pipeline was saved.
+    :return: the metadata, as a dict.
+    """
+    with open(os.path.join(directory, METADATA_FILENAME)) as f:
+        metadata = json.load(f)
+    if metadata['format_version'] != FORMAT_VERSION:
+        raise ValueError("Unsupported saved pipeline format version: {}.".format(metadata['format_version']))
+    return metadata
+
+
+def save_strings(strings, directory, name):
+    """
+    Save a list of strings as the UTF-8 blob of their concatenation, in `name + ".npy"`, and the int64 offsets of
+    the strings in the blob, in `name + "_offsets.npy"`: the i-th string is `blob[offsets[i]:offsets[i + 1]]`.
+
+    :param strings: a list of strings.
+    :param directory: the directory where to save the strings.
+    :param name: the name of the files, without their extension.
+    """
+    encoded_strings = [string.encode("utf-8") for string in strings]
+    offsets = np.zeros(len(encoded_strings) + 1, dtype=np.int64)
+    np.cumsum([len(encoded_string) for encoded_string in encoded_strings], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded_strings), dtype=np.uint8)
+    np.save(os.path.join(directory, name + ".npy"), blob)
+    np.save(os.path.join(directory, name + "_offsets.npy"), offsets)
+
+
+def load_strings(directory, name):
+    """
+    Load a list of strings saved with `save_strings`.
+
+    :param directory: the directory where the strings were saved.
+    :param name: the name of the files, without their extension.
+    :return: the list of strings.
+    """
+    blob = np.load(os.path.join(directory, name + ".npy")).tobytes()
+    offsets = np.load(os.path.join(directory, name + "_offsets.npy")).tolist()
+    return [blob[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _get_vocabulary_terms(count_vect):
+    # The terms, ordered by feature index: the index of a term is its position in the list.
+    terms = [None] * len(count_vect.vocabulary_)
+    for term, i in count_vect.vocabulary_.items():
+        terms[i] = term
+    return terms
+
+
+def _save_inverse_stemming_table(stemmer, directory, prefix=""):
+    # The dict of dicts is flattened in insertion order (which breaks ties when inverse stemming) to CSR-like arrays:
+    # the equivalent words of stems[i] are equiv_words[equiv_offsets[i]:equiv_offsets[i + 1]].
+    stems = []
+    equiv_offsets = [0]
+    equiv_words = []
+    equiv_counts = []
+    for stemmed_word, equiv_word_count in stemmer.iter_equiv_word_counts():
+        stems.append(stemmed_word)
+        equiv_words.extend(equiv_word_count.keys())
+        equiv_counts.extend(equiv_word_count.values())
+        equiv_offsets.append(len(equiv_words))
+
+    save_strings(stems, directory, prefix + "stems")
+    np.save(os.path.join(directory, prefix + "equiv_offsets.npy"), np.array(equiv_offsets, dtype=np.int64))
+    save_strings(equiv_words, directory, prefix + "equiv_words")
+    np.save(os.path.join(directory, prefix + "equiv_counts.npy"), np.array(equiv_counts, dtype=np.int64))
+
+
+def _load_inverse_stemming_table(stemmer, directory, prefix=""):
+    stems = load_strings(directory, prefix + "stems")
+    equiv_offsets = np.load(os.path.join(directory, prefix + "equiv_offsets.npy")).tolist()
+    equiv_words = load_strings(directory, prefix + "equiv_words")
+    equiv_counts = np.load(os.path.join(directory, prefix + "equiv_counts.npy")).tolist()
+
+    stemmer.stemmed_word_to_equiv_word_count = {
+        stemmed_word: dict(zip(equiv_words[start:end], equiv_counts[start:end]))
+        for stemmed_word, start, end in zip(stems, equiv_offsets[:-1], equiv_offsets[1:])
+    }
+
+
+def _save_random_state(random_state, directory):
+    algorithm, keys, pos, has_gauss, cached_gaussian = random_state.get_state()
+    np.save(os.path.join(directory, "random_state_keys.npy"), keys)
+    return [algorithm, pos, has_gauss, cached_gaussian]
+
+
+def _load_random_state(random_state_metadata, directory):
+    algorithm, pos, has_gauss, cached_gaussian = random_state_metadata
+    keys = np.load(os.path.join(directory, "random_state_keys.npy"))
+    random_state = np.random.RandomState()
+    random_state.set_state((algorithm, keys, pos, has_gauss, cached_gaussian))
+    return random_state
+
+
+def _get_json_params(estimator):
+    # Only the plain values are kept: the callables (such as a custom tokenizer) can't be saved.
+    return {
+        param: _to_json(value) for param, value in estimator.get_params().items()
+        if value is None or isinstance(value, (str, int, float, bool, tuple, list, np.generic)) or param == 'dtype'
+    }
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, type):
+        return np.dtype(value).name
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+def _from_json_params(params):
+    params = dict(params)
+    if 'ngram_range' in params:
+        params['ngram_range'] = tuple(params['ngram_range'])
+    if 'languages' in params:
+        params['languages'] = tuple(params['languages'])
+    if 'dtype' in params:
+        params['dtype'] = np.dtype(params['dtype']).type
+    return params
@@ -0,0 +1,177 @@
+"""
+A persistent cache of the preprocessing of each document: its text cleaned from its stop words, and then stemmed.
+
+Corpora mostly grow by appending new comments, so when a pipeline on words is trained again, most of the comments
+were already cleaned and stemmed by a previous training. With this cache, only the new (or changed) comments go
+through the `StopWordsRemover` and the `Stemmer`:
+
+    cache = PreprocessingCache("preprocessing_cache.sqlite")
+    train_lda_pipeline_on_words(comments, preprocessing_cache=cache)
+    print(cache.get_stats())
+
+The cache is a SQLite database, which can be shared by several processes. Its entries are keyed by the hash of the
+document, by the language and by the fingerprint of the stop words.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import sqlite3
+import time
+
+# The number of documents looked up per SQL query, below SQLite's limit on the number of variables of a query.
+LOOKUP_BATCH_SIZE = 500
+
+
+def get_document_hash(document):
+    """
+    :param document: a string.
+    :return: the hexadecimal SHA-256 of the document.
+    """
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def get_stopwords_fingerprint(stopwords):
+    """
+    :param stopwords: a list of stop words.
+    :return: the hexadecimal SHA-256 of the set of the stop words, which doesn't depend on their order.
+    """
+    return hashlib.sha256("\n".join(sorted(set(stopwords))).encode("utf-8")).hexdigest()
+
+
+class PreprocessingCache(object):
+    def __init__(self, path):
+        """
+        :param path: the path of the SQLite database of the cache. It's created if it doesn't exist.
+        """
+        self.path = path
+
+        self.n_hits = 0
+        self.n_misses = 0
+        self.time_saved = 0.0
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " document_hash TEXT NOT NULL, language TEXT NOT NULL, stopwords_fingerprint TEXT NOT NULL,"
+                " cleaned_document TEXT NOT NULL, stemmed_document TEXT NOT NULL,"
+                # The time it took to preprocess the document, to report the time saved by the hits.
+                " seconds REAL NOT NULL,"
+                " PRIMARY KEY (document_hash, language, stopwords_fingerprint))")
+
+    def fit_transform(self, stopwords_remover, stemmer, documents, sample_weight=None):
+        """
+        Same as fitting the stop words remover and the stemmer on the documents and transforming the documents with
+        them, but only the documents missing from the cache are cleaned and stemmed (on the current process), and
+        they are then added to the cache. The cached documents still count in the stemmer's inverse stemming.
+
+        :param stopwords_remover: a `StopWordsRemover`, or a `LanguageDetectingStopWordsRemover`. The cleaned
+            documents are cached without their detected language, which is detected again for the stemmer's fitting.
+        :param stemmer: a `Stemmer` or a `LanguageRoutingStemmer`.
+        :param documents: a list of strings.
+        :param sample_weight: if not None, the weight of each document in the inverse stemming.
+        :return: the stemmed documents.
+        """
+        from artifici_lda.logic.language_detection import detect_language
+        from artifici_lda.logic.language_routing_stemmer import LanguageDetectingStopWordsRemover, \
+            LanguageRoutingStemmer
+
+        detects_languages = isinstance(stopwords_remover, LanguageDetectingStopWordsRemover)
+        stopwords_remover.fit()
+        language = stemmer.language
+        if isinstance(stemmer, LanguageRoutingStemmer):
+            language = ",".join([language] + list(stemmer.languages))
+        stopwords_fingerprint = get_stopwords_fingerprint(stopwords_remover.stopwords)
+
+        start = time.perf_counter()
+        documents_hashes = [get_document_hash(document) for document in documents]
+        cached = self._lookup(set(documents_hashes), language, stopwords_fingerprint)
+        lookup_time = time.perf_counter() - start
+
+        missing_documents = dict()
+        for document, document_hash in zip(documents, documents_hashes):
+            if document_hash not in cached:
+                missing_documents.setdefault(document_hash, document)
+        if missing_documents:
+            start = time.perf_counter()
+            cleaned_documents = stopwords_remover.transform(list(missing_documents.values()))
+            stemmed_documents = stemmer.transform(cleaned_documents)
+            seconds = (time.perf_counter() - start) / len(missing_documents)
+            if detects_languages:
+                cleaned_documents = [cleaned_document for _, cleaned_document in cleaned_documents]
+            new_entries = {
+                document_hash: (cleaned_document, stemmed_document, seconds)
+                for document_hash, cleaned_document, stemmed_document in zip(
+                    missing_documents, cleaned_documents, stemmed_documents)
+            }
+            self._insert(new_entries, language, stopwords_fingerprint)
+            cached.update(new_entries)
+
+        start = time.perf_counter()
+        cleaned_documents = []
+        stemmed_documents = []
+        n_misses = 0
+        seconds_saved = 0.0
+        for document, document_hash in zip(documents, documents_hashes):
+            cleaned_document, stemmed_document, seconds = cached[document_hash]
+            if detects_languages:
+                cleaned_document = (detect_language(document, stopwords_remover.languages), cleaned_document)
+            cleaned_documents.append(cleaned_document)
+            stemmed_documents.append(stemmed_document)
+            if document_hash in missing_documents:
+                n_misses += 1
+            else:
+                seconds_saved += seconds
+        stemmer.fit_from_stemmed(cleaned_documents, stemmed_documents, sample_weight=sample_weight)
+        rebuild_time = time.perf_counter() - start
+
+        self.n_hits += len(documents) - n_misses
+        self.n_misses += n_misses
+        self.time_saved += seconds_saved - lookup_time - rebuild_time
+        return stemmed_documents
+
+    def get_stats(self):
+        """
+        :return: a dict of the numbers of documents found in the cache ('n_hits') and not found ('n_misses'), of the
+            'hit_rate', and of the 'time_saved' (in seconds): the time it took to preprocess the documents found, minus
+            the time spent looking them up and rebuilding the stemmer's inverse stemming from the cached documents.
+            Those are summed since this object was created.
+        """
+        n_lookups = self.n_hits + self.n_misses
+        return {
+            'n_hits': self.n_hits,
+            'n_misses': self.n_misses,
+            'hit_rate': self.n_hits / float(n_lookups) if n_lookups else 0.0,
+            'time_saved': self.time_saved,
+        }
+
+    @contextmanager
+    def _connect(self):
+        # A new connection per use (committed at the end), so that the cache can be used from several threads and
+        # processes.
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _lookup(self, documents_hashes, language, stopwords_fingerprint):
+        documents_hashes = list(documents_hashes)
+        cached = dict()
+        with self._connect() as connection:
+            for start in range(0, len(documents_hashes), LOOKUP_BATCH_SIZE):
+                batch = documents_hashes[start:start + LOOKUP_BATCH_SIZE]
+                rows = connection.execute(
+                    "SELECT document_hash, cleaned_document, stemmed_document, seconds FROM documents"
+                    " WHERE language = ? AND stopwords_fingerprint = ? AND document_hash IN ({})".format(
+                        ", ".join("?" * len(batch))),
+                    [language, stopwords_fingerprint] + batch)
+                for document_hash, cleaned_document, stemmed_document, seconds in rows:
+                    cached[document_hash] = (cleaned_document, stemmed_document, seconds)
+        return cached
+
+    def _insert(self, entries, language, stopwords_fingerprint):
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                [(document_hash, language, stopwords_fingerprint, cleaned_document, stemmed_document, seconds)
+                 for document_hash, (cleaned_document, stemmed_document, seconds) in entries.items()])
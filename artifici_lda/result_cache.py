@@ -0,0 +1,161 @@
+"""
+An on-disk cache of the results of training runs, shared by the processes (and the users) that point to the same
+directory.
+
+Each entry is a `.npz` file named after the content hash of its inputs (see `hash_training_inputs`), holding arrays
+and a JSON document. The entries are written to a temporary file then atomically renamed, so a reader never sees a
+partial entry. Reading an entry touches its modification time, and the least recently used entries are evicted when the
+directory exceeds its maximal size. The eviction holds an exclusive `fcntl` lock on the directory's lock file, so that
+concurrent processes don't evict at once. Where `fcntl` doesn't exist (on Windows), the eviction isn't locked: at worst,
+concurrent evictions remove more entries than needed.
+
+An entry that can't be read (such as one truncated by a full disk, or written by an incompatible version) is a miss,
+and it's removed.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Part of every key: bump it whenever the results of a training change for the same inputs (such as with a new
+# version of the training code), so that the results cached before are no longer served.
+CACHE_VERSION = 1
+
+ENTRY_EXTENSION = ".npz"
+LOCK_FILENAME = ".lock"
+_METADATA_KEY = "__metadata__"
+
+
+def hash_training_inputs(comments, **settings):
+    """
+    Hash the inputs of a training run.
+
+    :param comments: an iterable of strings. The order of the comments matters.
+    :param settings: the other inputs, which must be serializable to JSON (values that aren't, such as types, are
+        hashed by their `str`).
+    :return: the hexadecimal SHA-256 of the comments, of the settings and of the `CACHE_VERSION`.
+    """
+    sha256 = hashlib.sha256()
+    for comment in comments:
+        encoded_comment = comment.encode("utf-8")
+        # The length prefix tells ["ab", "c"] apart from ["a", "bc"].
+        sha256.update(len(encoded_comment).to_bytes(8, "little"))
+        sha256.update(encoded_comment)
+    sha256.update(json.dumps(dict(settings, cache_version=CACHE_VERSION), sort_keys=True, default=str).encode("utf-8"))
+    return sha256.hexdigest()
+
+
+class ResultCache(object):
+    def __init__(self, directory, max_size=2 ** 30):
+        """
+        :param directory: the directory of the cache. It's created if it doesn't exist.
+        :param max_size: the maximal total size of the entries, in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """
+        :param key: the key of the entry, such as a hash from `hash_training_inputs`.
+        :return: None if the entry isn't in the cache, else a tuple of the dict of its arrays and of its JSON document.
+        """
+        path = self._get_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files if name != _METADATA_KEY}
+                metadata = json.loads(entry[_METADATA_KEY].item())
+            os.utime(path)
+        except FileNotFoundError:
+            # Not cached, or evicted by another process in the meantime.
+            return None
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile):
+            # A corrupted entry.
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return arrays, metadata
+
+    def put(self, key, arrays, metadata):
+        """
+        Add an entry to the cache (replacing the one of the same key, if any), then evict the least recently used
+        entries if the cache is too big.
+
+        :param key: the key of the entry, such as a hash from `hash_training_inputs`.
+        :param arrays: a dict of names to numpy arrays.
+        :param metadata: a JSON serializable document.
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        try:
+            with os.fdopen(file_descriptor, "wb") as f:
+                np.savez(f, **{_METADATA_KEY: np.array(json.dumps(metadata))}, **arrays)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary_path, self._get_path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in its maximal size.
+
+        :return: the number of removed entries.
+        """
+        with open(os.path.join(self.directory, LOCK_FILENAME), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                entries = []
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(ENTRY_EXTENSION):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+                size = sum(entry_size for _, entry_size, _ in entries)
+                n_removed = 0
+                for _, entry_size, path in sorted(entries):
+                    if size <= self.max_size:
+                        break
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                    size -= entry_size
+                    n_removed += 1
+                return n_removed
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_size(self):
+        """
+        :return: the total size of the entries, in bytes.
+        """
+        size = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(ENTRY_EXTENSION):
+                try:
+                    size += entry.stat().st_size
+                except FileNotFoundError:
+                    pass
+        return size
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + ENTRY_EXTENSION)
@@ -0,0 +1,349 @@
+"""
+A local asyncio server of topic inference, to get the topics of comments from other services.
+
+It loads a pipeline saved with `artifici_lda.persistence.save_lda_pipeline` (on words or on letters), and serves it
+over TCP with a protocol of one JSON object per line:
+
+    -> {"id": 1, "comments": ["Les chats sont ronrons", "Un super-chien aboie"]}
+    <- {"id": 1, "topics": [[0.17, 0.83], [0.89, 0.11]]}
+    -> {"id": 2, "command": "stats"}
+    <- {"id": 2, "stats": {"queue_depth": 0, "latency_p50": 0.002, ...}}
+
+The requests of every connection are gathered in micro-batches (bounded by a number of comments and by a delay), and
+each micro-batch is transformed on a pool of worker threads so that the event loop never blocks. Each request gets
+back the topic probabilities of its own comments. The requests of a connection are answered as soon as they are
+ready, which may be out of order: the "id" of a request tells which request a response is for.
+
+Run with: `python -m artifici_lda.server path/to/saved/pipeline --port 8765`
+"""
+
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+
+import numpy as np
+
+from artifici_lda.persistence import load_lda_pipeline
+
+STATS = 'stats'
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+class TopicInferenceServer(object):
+    def __init__(self, lda_pipeline, max_batch_size=64, max_batch_delay=0.005, n_workers=1, n_latencies=10000):
+        """
+        :param lda_pipeline: a fitted scikit-learn Pipeline, such as one loaded with `load_lda_pipeline`.
+        :param max_batch_size: the maximal number of comments of a micro-batch. A request having more comments than
+            that is a micro-batch on its own.
+        :param max_batch_delay: the maximal time (in seconds) that the first request of a micro-batch waits for other
+            requests to join it.
+        :param n_workers: the number of threads transforming the micro-batches.
+        :param n_latencies: the number of the most recent requests' latencies used to compute the percentiles.
+        """
+        self.lda_pipeline = lda_pipeline
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.n_workers = n_workers
+
+        self.n_requests = 0
+        self.n_comments = 0
+        self.n_batches = 0
+        self.latencies = deque(maxlen=n_latencies)
+
+        self._queue = None
+        self._executor = None
+        self._workers_semaphore = None
+        self._batching_task = None
+        self._server = None
+        self._running_batches = set()
+        self._connections = dict()  # The tasks handling the connections, to their writers.
+
+    @property
+    def port(self):
+        """
+        The port the server listens to, which is useful when it was started on the port 0 (any free port).
+        """
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Start serving the requests (and batching them) in the background of the running event loop.
+
+        :param host: the interface to listen to.
+        :param port: the port to listen to, or 0 to use any free port (see `self.port`).
+        :return: self
+        """
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.n_workers)
+        self._workers_semaphore = asyncio.Semaphore(self.n_workers)
+        self._batching_task = asyncio.ensure_future(self._batch_requests())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self
+
+    async def close(self):
+        """
+        Stop listening, answer the requests being served, close the connections, then stop the batching.
+        """
+        self._server.close()
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections))
+        await self._server.wait_closed()
+        self._batching_task.cancel()
+        if self._running_batches:
+            await asyncio.wait(self._running_batches)
+        self._executor.shutdown(wait=True)
+
+    async def predict(self, comments):
+        """
+        Get the topic probabilities of comments, once they went through a micro-batch.
+
+        :param comments: a list of strings. Anything else is rejected with a ValueError before joining a micro-batch,
+            so that it can't fail the requests batched with it.
+        :return: an array of the topic probabilities of each comment.
+        """
+        if not isinstance(comments, list) or not all(isinstance(comment, str) for comment in comments):
+            raise ValueError("The comments must be a list of strings.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((comments, future, time.perf_counter()))
+        return await future
+
+    def get_stats(self):
+        """
+        :return: a dict of the number of requests waiting to be batched ('queue_depth'), of the number of
+            micro-batches being transformed, of the numbers of requests, comments and micro-batches served, and of
+            the percentiles of the latencies (in seconds) of the most recent requests, from their arrival to their
+            result. The percentiles are None until a request is served.
+        """
+        stats = {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'running_batches': len(self._running_batches),
+            'n_requests': self.n_requests,
+            'n_comments': self.n_comments,
+            'n_batches': self.n_batches,
+        }
+        latencies = np.array(self.latencies)
+        for percentile in LATENCY_PERCENTILES:
+            stats['latency_p{}'.format(percentile)] = (
+                float(np.percentile(latencies, percentile)) if len(latencies) else None)
+        return stats
+
+    async def _batch_requests(self):
+        loop = asyncio.get_running_loop()
+        next_request = None
+        while True:
+            batch = [next_request if next_request is not None else await self._queue.get()]
+            next_request = None
+            n_comments = len(batch[0][0])
+            deadline = loop.time() + self.max_batch_delay
+            while n_comments < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self._queue.empty():
+                    break
+                try:
+                    request = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(
+                        self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if n_comments + len(request[0]) > self.max_batch_size:
+                    # It would overflow this micro-batch: it starts the next one instead.
+                    next_request = request
+                    break
+                batch.append(request)
+                n_comments += len(request[0])
+
+            await self._workers_semaphore.acquire()
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch):
+        try:
+            comments = [comment for request_comments, _, _ in batch for comment in request_comments]
+            try:
+                transformed_comments = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._transform, comments)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._set_results(batch, [e])
+                else:
+                    # Only the requests that fail on their own get an error, not the others batched with them.
+                    self._set_results(batch, [await self._transform_or_error(request_comments)
+                                              for request_comments, _, _ in batch])
+                return
+
+            self.n_batches += 1
+            results = []
+            start = 0
+            for request_comments, _, _ in batch:
+                results.append(transformed_comments[start:start + len(request_comments)])
+                start += len(request_comments)
+            self._set_results(batch, results)
+        finally:
+            self._workers_semaphore.release()
+
+    async def _transform_or_error(self, comments):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._transform, comments)
+        except Exception as e:
+            return e
+
+    def _set_results(self, batch, results):
+        end = time.perf_counter()
+        for (request_comments, future, arrival), result in zip(batch, results):
+            if isinstance(result, Exception):
+                if not future.done():
+                    future.set_exception(result)
+                continue
+            if not future.done():
+                future.set_result(result)
+            self.n_requests += 1
+            self.n_comments += len(request_comments)
+            self.latencies.append(end - arrival)
+
+    def _transform(self, comments):
+        if not comments:
+            return np.zeros((0, self.lda_pipeline.named_steps['lda'].n_components))
+        from joblib import parallel_backend
+
+        # The parallelism is across micro-batches, not within them.
+        with parallel_backend('sequential'):
+            return self.lda_pipeline.transform(comments)
+
+    async def _handle_connection(self, reader, writer):
+        connection_task = asyncio.current_task()
+        self._connections[connection_task] = writer
+        requests = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._handle_request(line, writer))
+                requests.add(task)
+                task.add_done_callback(requests.discard)
+            if requests:
+                await asyncio.wait(requests)
+        finally:
+            writer.close()
+            del self._connections[connection_task]
+
+    async def _handle_request(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            if request.get('command') == STATS:
+                response = {'id': request_id, 'stats': self.get_stats()}
+            else:
+                transformed_comments = await self.predict(request['comments'])
+                response = {'id': request_id, 'topics': transformed_comments.tolist()}
+        except Exception as e:
+            response = {'id': request_id, 'error': "{}: {}".format(type(e).__name__, e)}
+        writer.write((json.dumps(response) + "\n").encode("utf-8"))
+        await writer.drain()
+
+
+class TopicInferenceClient(object):
+    """
+    A client of a `TopicInferenceServer`, which can have many requests awaiting their response on one connection.
+
+        client = await TopicInferenceClient.connect(port=8765)
+        transformed_comments = await client.predict(["Les chats sont ronrons"])
+        await client.close()
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+        self._responses = dict()
+        self._reading_task = asyncio.ensure_future(self._read_responses())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=8765):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def predict(self, comments):
+        """
+        :param comments: a list of strings.
+        :return: an array of the topic probabilities of each comment.
+        """
+        response = await self._request({'comments': list(comments)})
+        return np.array(response['topics'])
+
+    async def get_stats(self):
+        """
+        :return: the server's stats, see `TopicInferenceServer.get_stats`.
+        """
+        response = await self._request({'command': STATS})
+        return response['stats']
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._reading_task
+
+    async def _request(self, request):
+        request_id = self._next_id
+        self._next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._responses[request_id] = future
+        self._writer.write((json.dumps(dict(request, id=request_id)) + "\n").encode("utf-8"))
+        await self._writer.drain()
+        response = await future
+        if 'error' in response:
+            raise ValueError("The server failed to answer: {}".format(response['error']))
+        return response
+
+    async def _read_responses(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._responses.pop(response['id'], None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._responses.values():
+            if not future.done():
+                future.set_exception(ConnectionError("The server closed the connection."))
+
+
+async def serve(directory, host="127.0.0.1", port=8765, **server_params):
+    """
+    Load a saved pipeline and serve it until cancelled.
+
+    :param directory: the directory where the pipeline was saved with `save_lda_pipeline`.
+    :param host: the interface to listen to.
+    :param port: the port to listen to.
+    :param server_params: the other parameters of `TopicInferenceServer`.
+    """
+    server = await TopicInferenceServer(load_lda_pipeline(directory), **server_params).start(host, port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="the directory of a pipeline saved with save_lda_pipeline.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-batch-delay", type=float, default=0.005, help="in seconds.")
+    parser.add_argument("--n-workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    asyncio.run(serve(args.directory, args.host, args.port, max_batch_size=args.max_batch_size,
+                      max_batch_delay=args.max_batch_delay, n_workers=args.n_workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark of the extraction of the topics' words (CountVectorizer.inverse_transform) as the vocabulary grows.
+
+Looking up the feature names once per fitted vocabulary makes the extraction time independent of the vocabulary size
+(it only depends on the number of words kept per topic), whereas rebuilding the feature names for each word was
+O(topics * words * vocabulary).
+
+Run with: `python -m benchmarks.bench_count_vectorizer`
+"""
+
+import time
+
+import numpy as np
+
+from artifici_lda.logic.count_vectorizer import CountVectorizer
+
+N_TOPICS = 20
+N_TOP_WORDS = 50
+
+
+def make_fitted_count_vectorizer(vocabulary_size):
+    documents = ["word{} word{}".format(i, (i * 7) % vocabulary_size) for i in range(vocabulary_size)]
+    return CountVectorizer(max_features=vocabulary_size).fit(documents)
+
+
+def inverse_transform_rebuilding_feature_names(count_vect, topics_words_ids):
+    # The former implementation, for comparison.
+    return [[count_vect.get_feature_names_out()[i] for i in doc] for doc in topics_words_ids]
+
+
+def main(vocabulary_sizes=(1000, 2000, 5000, 10000, 20000)):
+    rng = np.random.RandomState(0)
+    print("{:>10} {:>22} {:>22}".format("vocabulary", "rebuilt names (s)", "cached names (s)"))
+    for vocabulary_size in vocabulary_sizes:
+        count_vect = make_fitted_count_vectorizer(vocabulary_size)
+        n_features = len(count_vect.vocabulary_)
+        topics_words_ids = [rng.choice(n_features, N_TOP_WORDS, replace=False) for _ in range(N_TOPICS)]
+
+        start = time.perf_counter()
+        expected = inverse_transform_rebuilding_feature_names(count_vect, topics_words_ids)
+        rebuilt_time = time.perf_counter() - start
+
+        count_vect = make_fitted_count_vectorizer(vocabulary_size)  # Without any cache yet.
+        start = time.perf_counter()
+        obtained = count_vect.inverse_transform(topics_words_ids)
+        cached_time = time.perf_counter() - start
+        assert expected == obtained
+
+        print("{:>10} {:>22.4f} {:>22.4f}".format(n_features, rebuilt_time, cached_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark of the float32 numeric path (`dtype=np.float32`) against the default one (integer counts, float64 LDA).
+
+The comments are cleaned and stemmed once, then they are vectorized and an LDA is trained on them with each dtype,
+with the same random state. The time and the peak memory of the vectorization and of the LDA are reported, along with
+the numerical drift of float32: the topics of both LDAs are matched, then the maximal difference of their normalized
+word distributions, the overlap of their top words and the maximal difference of the comments' topic probabilities
+are printed.
+
+Run with: `python -m benchmarks.bench_float32 --n-comments 20000`
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from artifici_lda import lda_service
+from artifici_lda.data_utils import get_params_from_prefix_dict
+from artifici_lda.logic.count_vectorizer import CountVectorizer
+from artifici_lda.logic.lda import LDA, get_top_k_indices
+from artifici_lda.logic.stemmer import Stemmer
+from artifici_lda.logic.stop_words_remover import StopWordsRemover
+from benchmarks.synthetic_corpus import ENGLISH, FRENCH, MIXED, SYNTHETIC_STOPWORDS, make_synthetic_corpus
+
+N_TOP_WORDS = 20
+
+
+def measure(function):
+    """
+    :return: the result of `function()`, its duration (in seconds) and its peak memory (in bytes).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    duration = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak_memory
+
+
+def fit_with_dtype(stemmed_comments, dtype, lda_params):
+    count_vect_params = get_params_from_prefix_dict('count_vect__', lda_service.LDA_PIPELINE_PARAMS_WORDS)
+    count_vect_params['dtype'] = dtype
+    X, vectorizing_time, vectorizing_memory = measure(
+        lambda: CountVectorizer(**count_vect_params).fit_transform(stemmed_comments))
+    lda = LDA(**lda_params)
+    transformed_comments, lda_time, lda_memory = measure(lambda: lda.fit_transform(X))
+    print("{:>8}: vectorizing {:7.3f} s, {:8.1f} MB peak, {:8.1f} MB matrix | "
+          "LDA {:7.3f} s, {:8.1f} MB peak, {:6.1f} MB components".format(
+              np.dtype(dtype).name, vectorizing_time, vectorizing_memory / 1e6,
+              (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6,
+              lda_time, lda_memory / 1e6, lda.components_.nbytes / 1e6))
+    return lda, transformed_comments
+
+
+def print_drift(lda_64, transformed_64, lda_32, transformed_32):
+    topics_64 = lda_64.components_ / lda_64.components_.sum(axis=1, keepdims=True)
+    topics_32 = lda_32.components_.astype(np.float64) / lda_32.components_.sum(axis=1, keepdims=True)
+    # The topics may come out in another order: match them by the L1 distance of their word distributions.
+    distances = np.abs(topics_64[:, None, :] - topics_32[None, :, :]).sum(axis=-1)
+    _, columns = linear_sum_assignment(distances)
+    topics_32 = topics_32[columns]
+    transformed_32 = transformed_32[:, columns]
+
+    top_words_64 = get_top_k_indices(topics_64, N_TOP_WORDS)
+    top_words_32 = get_top_k_indices(topics_32, N_TOP_WORDS)
+    overlaps = [len(set(a) & set(b)) / float(N_TOP_WORDS) for a, b in zip(top_words_64, top_words_32)]
+    print("drift: max topic-word difference {:.2e}, mean top {} words overlap {:.1%}, "
+          "max comment-topic difference {:.2e}".format(
+              np.abs(topics_64 - topics_32).max(), N_TOP_WORDS, np.mean(overlaps),
+              np.abs(transformed_64 - transformed_32).max()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-comments", type=int, default=5000)
+    parser.add_argument("--language", choices=[FRENCH, ENGLISH, MIXED], default=MIXED)
+    parser.add_argument("--vocabulary-size", type=int, default=5000)
+    parser.add_argument("--n-topics", type=int, default=10)
+    parser.add_argument("--lda-max-iter", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lda-n-jobs", type=int, default=1, help="the LDA's n_jobs (the pipelines use -1).")
+    args = parser.parse_args(argv)
+
+    comments = make_synthetic_corpus(
+        args.n_comments, language=args.language, vocabulary_size=args.vocabulary_size, seed=args.seed)
+    cleaned_comments = StopWordsRemover(stopwords=SYNTHETIC_STOPWORDS).fit_transform(comments)
+    stemmed_comments = Stemmer(language=ENGLISH if args.language == ENGLISH else FRENCH).fit_transform(
+        cleaned_comments)
+
+    lda_params = get_params_from_prefix_dict('lda__', lda_service.LDA_PIPELINE_PARAMS_WORDS)
+    lda_params.update(n_components=args.n_topics, max_iter=args.lda_max_iter, random_state=args.seed,
+                      n_jobs=args.lda_n_jobs)
+    lda_64, transformed_64 = fit_with_dtype(stemmed_comments, np.int64, lda_params)
+    lda_32, transformed_32 = fit_with_dtype(stemmed_comments, np.float32, lda_params)
+    print_drift(lda_64, transformed_64, lda_32, transformed_32)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of the cold start of scoring comments: the import time of the modules of `artifici_lda`, and the time from
+a fresh interpreter to the topics of a few comments, with the inference-only `artifici_lda.inference` and with the
+scikit-learn pipeline loaded by `artifici_lda.persistence.load_lda_pipeline`.
+
+Each measure runs in a new Python process, `--n-runs` times, and the median is printed along with whether
+scikit-learn got imported.
+
+Run with: `python -m benchmarks.bench_import_time --n-runs 5`
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+from artifici_lda import lda_service
+from artifici_lda.persistence import save_lda_pipeline
+from benchmarks.synthetic_corpus import MIXED, SYNTHETIC_STOPWORDS, FRENCH, make_synthetic_corpus
+
+MODULES = [
+    'numpy',
+    'artifici_lda.inference',
+    'artifici_lda.persistence',
+    'artifici_lda.server',
+    'artifici_lda.logic.stemmer',
+    'artifici_lda.lda_service',
+]
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps([time.perf_counter() - start, 'sklearn' in sys.modules]))
+"""
+
+_SCORE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+{imports}
+transformed_comments = {transform}
+print(json.dumps([time.perf_counter() - start, 'sklearn' in sys.modules]))
+"""
+_SCORE_SCRIPTS = {
+    'inference': _SCORE_SCRIPT.format(
+        imports="from artifici_lda.inference import InferenceModel",
+        transform="InferenceModel.load({directory!r}).transform({comments!r})"),
+    'load_lda_pipeline': _SCORE_SCRIPT.format(
+        imports="from artifici_lda.persistence import load_lda_pipeline",
+        transform="load_lda_pipeline({directory!r}).transform({comments!r})"),
+}
+
+
+def run_script(script, n_runs):
+    """
+    :return: the median of the seconds measured by the script in new processes, and whether it imported scikit-learn.
+    """
+    results = [json.loads(subprocess.check_output([sys.executable, "-c", script])) for _ in range(n_runs)]
+    return float(np.median([seconds for seconds, _ in results])), results[0][1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-runs", type=int, default=5, help="the number of new processes per measure.")
+    parser.add_argument("--n-comments", type=int, default=2000, help="the number of comments to train on.")
+    parser.add_argument("--n-scored-comments", type=int, default=3, help="the number of comments to score.")
+    args = parser.parse_args(argv)
+
+    for module in MODULES:
+        seconds, imports_sklearn = run_script(_IMPORT_SCRIPT.format(module=module), args.n_runs)
+        print("import {:30}: {:7.3f} s{}".format(module, seconds, ", imports scikit-learn" if imports_sklearn else ""))
+
+    comments = make_synthetic_corpus(args.n_comments, language=MIXED)
+    with mock.patch.dict(lda_service.LDA_PIPELINE_PARAMS_WORDS, {'lda__max_iter': 5}):
+        lda_pipeline, _ = lda_service.fit_lda_pipeline_on_words(
+            comments, n_topics=10, language=FRENCH, stopwords=SYNTHETIC_STOPWORDS)
+    with tempfile.TemporaryDirectory() as directory:
+        save_lda_pipeline(lda_pipeline, directory)
+        for name, script in _SCORE_SCRIPTS.items():
+            seconds, imports_sklearn = run_script(
+                script.format(directory=directory, comments=comments[:args.n_scored_comments]), args.n_runs)
+            print("score {} comments with {:18}: {:7.3f} s from a new process{}".format(
+                args.n_scored_comments, name, seconds, ", imports scikit-learn" if imports_sklearn else ""))
+
+
+if __name__ == "__main__":
+    main()
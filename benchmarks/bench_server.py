@@ -0,0 +1,80 @@
+"""
+Load test of the topic inference server (`artifici_lda.server`) with local clients.
+
+A pipeline on words is trained on a synthetic corpus, then served on a local port. Concurrent clients send requests
+of a few comments each, as fast as the server answers them, once without micro-batching (micro-batches of 1 comment)
+and once with the given micro-batching. The throughput, the latency percentiles seen by the clients and the server's
+own stats are printed.
+
+Run with: `python -m benchmarks.bench_server --n-clients 32 --n-requests 200`
+"""
+
+import argparse
+import asyncio
+import time
+from unittest import mock
+
+import numpy as np
+
+from artifici_lda import lda_service
+from artifici_lda.server import LATENCY_PERCENTILES, TopicInferenceClient, TopicInferenceServer
+from benchmarks.synthetic_corpus import MIXED, SYNTHETIC_STOPWORDS, FRENCH, make_synthetic_corpus
+
+
+async def load_test(lda_pipeline, comments, args, max_batch_size):
+    server = await TopicInferenceServer(
+        lda_pipeline, max_batch_size=max_batch_size, max_batch_delay=args.max_batch_delay,
+        n_workers=args.n_workers).start()
+    clients = [await TopicInferenceClient.connect(port=server.port) for _ in range(args.n_clients)]
+    rng = np.random.RandomState(0)
+    latencies = []
+
+    async def run_client(client):
+        for _ in range(args.n_requests):
+            start = rng.randint(len(comments) - args.request_size)
+            request_start = time.perf_counter()
+            await client.predict(comments[start:start + args.request_size])
+            latencies.append(time.perf_counter() - request_start)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[run_client(client) for client in clients])
+        duration = time.perf_counter() - start
+        stats = await clients[0].get_stats()
+    finally:
+        for client in clients:
+            await client.close()
+        await server.close()
+
+    n_comments = args.n_clients * args.n_requests * args.request_size
+    print("max_batch_size {:4d}: {:8.0f} comments/s, {:6.1f} comments per micro-batch, client latency {}".format(
+        max_batch_size, n_comments / duration, stats['n_comments'] / float(stats['n_batches']),
+        ", ".join("p{} {:.1f} ms".format(percentile, 1000 * np.percentile(latencies, percentile))
+                  for percentile in LATENCY_PERCENTILES)))
+    print("    server stats: {}".format(stats))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-comments", type=int, default=5000, help="the number of comments to train on.")
+    parser.add_argument("--n-topics", type=int, default=10)
+    parser.add_argument("--lda-max-iter", type=int, default=5)
+    parser.add_argument("--n-clients", type=int, default=16)
+    parser.add_argument("--n-requests", type=int, default=100, help="the number of requests of each client.")
+    parser.add_argument("--request-size", type=int, default=2, help="the number of comments of each request.")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-batch-delay", type=float, default=0.005, help="in seconds.")
+    parser.add_argument("--n-workers", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    comments = make_synthetic_corpus(args.n_comments, language=MIXED)
+    with mock.patch.dict(lda_service.LDA_PIPELINE_PARAMS_WORDS, {'lda__max_iter': args.lda_max_iter}):
+        lda_pipeline, _ = lda_service.fit_lda_pipeline_on_words(
+            comments, n_topics=args.n_topics, language=FRENCH, stopwords=SYNTHETIC_STOPWORDS)
+
+    for max_batch_size in [1, args.max_batch_size]:
+        asyncio.run(load_test(lda_pipeline, comments, args, max_batch_size))
+
+
+if __name__ == "__main__":
+    main()
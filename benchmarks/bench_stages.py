@@ -0,0 +1,192 @@
+"""
+Stage-level and end-to-end benchmark suite on a synthetic corpus.
+
+Every stage of the pipelines (`StopWordsRemover`, `Stemmer`, `CountVectorizer`, `LetterNGramVectorizer`, `LDA`) is
+timed on its own, on the output of the previous stage, then every entry point of `lda_service` is timed end-to-end. The
+results are written as JSON (with the git commit and the versions of the dependencies) so as to compare them across
+commits:
+
+    python -m benchmarks.bench_stages --n-comments 20000 --output before.json
+    git checkout some-branch
+    python -m benchmarks.bench_stages --n-comments 20000 --output after.json --compare before.json
+
+The LDA is trained for `--lda-max-iter` iterations instead of the pipelines' 750, to keep the suite quick.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+import scipy
+import sklearn
+
+from artifici_lda import lda_service
+from artifici_lda.data_utils import get_params_from_prefix_dict
+from artifici_lda.logic.count_vectorizer import CountVectorizer
+from artifici_lda.logic.lda import LDA
+from artifici_lda.logic.letter_ngram_vectorizer import LetterNGramVectorizer
+from artifici_lda.logic.stemmer import Stemmer
+from artifici_lda.logic.stop_words_remover import StopWordsRemover
+from benchmarks.synthetic_corpus import ENGLISH, FRENCH, MIXED, SYNTHETIC_STOPWORDS, make_synthetic_corpus
+
+STAGE = 'stage'
+ENTRY_POINT = 'entry_point'
+
+
+def time_repeated(function, repeat):
+    """
+    :return: the durations (in seconds) of `repeat` calls to function, and the result of the last call.
+    """
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return durations, result
+
+
+def bench_stages(comments, language, lda_params, repeat):
+    count_vect_params = get_params_from_prefix_dict('count_vect__', lda_service.LDA_PIPELINE_PARAMS_WORDS)
+    letters_count_vect_params = get_params_from_prefix_dict('count_vect__', lda_service.LDA_PIPELINE_PARAMS_LETTERS)
+
+    stages = [
+        ("StopWordsRemover", lambda docs: StopWordsRemover(stopwords=SYNTHETIC_STOPWORDS).fit_transform(docs)),
+        ("Stemmer", lambda docs: Stemmer(language=language).fit_transform(docs)),
+        ("CountVectorizer", lambda docs: CountVectorizer(**count_vect_params).fit_transform(docs)),
+        ("LDA", lambda docs: LDA(**lda_params).fit_transform(docs)),
+    ]
+    results = []
+    docs = comments
+    for name, run in stages:
+        durations, docs = time_repeated(lambda: run(docs), repeat)
+        results.append((name, durations))
+
+    cleaned_comments = StopWordsRemover(stopwords=SYNTHETIC_STOPWORDS).fit_transform(comments)
+    durations, _ = time_repeated(
+        lambda: LetterNGramVectorizer(**letters_count_vect_params).fit_transform(cleaned_comments), repeat)
+    results.append(("LetterNGramVectorizer", durations))
+    return [(name, STAGE, durations) for name, durations in results]
+
+
+def bench_entry_points(comments, language, n_topics, repeat):
+    kwargs = dict(n_topics=n_topics, stopwords=SYNTHETIC_STOPWORDS)
+    entry_points = [
+        ("train_lda_pipeline_default",
+         lambda: lda_service.train_lda_pipeline_default(comments, language=language, **kwargs)),
+        ("train_lda_pipeline_on_words",
+         lambda: lda_service.train_lda_pipeline_on_words(comments, language=language, **kwargs)),
+        ("train_lda_pipeline_on_words_streaming",
+         lambda: lda_service.train_lda_pipeline_on_words_streaming(iter(comments), language=language, **kwargs)),
+        ("train_lda_pipeline_on_letters",
+         lambda: lda_service.train_lda_pipeline_on_letters(comments, **kwargs)),
+        ("select_n_topics_on_words",
+         lambda: lda_service.select_n_topics_on_words(
+             comments, [n_topics, n_topics + 1], language=language, stopwords=SYNTHETIC_STOPWORDS)),
+    ]
+    results = [(name, ENTRY_POINT, time_repeated(run, repeat)[0]) for name, run in entry_points]
+
+    lda_pipeline, _ = lda_service.fit_lda_pipeline_on_words(comments, language=language, **kwargs)
+    durations, _ = time_repeated(lambda: lda_service.predict_topics(lda_pipeline, comments), repeat)
+    results.append(("predict_topics", ENTRY_POINT, durations))
+    return results
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    comments = make_synthetic_corpus(
+        args.n_comments, language=args.language, vocabulary_size=args.vocabulary_size,
+        mean_length=args.mean_length, duplicate_rate=args.duplicate_rate, seed=args.seed)
+    stemmer_language = ENGLISH if args.language == ENGLISH else FRENCH
+    lda_params = get_params_from_prefix_dict('lda__', lda_service.LDA_PIPELINE_PARAMS_WORDS)
+    lda_params.update(n_components=args.n_topics, max_iter=args.lda_max_iter)
+
+    results = bench_stages(comments, stemmer_language, lda_params, args.repeat)
+    if not args.stages_only:
+        with mock.patch.dict(lda_service.LDA_PIPELINE_PARAMS_WORDS, {'lda__max_iter': args.lda_max_iter}), \
+                mock.patch.dict(lda_service.LDA_PIPELINE_PARAMS_LETTERS, {'lda__max_iter': args.lda_max_iter}):
+            results += bench_entry_points(comments, stemmer_language, args.n_topics, args.repeat)
+
+    return {
+        'commit': get_git_commit(),
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'scikit-learn': sklearn.__version__,
+        },
+        'corpus': {
+            'n_comments': args.n_comments,
+            'n_characters': sum(len(comment) for comment in comments),
+            'language': args.language,
+            'vocabulary_size': args.vocabulary_size,
+            'mean_length': args.mean_length,
+            'duplicate_rate': args.duplicate_rate,
+            'seed': args.seed,
+        },
+        'n_topics': args.n_topics,
+        'lda_max_iter': args.lda_max_iter,
+        'results': [
+            {'name': name, 'kind': kind, 'best_seconds': min(durations), 'seconds': durations}
+            for name, kind, durations in results
+        ],
+    }
+
+
+def print_report(report, previous_report=None):
+    previous_seconds = {}
+    if previous_report is not None:
+        previous_seconds = {result['name']: result['best_seconds'] for result in previous_report['results']}
+        print("compared to commit {}".format(previous_report.get('commit')))
+    for result in report['results']:
+        line = "{:>12} {:>40}: {:9.3f} s".format(result['kind'], result['name'], result['best_seconds'])
+        if result['name'] in previous_seconds:
+            line += "  ({:.2f}x faster)".format(previous_seconds[result['name']] / result['best_seconds'])
+        print(line, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-comments", type=int, default=5000)
+    parser.add_argument("--language", choices=[FRENCH, ENGLISH, MIXED], default=MIXED)
+    parser.add_argument("--vocabulary-size", type=int, default=5000)
+    parser.add_argument("--mean-length", type=int, default=20)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--n-topics", type=int, default=5)
+    parser.add_argument("--lda-max-iter", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="the best of the repeated timings is reported.")
+    parser.add_argument("--stages-only", action="store_true", help="don't time the entry points of lda_service.")
+    parser.add_argument("--output", help="the JSON file where to write the results (else, they're printed).")
+    parser.add_argument("--compare", help="a JSON file of previous results, to print the speedups against.")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    previous_report = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous_report = json.load(f)
+    print_report(report, previous_report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Throughput benchmark of the compiled stop words removal engine against the original character-by-character one.
+
+Run with: `python -m benchmarks.bench_stop_words_remover`
+"""
+
+import random
+import time
+
+from artifici_lda.logic.stop_words_engine import CompiledStopWords, remove_stopwords_char_by_char
+from testing.const_utils import CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, TEST_STOPWORDS
+
+
+def make_comments(n_comments, with_accents, seed=0):
+    rng = random.Random(seed)
+    words = " ".join(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL).split(" ") + TEST_STOPWORDS + ["l'ete", "d'oeufs"]
+    if with_accents:
+        words += ["l'été", "très", "d'œufs"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(3, 40))) for _ in range(n_comments)]
+
+
+def time_removal(remove, comments):
+    start = time.perf_counter()
+    cleaned = [remove(comment) for comment in comments]
+    return time.perf_counter() - start, cleaned
+
+
+def bench(comments):
+    n_comments = len(comments)
+    n_chars = sum(len(c) for c in comments)
+    compiled_stopwords = CompiledStopWords(TEST_STOPWORDS)
+
+    char_by_char_time, expected = time_removal(
+        lambda comment: remove_stopwords_char_by_char(comment, compiled_stopwords.safe_stopwords), comments)
+    compiled_time, obtained = time_removal(compiled_stopwords.remove_from_string, comments)
+    assert expected == obtained
+
+    print("{} comments, {} characters ({:.0%} of them non-ASCII)".format(
+        n_comments, n_chars, sum(not c.isascii() for c in comments) / n_comments))
+    for name, duration in [("char by char", char_by_char_time), ("compiled", compiled_time)]:
+        print("{:>14}: {:8.3f} s, {:12.0f} chars/s".format(name, duration, n_chars / duration))
+    print("speedup: {:.1f}x".format(char_by_char_time / compiled_time))
+
+
+def main(n_comments=20000):
+    for with_accents in [False, True]:
+        bench(make_comments(n_comments, with_accents))
+        print("")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Generator of large synthetic French/English comment corpora for the benchmarks.
+
+The comments are made of stop words and of content words drawn from a Zipf-like distribution (like in real text,
+a few words are very frequent and most are rare). The content words are built from real roots with inflection
+suffixes, so that the stemmer has real work to do, and some of them are accented.
+"""
+
+import random
+
+FRENCH = 'french'
+ENGLISH = 'english'
+MIXED = 'mixed'
+
+FRENCH_STOPWORDS = ["le", "la", "les", "un", "une", "de", "des", "du", "et", "est", "sur", "dans", "pour", "que",
+                    "qui", "pas", "tres", "donc", "mais", "avec", "ce", "il", "elle", "on", "je", "tu", "nous"]
+ENGLISH_STOPWORDS = ["the", "a", "an", "of", "and", "is", "on", "in", "for", "that", "who", "not", "very", "so",
+                     "but", "with", "this", "it", "he", "she", "we", "i", "you", "they", "to", "was", "are"]
+SYNTHETIC_STOPWORDS = FRENCH_STOPWORDS + ENGLISH_STOPWORDS
+
+_ROOTS = {
+    FRENCH: ["chat", "chien", "maison", "voiture", "école", "été", "forêt", "café", "marché", "travail", "pomme",
+             "fleur", "rivière", "montagne", "ville", "musique", "livre", "fenêtre", "prix", "service", "client",
+             "problème", "qualité", "livraison", "équipe", "réponse", "commande", "employé", "sécurité", "hôtel"],
+    ENGLISH: ["cat", "dog", "house", "car", "school", "summer", "forest", "coffee", "market", "work", "apple",
+              "flower", "river", "mountain", "city", "music", "book", "window", "price", "service", "customer",
+              "problem", "quality", "delivery", "team", "answer", "order", "employee", "safety", "hotel"],
+}
+_SUFFIXES = {
+    FRENCH: ["", "s", "e", "es", "er", "ement", "ier", "iers", "ière", "é", "ées", "aient", "ons", "eux", "ité"],
+    ENGLISH: ["", "s", "es", "ed", "ing", "er", "ers", "ly", "ness", "ful", "less", "ment", "ation", "y", "ish"],
+}
+_SYLLABLES = ["ba", "ko", "ri", "ta", "mu", "zé", "lo", "vi", "na", "pè", "do", "su", "gra", "fli", "tro"]
+
+
+def make_vocabulary(language, vocabulary_size, seed=0):
+    """
+    Make a list of distinct content words.
+
+    :param language: `FRENCH`, `ENGLISH` or `MIXED` (half of the words of each language).
+    :param vocabulary_size: the number of content words.
+    :param seed: the seed of the random generator.
+    :return: a list of vocabulary_size words, from the most frequent to the least frequent one.
+    """
+    rng = random.Random(seed)
+    languages = [FRENCH, ENGLISH] if language == MIXED else [language]
+    words = []
+    seen = set()
+    while len(words) < vocabulary_size:
+        lang = languages[len(words) % len(languages)]
+        root = rng.choice(_ROOTS[lang])
+        if rng.random() < 0.5:
+            # A made-up root, to grow the vocabulary beyond the real roots' inflections.
+            root = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3))) + root
+        word = root + rng.choice(_SUFFIXES[lang])
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def make_synthetic_corpus(n_comments, language=MIXED, vocabulary_size=5000, mean_length=20, duplicate_rate=0.0,
+                          stopwords_rate=0.3, seed=0):
+    """
+    Make a synthetic corpus of comments.
+
+    :param n_comments: the number of comments.
+    :param language: `FRENCH`, `ENGLISH` or `MIXED`.
+    :param vocabulary_size: the number of distinct content words.
+    :param mean_length: the mean number of words per comment.
+    :param duplicate_rate: the fraction of the comments that are exact copies of a previous comment.
+    :param stopwords_rate: the fraction of the words that are stop words (from `SYNTHETIC_STOPWORDS`).
+    :param seed: the seed of the random generator.
+    :return: a list of n_comments strings.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(language, vocabulary_size, seed=seed)
+    cumulative_weights = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        cumulative_weights.append(total)
+    stopwords = (FRENCH_STOPWORDS if language == FRENCH else
+                 ENGLISH_STOPWORDS if language == ENGLISH else SYNTHETIC_STOPWORDS)
+
+    comments = []
+    for _ in range(n_comments):
+        if comments and rng.random() < duplicate_rate:
+            comments.append(rng.choice(comments))
+            continue
+        length = max(1, int(rng.expovariate(1.0 / mean_length) + 0.5))
+        n_stopwords = sum(rng.random() < stopwords_rate for _ in range(length))
+        words = rng.choices(vocabulary, cum_weights=cumulative_weights, k=length - n_stopwords)
+        words += rng.choices(stopwords, k=n_stopwords)
+        rng.shuffle(words)
+        if words:
+            words[0] = words[0].capitalize()
+        comments.append(" ".join(words) + rng.choice(["", ".", "!", "?", " :)"]))
+    return comments
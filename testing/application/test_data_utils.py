@@ -1,4 +1,7 @@
-from artifici_lda.data_utils import link_topics_and_weightings
+import numpy as np
+
+from artifici_lda.data_utils import TopCommentsAccumulator, get_top_comments, get_top_k_comments, iter_batches, \
+    link_topics_and_weightings
 
 
 def test_link_topics_and_weightings_works():
@@ -26,4 +29,35 @@ def test_link_topics_and_weightings_works():
     print(expected_words_and_topics_linked)
     print(obtained_words_and_topics_linked)
 
-    assert expected_words_and_topics_linked == obtained_words_and_topics_linked
\ No newline at end of file
+    assert expected_words_and_topics_linked == obtained_words_and_topics_linked
+
+
+def test_get_top_k_comments_is_same_as_sorting_every_comment():
+    rng = np.random.RandomState(0)
+    # Rounded probabilities, so that there are ties.
+    transformed_comments = np.round(rng.dirichlet([0.5] * 3, size=200), 1)
+    comments = ["comment {}".format(i) for i in range(len(transformed_comments))]
+
+    top_comments = get_top_k_comments(comments, transformed_comments, 5)
+
+    expected_top_comments = [
+        [comments[i] for i in sorted(range(len(comments)), key=lambda i: -transformed_comments[i, topic])[:5]]
+        for topic in range(3)]
+    assert top_comments == expected_top_comments
+    assert [topic_top_comments[0] for topic_top_comments in top_comments] == \
+        get_top_comments(comments, transformed_comments)
+    assert get_top_k_comments(comments[:2], transformed_comments[:2], 5) == \
+        get_top_k_comments(comments[:2], transformed_comments[:2], 2)
+
+
+def test_top_comments_accumulator_on_chunks_is_same_as_get_top_k_comments():
+    rng = np.random.RandomState(0)
+    transformed_comments = np.round(rng.dirichlet([0.5] * 3, size=200), 1)
+    comments = ["comment {}".format(i) for i in range(len(transformed_comments))]
+
+    accumulator = TopCommentsAccumulator(n_topics=3, k=5)
+    for chunk in iter_batches(range(len(comments)), 17):
+        accumulator.update(comments[chunk[0]:chunk[-1] + 1], transformed_comments[chunk[0]:chunk[-1] + 1])
+
+    assert accumulator.n_comments_seen == len(comments)
+    assert accumulator.get_top_comments() == get_top_k_comments(comments, transformed_comments, 5)
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from scipy.special import psi
+
+from artifici_lda.inference import InferenceModel, digamma
+from artifici_lda.lda_service import fit_lda_pipeline_on_words, fit_lda_pipeline_on_letters
+from artifici_lda.logic.language_routing_stemmer import AUTO, LANGUAGE_MARKERS
+from artifici_lda.logic.stemmer import ENGLISH, FRENCH
+from artifici_lda.persistence import save_lda_pipeline
+from testing.const_utils import \
+    CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH, \
+    CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, \
+    TEST_STOPWORDS
+
+
+# Stop words that remove every marker of the languages, which are detected before the stop words removal.
+STOPWORDS_WITH_LANGUAGE_MARKERS = TEST_STOPWORDS + sorted(LANGUAGE_MARKERS[FRENCH] | LANGUAGE_MARKERS[ENGLISH])
+
+
+@pytest.mark.parametrize("comments, language, stopwords, dtype", [
+    (CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, FRENCH, TEST_STOPWORDS, None),
+    (CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH, AUTO, TEST_STOPWORDS, None),
+    (CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH, AUTO, STOPWORDS_WITH_LANGUAGE_MARKERS, None),
+    (CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, FRENCH, TEST_STOPWORDS, np.float32),
+])
+def test_inference_model_transforms_like_the_saved_pipeline(tmp_path, comments, language, stopwords, dtype):
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        comments, n_topics=2, stopwords=stopwords, language=language, dtype=dtype)
+    save_lda_pipeline(lda_pipeline, str(tmp_path))
+    new_comments = comments + ["", "Un chat inconnu", "Le chien et le chat ! Les chiens."]
+
+    transformed_comments = InferenceModel.load(str(tmp_path)).transform(new_comments)
+
+    expected_transformed_comments = lda_pipeline.transform(new_comments)
+    assert transformed_comments.dtype == expected_transformed_comments.dtype
+    # The float32 results may differ by a rounding of float32, which is about 1e-7 on probabilities.
+    atol = 1e-6 if dtype == np.float32 else 1e-7
+    assert np.allclose(transformed_comments, expected_transformed_comments, rtol=0, atol=atol)
+
+
+def test_inference_model_only_loads_pipelines_on_words(tmp_path):
+    lda_pipeline, _ = fit_lda_pipeline_on_letters(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS)
+    save_lda_pipeline(lda_pipeline, str(tmp_path))
+
+    with pytest.raises(ValueError):
+        InferenceModel.load(str(tmp_path))
+
+
+def test_inference_module_does_not_import_scikit_learn():
+    imported_modules = subprocess.check_output([
+        sys.executable, "-c", "import sys, artifici_lda.inference; print(' '.join(sys.modules))"]).decode().split()
+
+    assert 'artifici_lda.inference' in imported_modules
+    assert not [module for module in imported_modules if module.split(".")[0] in ("sklearn", "scipy", "joblib")]
+
+
+def test_digamma():
+    x = np.concatenate([np.logspace(-3, 6, 1000), [1.0, 0.5, 1.4616321449683623]])
+
+    assert np.allclose(digamma(x), psi(x), rtol=0, atol=1e-10)
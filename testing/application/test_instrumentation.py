@@ -0,0 +1,25 @@
+import tracemalloc
+
+from artifici_lda.instrumentation import measure_stage
+
+
+def test_measure_stage_leaves_the_peak_of_a_tracing_caller_untouched_and_reports_none():
+    tracemalloc.start()
+    try:
+        big_list = [0] * 10 ** 6
+        del big_list
+        _, callers_peak = tracemalloc.get_traced_memory()
+
+        result, stats = measure_stage("join", " ".join, ["chats", "chiens"])
+
+        assert tracemalloc.is_tracing()
+        assert tracemalloc.get_traced_memory()[1] >= callers_peak
+    finally:
+        tracemalloc.stop()
+    assert result == "chats chiens" and stats.name == "join" and stats.input_size == 11 and stats.output_size == 12
+    assert stats.peak_memory is None
+
+    _, stats = measure_stage("list", lambda n: [0] * n, 10 ** 6, get_size=lambda _: 0)
+
+    assert not tracemalloc.is_tracing()
+    assert stats.peak_memory >= 8 * 10 ** 6
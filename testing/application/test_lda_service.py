@@ -1,6 +1,25 @@
+import copy
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from artifici_lda.data_utils import get_top_comments
+from artifici_lda import lda_service
 from artifici_lda.lda_service import \
+    LETTERS, \
+    WORDS, \
+    fit_lda_pipeline_on_letters, \
+    fit_lda_pipeline_on_words, \
+    predict_topics, \
+    prune_inverse_stemming_to_vocabulary, \
+    select_n_topics_on_words, \
     train_lda_pipeline_default, \
-    train_lda_pipeline_on_words
+    train_lda_pipeline_on_letters, \
+    train_lda_pipeline_on_words, \
+    train_lda_pipeline_on_words_streaming, \
+    update_lda_pipeline
+from artifici_lda.logic.doc_term_matrix import load_doc_term_matrix
 from artifici_lda.logic.stemmer import FRENCH
 from testing.const_utils import \
     CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, \
@@ -68,3 +87,249 @@ def test_lda_can_cluster_text_with_no_important_words_but_based_on_letters():
     # Something weird happened, let's see the transformed comments:
     # assert category[0] == 1 - category[2]
     # assert category[1] == 1 - category[3]
+
+
+def test_lda_can_cluster_obvious_text_with_parallel_preprocessing():
+    transformed_comments, _, topics_and_words_1_gram, _ = train_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL,
+        n_topics=2,
+        stopwords=TEST_STOPWORDS,
+        language=FRENCH,
+        preprocessing_n_jobs=2)
+
+    assert (
+            (transformed_comments.argmax(-1) == CATS_DOGS_LABELS_A).all() or
+            (transformed_comments.argmax(-1) == CATS_DOGS_LABELS_B).all()
+    ), "Error. Got {}".format(transformed_comments, transformed_comments.argmax(-1))
+    topic_a_words = set([word for word, word_weight in topics_and_words_1_gram[0]])
+    topic_b_words = set([word for word, word_weight in topics_and_words_1_gram[1]])
+    assert ((topic_a_words == CATS_TOP_WORDS and topic_b_words == DOGS_TOP_WORDS) or
+            (topic_b_words == CATS_TOP_WORDS and topic_a_words == DOGS_TOP_WORDS))
+
+
+def test_lda_can_cluster_obvious_text_streamed_from_a_generator(tmp_path):
+    transformed_comments, top_comments, topics_and_words_1_gram, _ = train_lda_pipeline_on_words_streaming(
+        (comment for comment in CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL),
+        n_topics=2,
+        stopwords=TEST_STOPWORDS,
+        language=FRENCH,
+        batch_size=4,
+        doc_term_matrix_directory=str(tmp_path))
+
+    assert (
+            (transformed_comments.argmax(-1) == CATS_DOGS_LABELS_A).all() or
+            (transformed_comments.argmax(-1) == CATS_DOGS_LABELS_B).all()
+    ), "Error. Got {}".format(transformed_comments, transformed_comments.argmax(-1))
+    assert top_comments == get_top_comments(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, transformed_comments)
+    assert load_doc_term_matrix(str(tmp_path)).shape[0] == len(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)
+    topic_a_words = set([word for word, word_weight in topics_and_words_1_gram[0]])
+    topic_b_words = set([word for word, word_weight in topics_and_words_1_gram[1]])
+    assert ((topic_a_words == CATS_TOP_WORDS and topic_b_words == DOGS_TOP_WORDS) or
+            (topic_b_words == CATS_TOP_WORDS and topic_a_words == DOGS_TOP_WORDS))
+
+
+def test_predict_topics_of_new_comments_leaves_the_fitted_pipeline_untouched():
+    lda_pipeline, transformed_comments = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL,
+        n_topics=2,
+        stopwords=TEST_STOPWORDS,
+        language=FRENCH)
+    stemmer_state = copy.deepcopy(lda_pipeline.named_steps['stemmer'].stemmed_word_to_equiv_word_count)
+    components = lda_pipeline.named_steps['lda'].components_.copy()
+    new_comments = ["Un chat", "Des chiens", "Les chiens et les chats, des inconnus"]
+
+    predicted, batch_latencies = predict_topics(lda_pipeline, CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL + new_comments,
+                                                batch_size=4)
+
+    assert np.allclose(transformed_comments, predicted[:len(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)])
+    assert predicted.shape == (len(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL) + len(new_comments), 2)
+    assert len(batch_latencies) == 3
+    assert stemmer_state == lda_pipeline.named_steps['stemmer'].stemmed_word_to_equiv_word_count
+    assert (components == lda_pipeline.named_steps['lda'].components_).all()
+
+
+def test_default_pipeline_reports_the_mode_it_chose():
+    chosen_modes = []
+
+    train_lda_pipeline_default(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL,
+        n_topics=2,
+        stopwords=TEST_STOPWORDS,
+        language=FRENCH,
+        mode_callback=lambda mode, seconds_saved: chosen_modes.append((mode, seconds_saved)))
+    train_lda_pipeline_default(
+        ["abababababa le abba du", "ababababa le aba du", "ggbgbg bgbbbg du gbbbggbgb", "bgbg du gggb le bbbg"],
+        n_topics=2,
+        stopwords=TEST_STOPWORDS,
+        language=FRENCH,
+        mode_callback=lambda mode, seconds_saved: chosen_modes.append((mode, seconds_saved)))
+
+    assert chosen_modes[0] == (WORDS, 0.0)
+    assert chosen_modes[1][0] == LETTERS
+    assert chosen_modes[1][1] > 0.0
+
+
+def test_default_pipeline_raises_the_pruning_errors_instead_of_falling_back_to_letters():
+    chosen_modes = []
+    train_lda_pipeline_default(
+        ["abababababa le abba du", "ababababa le aba du", "ggbgbg bgbbbg du gbbbggbgb", "bgbg du gggb le bbbg"],
+        n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH, prune_inverse_stemming=True,
+        mode_callback=lambda mode, _: chosen_modes.append(mode))
+    assert chosen_modes == [LETTERS]
+
+    with mock.patch.object(lda_service, 'prune_inverse_stemming_to_vocabulary', side_effect=ValueError("pruning")):
+        with pytest.raises(ValueError, match="pruning"):
+            train_lda_pipeline_default(
+                CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH,
+                prune_inverse_stemming=True)
+
+
+def test_early_stopping_is_enabled_per_call():
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH,
+        early_stopping=True)
+    letters_pipeline, _ = fit_lda_pipeline_on_letters(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, early_stopping=True)
+
+    for lda in [lda_pipeline.named_steps['lda'], letters_pipeline.named_steps['lda']]:
+        assert lda.early_stopping and lda.n_iter_ < lda.max_iter
+    assert not lda_service.LDA_PIPELINE_PARAMS_WORDS['lda__early_stopping']
+
+
+def test_select_n_topics_on_words_keeps_the_candidate_of_lowest_perplexity():
+    lda_pipeline, perplexities = select_n_topics_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL,
+        n_topics_candidates=[2, 3, 4],
+        stopwords=TEST_STOPWORDS,
+        language=FRENCH,
+        n_jobs=2)
+
+    assert sorted(perplexities.keys()) == [2, 3, 4]
+    best_n_topics = min(perplexities, key=perplexities.get)
+    assert lda_pipeline.named_steps['lda'].n_components == best_n_topics
+    # The candidates were scored on held-out comments, and the best one was then fitted on every comment.
+    assert all(np.isfinite(perplexity) and perplexity > 0 for perplexity in perplexities.values())
+    assert lda_pipeline.named_steps['lda'].n_documents_seen_ == len(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)
+    transformed_comments = lda_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)
+    assert transformed_comments.shape == (len(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL), best_n_topics)
+
+
+def test_stats_callback_gets_the_stats_of_each_step():
+    words_stats = []
+    letters_stats = []
+
+    transformed_comments, _, _, _ = train_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH,
+        stats_callback=words_stats.append)
+    train_lda_pipeline_on_letters(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS,
+        stats_callback=letters_stats.append)
+
+    assert [stats.name for stats in words_stats] == ['stopwords', 'stemmer', 'count_vect', 'lda']
+    assert [stats.name for stats in letters_stats] == ['stopwords', 'count_vect', 'lda']
+    assert words_stats[0].input_size == sum(len(comment) for comment in CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)
+    assert words_stats[-1].output_size == transformed_comments.size
+    for stats in words_stats + letters_stats:
+        assert stats.wall_time >= 0 and stats.cpu_time >= 0 and stats.peak_memory >= 0
+        assert (stats.n_iter is not None) == (stats.name == 'lda')
+    assert words_stats[-1].n_iter > 0
+
+
+def test_pruned_inverse_stemming_gives_the_same_topics_in_less_memory():
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH)
+    stemmer = lda_pipeline.named_steps['stemmer']
+    unpruned_state = copy.deepcopy(stemmer.stemmed_word_to_equiv_word_count)
+    topics = lda_pipeline.inverse_transform(Xt=None)
+    stats = []
+
+    memory_before, memory_after = prune_inverse_stemming_to_vocabulary(lda_pipeline)
+    train_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH,
+        stats_callback=stats.append, prune_inverse_stemming=True)
+
+    assert lda_pipeline.inverse_transform(Xt=None) == topics
+    assert memory_after < memory_before
+    assert set(stemmer.get_equiv_word_counts()) < set(unpruned_state)
+    assert [s.name for s in stats] == ['stopwords', 'stemmer', 'count_vect', 'prune_inverse_stemming', 'lda']
+    assert stats[3].output_size < stats[3].input_size
+
+
+def test_update_lda_pipeline_keeps_training_on_new_comments_only():
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH)
+    prune_inverse_stemming_to_vocabulary(lda_pipeline)
+    n_features = len(lda_pipeline.named_steps['count_vect'].vocabulary_)
+    new_comments = ["Les chats dorment", "Un chat dort", "Les chiens jouent", "Deux chiens jouent"]
+
+    lda_pipeline, transformed_new_comments = update_lda_pipeline(
+        lda_pipeline, new_comments, n_passes=10, prune_inverse_stemming=True)
+
+    lda = lda_pipeline.named_steps['lda']
+    vocabulary = lda_pipeline.named_steps['count_vect'].vocabulary_
+    assert transformed_new_comments.shape == (len(new_comments), 2)
+    assert {'chien jouent', 'jouent'} <= set(vocabulary) and len(vocabulary) > n_features
+    assert lda.components_.shape == (2, len(vocabulary)) and lda.n_features_in_ == len(vocabulary)
+    assert lda.n_documents_seen_ == len(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL) + len(new_comments)
+    assert lda_pipeline.named_steps['stemmer'].find_orig_word_and_count('chat') == ('chats', 3)
+    assert lda_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL + new_comments).shape == (10, 2)
+
+
+@mock.patch.dict(lda_service.LDA_PIPELINE_PARAMS_WORDS, {'lda__random_state': 0})
+def test_update_lda_pipeline_keeps_the_topics_of_the_old_comments_on_one_sided_new_comments():
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL * 20, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH)
+    topics = lda_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL).argmax(-1)
+    assert (topics == CATS_DOGS_LABELS_A).all() or (topics == CATS_DOGS_LABELS_B).all()
+    new_dogs_comments = ["Un chien aboie", "Les chiens jouent", "Deux chiens courent", "Le chien dort", "Un super-chien",
+                         "Les chiens aboient", "Un chien joue", "Le chien court", "Deux super-chiens"]
+
+    lda_pipeline, _ = update_lda_pipeline(lda_pipeline, new_dogs_comments)
+
+    assert (lda_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL).argmax(-1) == topics).all()
+
+
+def test_float32_pipelines_cluster_obvious_text_in_float32_from_end_to_end():
+    words_pipeline, words_transformed_comments = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH,
+        dtype=np.float32)
+    letters_pipeline, letters_transformed_comments = fit_lda_pipeline_on_letters(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, dtype=np.float32)
+
+    for lda_pipeline, transformed_comments in [(words_pipeline, words_transformed_comments),
+                                               (letters_pipeline, letters_transformed_comments)]:
+        lda = lda_pipeline.named_steps['lda']
+        assert transformed_comments.dtype == np.float32
+        assert lda.components_.dtype == np.float32 and lda.exp_dirichlet_component_.dtype == np.float32
+        assert lda_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL).dtype == np.float32
+    assert ((words_transformed_comments.argmax(-1) == CATS_DOGS_LABELS_A).all() or
+            (words_transformed_comments.argmax(-1) == CATS_DOGS_LABELS_B).all())
+    topics = words_pipeline.inverse_transform(Xt=None)
+    assert set(topics[0]) | set(topics[1]) >= CATS_TOP_WORDS | DOGS_TOP_WORDS
+
+
+def test_deduplicated_training_gives_one_row_per_comment_and_counts_the_duplicates():
+    comments = CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL + [
+        "  " + comment.upper() + " " for comment in CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL]
+    stats = []
+
+    transformed_comments, top_comments, _, _ = train_lda_pipeline_on_words(
+        comments, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH, deduplicate=True,
+        stats_callback=stats.append)
+    letters_transformed_comments, _, _, _ = train_lda_pipeline_on_letters(
+        comments, n_topics=2, stopwords=TEST_STOPWORDS, deduplicate=True)
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        comments, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH, deduplicate=True)
+    not_deduplicated_lda_pipeline, _ = fit_lda_pipeline_on_words(
+        comments, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH)
+
+    for transformed in [transformed_comments, letters_transformed_comments]:
+        assert transformed.shape == (len(comments), 2)
+        assert (transformed[:6] == transformed[6:]).all()
+    assert lda_pipeline.named_steps['count_vect'].vocabulary_ == \
+        not_deduplicated_lda_pipeline.named_steps['count_vect'].vocabulary_
+    assert set(top_comments) <= set(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)
+    assert [s.name for s in stats] == ['deduplicate', 'stopwords', 'stemmer', 'count_vect', 'lda']
+    assert stats[0].output_size < stats[0].input_size
+    # "chats" is in 2 comments, and "CHATS" counts as "chats" in their duplicates.
+    assert lda_pipeline.named_steps['stemmer'].find_orig_word_and_count('chat') == ('chats', 2 * 2)
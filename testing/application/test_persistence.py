@@ -0,0 +1,69 @@
+import numpy as np
+
+from artifici_lda.lda_service import fit_lda_pipeline_on_words, fit_lda_pipeline_on_letters
+from artifici_lda.logic.language_routing_stemmer import AUTO
+from artifici_lda.logic.stemmer import FRENCH
+from artifici_lda.persistence import save_lda_pipeline, load_lda_pipeline, save_strings, load_strings
+from testing.const_utils import \
+    CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH, \
+    CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, \
+    TEST_STOPWORDS
+
+
+def test_saved_then_loaded_pipeline_on_words_transforms_the_same(tmp_path):
+    lda_pipeline, transformed_comments = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL,
+        n_topics=2,
+        stopwords=TEST_STOPWORDS,
+        language=FRENCH)
+
+    save_lda_pipeline(lda_pipeline, str(tmp_path))
+    loaded_pipeline = load_lda_pipeline(str(tmp_path))
+
+    assert isinstance(loaded_pipeline.named_steps['lda'].components_, np.memmap)
+    assert np.allclose(transformed_comments, loaded_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL))
+    assert lda_pipeline.inverse_transform(Xt=None) == loaded_pipeline.inverse_transform(Xt=None)
+    assert list(lda_pipeline.named_steps['stemmer'].stemmed_word_to_equiv_word_count.items()) == \
+        list(loaded_pipeline.named_steps['stemmer'].stemmed_word_to_equiv_word_count.items())
+    assert lda_pipeline.named_steps['count_vect'].get_params() == \
+        loaded_pipeline.named_steps['count_vect'].get_params()
+
+
+def test_strings_are_saved_as_one_utf8_blob_and_their_offsets(tmp_path):
+    strings = ["chat", "", "élève", "caché", "super-chien"]
+
+    save_strings(strings, str(tmp_path), "words")
+
+    blob = np.load(str(tmp_path / "words.npy"))
+    assert blob.dtype == np.uint8 and blob.tobytes() == "".join(strings).encode("utf-8")
+    assert np.load(str(tmp_path / "words_offsets.npy")).tolist() == [0, 4, 4, 11, 17, 28]
+    assert load_strings(str(tmp_path), "words") == strings
+
+
+def test_saved_then_loaded_pipeline_on_letters_transforms_the_same(tmp_path):
+    lda_pipeline, transformed_comments = fit_lda_pipeline_on_letters(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL,
+        n_topics=2,
+        stopwords=TEST_STOPWORDS)
+
+    save_lda_pipeline(lda_pipeline, str(tmp_path))
+    loaded_pipeline = load_lda_pipeline(str(tmp_path), mmap_mode=None)
+
+    assert np.allclose(transformed_comments, loaded_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL))
+    # It can be trained further:
+    loaded_pipeline.named_steps['lda'].partial_fit(
+        loaded_pipeline[:-1].transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL))
+
+
+def test_saved_then_loaded_pipeline_routing_languages_transforms_the_same(tmp_path):
+    lda_pipeline, transformed_comments = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH,
+        n_topics=2,
+        stopwords=TEST_STOPWORDS,
+        language=AUTO)
+
+    save_lda_pipeline(lda_pipeline, str(tmp_path))
+    loaded_pipeline = load_lda_pipeline(str(tmp_path))
+
+    assert np.allclose(transformed_comments, loaded_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH))
+    assert lda_pipeline.inverse_transform(Xt=None) == loaded_pipeline.inverse_transform(Xt=None)
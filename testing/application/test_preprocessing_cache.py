@@ -0,0 +1,52 @@
+from unittest import mock
+
+import numpy as np
+
+from artifici_lda import lda_service
+from artifici_lda.lda_service import fit_lda_pipeline_on_words
+from artifici_lda.logic.language_routing_stemmer import AUTO
+from artifici_lda.logic.stemmer import FRENCH
+from artifici_lda.preprocessing_cache import PreprocessingCache
+from testing.const_utils import \
+    CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, \
+    TEST_STOPWORDS
+
+
+# The LDA is seeded so that both fits give the same topics, in the same order.
+@mock.patch.dict(lda_service.LDA_PIPELINE_PARAMS_WORDS, {'lda__random_state': 0})
+def test_cached_preprocessing_gives_the_same_pipeline(tmp_path):
+    cache = PreprocessingCache(str(tmp_path / "cache.sqlite"))
+    comments = CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL
+    lda_pipeline, transformed_comments = fit_lda_pipeline_on_words(
+        comments, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH)
+
+    fit_lda_pipeline_on_words(
+        comments[:4], n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH, preprocessing_cache=cache)
+    assert cache.get_stats()['n_misses'] == 4 and cache.get_stats()['n_hits'] == 0
+    stats = []
+    cached_lda_pipeline, cached_transformed_comments = fit_lda_pipeline_on_words(
+        comments, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH, preprocessing_cache=cache,
+        stats_callback=stats.append)
+
+    assert cache.get_stats()['n_hits'] == 4 and cache.get_stats()['n_misses'] == 4 + len(comments) - 4
+    assert [s.name for s in stats] == ['preprocessing_cache', 'count_vect', 'lda']
+    assert (cached_lda_pipeline.named_steps['stemmer'].stemmed_word_to_equiv_word_count ==
+            lda_pipeline.named_steps['stemmer'].stemmed_word_to_equiv_word_count)
+    assert (cached_lda_pipeline.named_steps['count_vect'].vocabulary_ ==
+            lda_pipeline.named_steps['count_vect'].vocabulary_)
+    assert np.allclose(cached_transformed_comments, transformed_comments)
+
+
+def test_cache_entries_depend_on_the_language_and_the_stopwords(tmp_path):
+    cache = PreprocessingCache(str(tmp_path / "cache.sqlite"))
+    comments = CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL
+    hit_rates = []
+    for language, stopwords in [(AUTO, TEST_STOPWORDS), (AUTO, TEST_STOPWORDS), (FRENCH, TEST_STOPWORDS),
+                                (FRENCH, TEST_STOPWORDS[1:])]:
+        cache.n_hits = cache.n_misses = 0
+        fit_lda_pipeline_on_words(
+            comments, n_topics=2, stopwords=stopwords, language=language, preprocessing_cache=cache,
+            deduplicate=True)
+        hit_rates.append(cache.get_stats()['hit_rate'])
+
+    assert hit_rates == [0.0, 1.0, 0.0, 0.0]
@@ -0,0 +1,108 @@
+import os
+import time
+from unittest import mock
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from artifici_lda import lda_service, result_cache
+from artifici_lda.lda_service import LETTERS, WORDS, train_lda_pipeline_default
+from artifici_lda.logic import stop_words_remover
+from artifici_lda.logic.stemmer import FRENCH
+from artifici_lda.result_cache import ResultCache, hash_training_inputs
+from testing.const_utils import \
+    CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, \
+    TEST_STOPWORDS
+
+
+def test_cached_training_returns_the_stored_results_and_mode(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    modes = []
+
+    results = train_lda_pipeline_default(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH, cache=cache,
+        mode_callback=lambda mode, _: modes.append(mode))
+    cached_results = train_lda_pipeline_default(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=list(reversed(TEST_STOPWORDS)), language=FRENCH,
+        cache=cache, mode_callback=lambda mode, seconds_saved: modes.append((mode, seconds_saved)))
+    train_lda_pipeline_default(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=3, stopwords=TEST_STOPWORDS, language=FRENCH, cache=cache)
+
+    assert (cached_results[0] == results[0]).all()
+    assert cached_results[1:] == results[1:]
+    assert modes == [WORDS, (WORDS, 0.0)]
+    assert len(os.listdir(str(tmp_path))) == 3  # The 2 entries, and the lock file.
+
+
+def test_cached_results_depend_on_the_default_stopwords_and_on_the_cache_version(tmp_path):
+    cache = ResultCache(str(tmp_path))
+
+    def train(default_stopwords):
+        with mock.patch.object(stop_words_remover, 'load_default_stopwords', return_value=default_stopwords), \
+                mock.patch.object(lda_service, 'load_default_stopwords', return_value=default_stopwords):
+            train_lda_pipeline_default(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, language=FRENCH, cache=cache)
+        return len([name for name in os.listdir(str(tmp_path)) if name.endswith(".npz")])
+
+    n_entries = [train(TEST_STOPWORDS), train(TEST_STOPWORDS), train(TEST_STOPWORDS + ["chats"])]
+    with mock.patch.object(result_cache, 'CACHE_VERSION', result_cache.CACHE_VERSION + 1):
+        n_entries.append(train(TEST_STOPWORDS))
+
+    assert n_entries == [1, 1, 2, 3]
+
+
+def test_cache_evicts_the_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size=10 ** 9)
+    keys = [hash_training_inputs(["comment"], n_topics=n_topics) for n_topics in range(4)]
+    for key in keys:
+        cache.put(key, {'transformed_comments': np.zeros((100, 10))}, {'mode': LETTERS})
+        time.sleep(0.01)
+    assert cache.get(keys[0]) is not None  # Now, keys[1] is the least recently used one.
+
+    cache.max_size = cache.get_size() - 1
+    n_removed = cache.evict()
+
+    assert n_removed == 1
+    assert cache.get(keys[1]) is None
+    assert all(cache.get(key) is not None for key in keys[:1] + keys[2:])
+
+
+def test_corrupted_entries_are_misses_and_are_removed(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    keys = [hash_training_inputs(["comment"], n_topics=n_topics) for n_topics in range(3)]
+    for key in keys:
+        cache.put(key, {'transformed_comments': np.zeros((100, 10))}, {'mode': WORDS})
+    path = os.path.join(str(tmp_path), keys[0] + ".npz")
+    with open(path, "rb") as f:
+        truncated_entry = f.read()[:100]
+    with open(path, "wb") as f:
+        f.write(truncated_entry)
+    np.savez(os.path.join(str(tmp_path), keys[1] + ".npz"), transformed_comments=np.zeros(3))  # No metadata.
+
+    assert cache.get(keys[0]) is None and cache.get(keys[1]) is None
+    assert sorted(os.listdir(str(tmp_path))) == [".lock", keys[2] + ".npz"]
+    assert cache.get(keys[2]) is not None
+
+
+def put_and_get_entries(directory, worker):
+    cache = ResultCache(directory, max_size=5 * 100 * 10 * 8)
+    n_hits = 0
+    for i in range(20):
+        key = hash_training_inputs(["comment"], n_topics=i % 8)
+        cache.put(key, {'transformed_comments': np.full((100, 10), i % 8)}, {'mode': WORDS, 'worker': worker})
+        cached = cache.get(key)
+        if cached is not None:
+            arrays, metadata = cached
+            assert (arrays['transformed_comments'] == i % 8).all() and metadata['mode'] == WORDS
+            n_hits += 1
+    return n_hits
+
+
+def test_cache_is_safe_to_share_between_processes(tmp_path):
+    n_hits = Parallel(n_jobs=4)(delayed(put_and_get_entries)(str(tmp_path), worker) for worker in range(4))
+
+    entries_sizes = [os.path.getsize(os.path.join(str(tmp_path), name)) for name in os.listdir(str(tmp_path))
+                     if name.endswith(".npz")]
+    assert sum(n_hits) > 0
+    # At most one entry can be added by another process while the last eviction runs.
+    assert sum(entries_sizes) <= 5 * 100 * 10 * 8 + max(entries_sizes)
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")]
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import numpy as np
+
+from artifici_lda.lda_service import fit_lda_pipeline_on_words
+from artifici_lda.logic.stemmer import FRENCH
+from artifici_lda.persistence import save_lda_pipeline, load_lda_pipeline
+from artifici_lda.server import TopicInferenceClient, TopicInferenceServer
+from testing.const_utils import \
+    CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, \
+    TEST_STOPWORDS
+
+
+def test_server_answers_concurrent_clients_with_micro_batches(tmp_path):
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH)
+    save_lda_pipeline(lda_pipeline, str(tmp_path))
+    loaded_pipeline = load_lda_pipeline(str(tmp_path))
+    expected_transformed_comments = lda_pipeline.transform(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)
+    requests = [CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL[i:i + 2] for i in range(0, 6, 2)] * 10
+
+    async def run():
+        server = await TopicInferenceServer(
+            loaded_pipeline, max_batch_size=8, max_batch_delay=0.01, n_workers=2).start()
+        clients = [await TopicInferenceClient.connect(port=server.port) for _ in range(3)]
+        try:
+            results = await asyncio.gather(*[
+                clients[i % len(clients)].predict(comments) for i, comments in enumerate(requests)])
+            stats = await clients[0].get_stats()
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b'{"id": "bad", "no comments": []}\n')
+            error_response = json.loads(await reader.readline())
+            writer.close()
+        finally:
+            for client in clients:
+                await client.close()
+            await server.close()
+        return results, stats, error_response
+
+    results, stats, error_response = asyncio.run(run())
+
+    for i, transformed_comments in enumerate(results):
+        assert np.allclose(transformed_comments, expected_transformed_comments[(i % 3) * 2:(i % 3) * 2 + 2])
+    assert stats['n_requests'] == len(requests) and stats['n_comments'] == 2 * len(requests)
+    # The requests were gathered in micro-batches of at most 4 requests of 2 comments.
+    assert len(requests) / 4 <= stats['n_batches'] < len(requests)
+    assert stats['queue_depth'] == 0
+    assert error_response['id'] == "bad" and error_response['error'].startswith("KeyError")
+    assert 0 < stats['latency_p50'] <= stats['latency_p90'] <= stats['latency_p99']
+
+
+def test_bad_requests_dont_fail_the_requests_batched_with_them():
+    lda_pipeline, _ = fit_lda_pipeline_on_words(
+        CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, n_topics=2, stopwords=TEST_STOPWORDS, language=FRENCH)
+    good_comments = CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL[:2]
+    expected_transformed_comments = lda_pipeline.transform(good_comments)
+    lines = [{'id': 0, 'comments': good_comments}, {'id': 1, 'comments': [None, "chat"]},
+             {'id': 2, 'comments': [3]}, {'id': 3, 'comments': "Les chats"}, {'id': 4, 'comments': good_comments}]
+
+    async def run():
+        server = await TopicInferenceServer(lda_pipeline, max_batch_size=100, max_batch_delay=0.05).start()
+        transform = server._transform
+
+        def failing_transform(comments):
+            if "boom" in comments:
+                raise ValueError("boom")
+            return transform(comments)
+
+        server._transform = failing_transform
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write("".join(json.dumps(line) + "\n" for line in lines).encode("utf-8"))
+            responses = [json.loads(await reader.readline()) for _ in lines]
+            writer.close()
+
+            # A request that fails the transform of its micro-batch only fails itself.
+            results = await asyncio.gather(
+                server.predict(good_comments), server.predict(["boom"]), server.predict(good_comments),
+                return_exceptions=True)
+        finally:
+            await server.close()
+        return {response['id']: response for response in responses}, results
+
+    responses, results = asyncio.run(run())
+
+    for request_id in [0, 4]:
+        assert np.allclose(responses[request_id]['topics'], expected_transformed_comments)
+    for request_id in [1, 2, 3]:
+        assert responses[request_id]['error'].startswith("ValueError")
+    assert np.allclose(results[0], expected_transformed_comments)
+    assert isinstance(results[1], ValueError)
+    assert np.allclose(results[2], expected_transformed_comments)
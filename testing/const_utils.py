@@ -9,6 +9,16 @@ CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL = [
     "Combien de chiens?"  # Dogs
 ]
 
+CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH = CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL + [
+    "The cats are running with the kittens",  # Cats
+    "My cat is very happy",  # Cats
+    "The cats are running and sleeping",  # Cats
+    "This dog is barking",  # Dogs
+    "Two dogs were barking",  # Dogs
+    "What running dogs!"  # Dogs
+]
+CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH_LANGUAGES = ['french'] * 6 + ['english'] * 6
+
 # FR-EN slang stopwords:
 TEST_STOPWORDS = ["le", "les", "la", "un", "de",
                   "a", "b", "c", "s",
@@ -1,4 +1,4 @@
-from artifici_lda.data_utils import get_params_from_prefix_dict
+from artifici_lda.data_utils import get_params_from_prefix_dict, iter_batches
 from artifici_lda.lda_service import LDA_PIPELINE_PARAMS_WORDS
 from artifici_lda.logic.count_vectorizer import CountVectorizer
 from testing.const_utils import \
@@ -32,3 +32,53 @@ def get_vectorized():
     cv = CountVectorizer(**count_vectorizer_params)  # param dict to named arguments.
     vectorized = cv.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED).toarray()
     return cv, vectorized
+
+
+def test_count_vectorizer_fit_from_batches_learns_same_vocabulary_as_fit():
+    for max_features in [None, 3]:
+        param_prefix = "count_vect__"
+        count_vectorizer_params = get_params_from_prefix_dict(param_prefix, LDA_PIPELINE_PARAMS_WORDS)
+        count_vectorizer_params['max_features'] = max_features
+        cv = CountVectorizer(**count_vectorizer_params).fit(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED)
+        batches = iter_batches(iter(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED), 4)
+        cv_from_batches = CountVectorizer(**count_vectorizer_params).fit_from_batches(batches)
+
+        assert cv.vocabulary_ == cv_from_batches.vocabulary_
+        assert (cv.transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED).toarray() ==
+                cv_from_batches.transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED).toarray()).all()
+
+
+def test_count_vectorizer_extend_vocabulary_adds_new_terms_at_the_end():
+    cv, vectorized = get_vectorized()
+    vocabulary = dict(cv.vocabulary_)
+    new_documents = ['chat dort', 'chien dort', 'chat dort encor', 'chien jou encor']
+
+    new_terms = cv.extend_vocabulary(new_documents)
+    limited_cv, _ = get_vectorized()
+    limited_new_terms = limited_cv.extend_vocabulary(new_documents, max_new_features=1)
+
+    assert new_terms == ['chat dort', 'dort', 'encor']
+    assert limited_new_terms == ['dort']
+    assert {term: i for term, i in cv.vocabulary_.items() if term in vocabulary} == vocabulary
+    assert [cv.vocabulary_[term] for term in new_terms] == list(range(len(vocabulary), len(cv.vocabulary_)))
+    assert (cv.transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED).toarray()[:, :len(vocabulary)] ==
+            vectorized).all()
+    assert cv.inverse_transform([[len(vocabulary)]]) == [['chat dort']]
+
+
+def test_count_vectorizer_fit_transform_deduplicated_is_same_as_fit_transform_on_duplicates():
+    distinct_documents = CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED
+    inverse_indexes = [0, 1, 1, 2, 3, 3, 3, 4, 5, 0]
+    documents = [distinct_documents[i] for i in inverse_indexes]
+    for max_features in [None, 3]:
+        param_prefix = "count_vect__"
+        count_vectorizer_params = get_params_from_prefix_dict(param_prefix, LDA_PIPELINE_PARAMS_WORDS)
+        count_vectorizer_params['max_features'] = max_features
+        cv = CountVectorizer(**count_vectorizer_params)
+        vectorized = cv.fit_transform(documents).toarray()
+        deduplicated_cv = CountVectorizer(**count_vectorizer_params)
+        deduplicated_vectorized = deduplicated_cv.fit_transform_deduplicated(distinct_documents, inverse_indexes)
+
+        assert cv.vocabulary_ == deduplicated_cv.vocabulary_
+        assert deduplicated_vectorized.shape[0] == len(distinct_documents)
+        assert (deduplicated_vectorized[inverse_indexes].toarray() == vectorized).all()
@@ -0,0 +1,35 @@
+import numpy as np
+import scipy.sparse as sp
+
+from artifici_lda.data_utils import get_params_from_prefix_dict, iter_batches
+from artifici_lda.lda_service import LDA_PIPELINE_PARAMS_WORDS
+from artifici_lda.logic.count_vectorizer import CountVectorizer
+from artifici_lda.logic.doc_term_matrix import DocTermMatrixWriter, iter_row_batches, load_doc_term_matrix
+from testing.const_utils import CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED
+
+
+def test_doc_term_matrix_written_by_chunks_is_memory_mapped(tmp_path):
+    count_vect = CountVectorizer(**get_params_from_prefix_dict("count_vect__", LDA_PIPELINE_PARAMS_WORDS))
+    expected = count_vect.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED)
+
+    with DocTermMatrixWriter(str(tmp_path), len(count_vect.vocabulary_)) as writer:
+        for batch in iter_batches(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED, 4):
+            writer.append(count_vect.transform(batch))
+        writer.append(sp.csr_matrix((0, len(count_vect.vocabulary_))))
+    doc_term_matrix = load_doc_term_matrix(str(tmp_path))
+
+    assert isinstance(doc_term_matrix.data, np.memmap) and isinstance(doc_term_matrix.indices, np.memmap)
+    assert doc_term_matrix.dtype == np.float64
+    assert (doc_term_matrix.toarray() == expected.toarray()).all()
+    batches = list(iter_row_batches(doc_term_matrix, 4))
+    assert [batch.shape[0] for batch in batches] == [4, 2]
+    assert (sp.vstack(batches).toarray() == expected.toarray()).all()
+
+
+def test_empty_doc_term_matrix(tmp_path):
+    with DocTermMatrixWriter(str(tmp_path), 3, dtype=np.float32) as writer:
+        writer.append(np.zeros((2, 3)))
+
+    doc_term_matrix = load_doc_term_matrix(str(tmp_path))
+
+    assert doc_term_matrix.shape == (2, 3) and doc_term_matrix.nnz == 0 and doc_term_matrix.dtype == np.float32
@@ -0,0 +1,54 @@
+from artifici_lda.logic.language_routing_stemmer import AUTO, LANGUAGE_MARKERS, LanguageDetectingStopWordsRemover, \
+    LanguageRoutingStemmer
+from artifici_lda.logic.stemmer import ENGLISH, FRENCH, Stemmer
+from testing.const_utils import \
+    CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH, \
+    CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH_LANGUAGES, \
+    TEST_STOPWORDS
+
+
+def test_language_routing_stemmer_detects_languages():
+    router = LanguageRoutingStemmer(language=AUTO, languages=(FRENCH, ENGLISH))
+
+    languages = [router.detect_language(doc) for doc in CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH]
+
+    assert languages == CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH_LANGUAGES
+    assert router.detect_language("Chiens rigolos") == FRENCH  # No marker: the fallback.
+    assert LanguageRoutingStemmer(languages=(ENGLISH, FRENCH)).detect_language("Chiens rigolos") == ENGLISH
+    assert LanguageRoutingStemmer(languages=(ENGLISH, FRENCH)).detect_language("Chiens allumés") == FRENCH
+
+
+def test_language_routing_stemmer_stems_each_document_in_its_language_in_order():
+    router = LanguageRoutingStemmer()
+
+    stemmed = router.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH)
+
+    expected = [
+        Stemmer(language=language).transform([doc])[0]
+        for doc, language in zip(CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH,
+                                 CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH_LANGUAGES)
+    ]
+    assert stemmed == expected
+    assert router.transform(CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH) == expected
+    assert sorted(router.stemmers_.keys()) == [ENGLISH, FRENCH]
+    # The inverse stemming is kept per language, and the most seen original word wins across languages:
+    assert router.stemmers_[ENGLISH].stemmed_word_to_equiv_word_count['run'] == {'running': 3}
+    assert router.inverse_transform([['run', 'chat', 'cat dog']]) == [['running', 'chats', 'cats dogs']]
+
+
+def test_language_routing_stemmer_detects_languages_before_the_stop_words_removal():
+    # The stop words remove every marker of the languages.
+    stopwords = TEST_STOPWORDS + sorted(LANGUAGE_MARKERS[FRENCH] | LANGUAGE_MARKERS[ENGLISH])
+    cleaned = LanguageDetectingStopWordsRemover(stopwords=stopwords).fit_transform(
+        CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH)
+    router = LanguageRoutingStemmer()
+
+    stemmed = router.fit_transform(cleaned)
+
+    assert [language for language, _ in cleaned] == CATS_DOGS_COMMENTS_IN_FRENCH_AND_ENGLISH_LANGUAGES
+    assert all(isinstance(doc, str) and "the" not in doc.split(" ") for _, doc in cleaned)
+    assert stemmed == [
+        Stemmer(language=language).transform([doc])[0] for language, doc in cleaned
+    ]
+    assert router.transform(cleaned) == stemmed
+    assert sorted(router.stemmers_.keys()) == [ENGLISH, FRENCH]
@@ -2,7 +2,7 @@ import numpy as np
 
 from artifici_lda.data_utils import get_params_from_prefix_dict
 from artifici_lda.lda_service import LDA_PIPELINE_PARAMS_WORDS
-from artifici_lda.logic.lda import LDA
+from artifici_lda.logic.lda import COMPONENTS, LDA, PERPLEXITY, get_top_k_indices, split_validation
 from testing.const_utils import \
     CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED_VECTORIZED, \
     CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED_VECTORIZED_LDA_TOPICS_INVERSE_TRANSFORM_1, \
@@ -46,3 +46,68 @@ def get_lda():
     lda = LDA(**lda_params)  # param dict to named arguments.
     clusterized = lda.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED_VECTORIZED)
     return lda, clusterized
+
+
+def test_lda_get_top_k_indices_is_like_a_full_reversed_argsort():
+    rng = np.random.RandomState(0)
+    matrix = rng.randint(0, 5, size=(7, 40)).astype(float)  # Many ties.
+
+    for k in [0, 1, 6, 39, 40, 100]:
+        top_k = get_top_k_indices(matrix, k)
+
+        expected = np.array([row.argsort(kind='stable')[::-1][:k] for row in matrix]).reshape(len(matrix), -1)
+        assert (top_k == expected).all()
+
+
+def test_lda_get_top_words_are_aligned_with_weightings():
+    lda, _ = get_lda()
+
+    top_words_ids, top_words_weightings = lda.get_top_words()
+
+    assert [list(ids) for ids in top_words_ids] == [list(ids) for ids in lda.inverse_transform()]
+    for topic, ids, weightings in zip(lda.components_, top_words_ids, top_words_weightings):
+        assert (topic[ids] == weightings).all()
+        assert (weightings == sorted(topic, reverse=True)[:len(ids)]).all()
+
+
+def test_lda_early_stopping_stops_before_max_iter_and_still_clusters():
+    for metric in [PERPLEXITY, COMPONENTS]:
+        lda, _ = get_lda()
+        lda.set_params(early_stopping=True, early_stopping_metric=metric, validation_every=10)
+        clusterized_comments = lda.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED_VECTORIZED)
+
+        assert lda.n_iter_ < lda.max_iter
+        assert len(lda.validation_scores_) == lda.n_iter_ // 10
+        # The improvement of each check, the last one being below the tolerance since the training stopped early.
+        assert np.isfinite(lda.validation_scores_).all()
+        assert lda.validation_scores_[-1] < lda.early_stopping_tol <= min(lda.validation_scores_[:-1], default=np.inf)
+        assert lda.time_saved_ > 0
+        if metric == COMPONENTS:
+            assert (
+                    (clusterized_comments.argmax(-1) == CATS_DOGS_LABELS_A).all() or
+                    (clusterized_comments.argmax(-1) == CATS_DOGS_LABELS_B).all()
+            ), "Error. Got {}".format(clusterized_comments, clusterized_comments.argmax(-1))
+
+
+def test_split_validation_holds_out_a_random_sample_in_order():
+    X = np.arange(20).reshape(10, 2)
+
+    X_train, X_validation = split_validation(X, 0.3, np.random.RandomState(0))
+
+    assert len(X_train) == 7 and len(X_validation) == 3
+    assert sorted(np.concatenate([X_train, X_validation])[:, 0].tolist()) == X[:, 0].tolist()
+    assert (np.diff(X_train[:, 0]) > 0).all() and (np.diff(X_validation[:, 0]) > 0).all()
+    X_train, X_validation = split_validation(X[:1], 0.3, np.random.RandomState(0))
+    assert (X_train == X[:1]).all() and (X_validation == X[:1]).all()
+
+
+def test_lda_early_stopping_on_perplexity_learns_the_held_out_documents_in_the_end():
+    # Each document has its own word, which only gets its counts in the topics once its document is learnt.
+    n_documents = 20
+    X = np.hstack([np.eye(n_documents, dtype=np.int64) * 5, np.tile([[3, 0], [0, 3]], (n_documents // 2, 1))])
+    lda = LDA(n_components=2, learning_method="batch", max_iter=50, topic_word_prior=0.1, random_state=0,
+              early_stopping=True, early_stopping_metric=PERPLEXITY, validation_fraction=0.2, validation_every=5)
+
+    lda.fit(X)
+
+    assert np.allclose(lda.components_[:, :n_documents].sum(axis=0), 5 + 2 * 0.1)
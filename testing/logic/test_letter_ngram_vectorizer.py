@@ -0,0 +1,26 @@
+import random
+
+from artifici_lda.data_utils import get_params_from_prefix_dict
+from artifici_lda.lda_service import LDA_PIPELINE_PARAMS_LETTERS
+from artifici_lda.logic.count_vectorizer import CountVectorizer
+from artifici_lda.logic.letter_ngram_vectorizer import LetterNGramVectorizer
+from artifici_lda.logic.letter_splitter import LetterSplitter
+from testing.const_utils import CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS
+
+
+def test_letter_ngram_vectorizer_has_same_features_as_letter_splitter_then_count_vectorizer():
+    rng = random.Random(0)
+    alphabet = "abcAB Σς.,'\n_éİ-"
+    documents = CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS + [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 25))) for _ in range(300)]
+
+    letters_params = get_params_from_prefix_dict("count_vect__", LDA_PIPELINE_PARAMS_LETTERS)
+    for count_vectorizer_params in [letters_params, dict(min_df=1, ngram_range=(1, 3), max_features=50)]:
+        cv = CountVectorizer(**count_vectorizer_params)
+        expected = cv.fit_transform(LetterSplitter().transform(documents))
+        lv = LetterNGramVectorizer(**count_vectorizer_params)
+        obtained = lv.fit_transform(documents)
+
+        assert cv.vocabulary_ == lv.vocabulary_
+        assert (expected != obtained).nnz == 0
+        assert (cv.transform(LetterSplitter().transform(documents[:20])) != lv.transform(documents[:20])).nnz == 0
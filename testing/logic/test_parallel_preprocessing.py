@@ -0,0 +1,26 @@
+from artifici_lda.logic.parallel_preprocessing import parallel_fit_transform
+from artifici_lda.logic.stemmer import Stemmer, FRENCH
+from artifici_lda.logic.stop_words_remover import StopWordsRemover
+from testing.const_utils import \
+    CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL, \
+    CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED, \
+    TEST_STOPWORDS
+
+
+def test_parallel_preprocessing_is_same_as_serial_preprocessing():
+    comments = CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL * 3 + ["Les Chats, les CHATS!"]
+    serial_stemmer = Stemmer(language=FRENCH)
+    serial_result = serial_stemmer.fit_transform(StopWordsRemover(stopwords=TEST_STOPWORDS).fit_transform(comments))
+
+    steps = [('stopwords', StopWordsRemover(stopwords=TEST_STOPWORDS)), ('stemmer', Stemmer(language=FRENCH))]
+    parallel_result, fitted_steps = parallel_fit_transform(steps, comments, n_jobs=3)
+    parallel_stemmer = dict(fitted_steps)['stemmer']
+
+    assert serial_result == parallel_result
+    assert parallel_result[:len(CATS_DOGS_COMMENTS_IN_FRENCH_NORMAL)] == \
+        CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED
+    # Same counts, and same insertion order (which breaks ties when inverse stemming):
+    assert list(serial_stemmer.stemmed_word_to_equiv_word_count.items()) == \
+        list(parallel_stemmer.stemmed_word_to_equiv_word_count.items())
+    for stemmed_word in serial_stemmer.stemmed_word_to_equiv_word_count:
+        assert serial_stemmer.find_orig_word(stemmed_word) == parallel_stemmer.find_orig_word(stemmed_word)
@@ -1,4 +1,7 @@
-from artifici_lda.logic.stemmer import Stemmer, FRENCH
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from artifici_lda.logic.stemmer import Stemmer, FRENCH, get_snowball_stemmer, split_words, stem_word
 from testing.const_utils import \
     CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS, \
     CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED, \
@@ -43,3 +46,52 @@ def test_stopwords_inverse_transform_topics():
     print(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_LDA_TOPICS_INVERSE_TRANSFORM_3)
 
     assert CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_LDA_TOPICS_INVERSE_TRANSFORM_3 == inverted_undone
+
+
+def test_stemmer_fit_transform_is_same_as_fit_then_transform():
+    st_a = Stemmer(language=FRENCH)
+    st_b = Stemmer(language=FRENCH)
+
+    result_a = st_a.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS)
+    result_b = st_b.fit(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS).transform(
+        CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS)
+
+    assert CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS_STEMMED == result_a == result_b
+    assert st_a.stemmed_word_to_equiv_word_count == st_b.stemmed_word_to_equiv_word_count
+
+
+def test_pruned_stemmer_is_read_from_its_table_without_rebuilding_the_dict_of_dicts():
+    st = Stemmer(language=FRENCH)
+    st.fit(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS)
+    stemmed_words = set(list(st.stemmed_word_to_equiv_word_count)[:5])
+    st.prune_inverse_stemming(stemmed_words)
+
+    with mock.patch.object(type(st.inverse_stemming_table), 'to_equiv_word_counts') as to_equiv_word_counts:
+        equiv_word_counts = list(st.iter_equiv_word_counts())
+
+    assert not to_equiv_word_counts.called
+    assert [stemmed_word for stemmed_word, _ in equiv_word_counts] == list(st.inverse_stemming_table.stem_ids)
+    assert dict(equiv_word_counts) == st.get_equiv_word_counts()
+    assert set(dict(equiv_word_counts)) == stemmed_words
+
+
+def test_stemmer_reuses_cached_stems():
+    st = Stemmer(language=FRENCH)
+    st.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS)
+    hits_before = stem_word.cache_info().hits
+
+    st.fit_transform(CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS)
+
+    n_words = sum(len(split_words(doc)) for doc in CATS_DOGS_COMMENTS_IN_FRENCH_WITHOUT_STOPWORDS)
+    assert stem_word.cache_info().hits - hits_before == n_words
+    assert get_snowball_stemmer(FRENCH) is get_snowball_stemmer(FRENCH)
+
+
+def test_each_thread_gets_its_own_snowball_stemmers():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        thread_stemmers = list(executor.map(lambda _: get_snowball_stemmer(FRENCH), range(2)))
+        stemmed_words = list(executor.map(
+            lambda word: get_snowball_stemmer(FRENCH).stemWord(word), ["chats", "chiens"] * 100))
+
+    assert get_snowball_stemmer(FRENCH) not in thread_stemmers
+    assert stemmed_words == ["chat", "chien"] * 100
@@ -1,3 +1,6 @@
+import random
+
+from artifici_lda.logic.stop_words_engine import CompiledStopWords, remove_stopwords_char_by_char
 from artifici_lda.logic.stop_words_remover import StopWordsRemover
 from testing.const_utils import \
     TEST_STOPWORDS, \
@@ -27,3 +30,27 @@ def test_stopwords_inverse_transform():
     print(result)
     print(inverted_undone)
     assert result == inverted_undone  # TODO: behavior is unchanged. Could be improved?
+
+
+def test_stopwords_removal_is_identical_to_char_by_char_removal():
+    compiled_stopwords = CompiledStopWords(TEST_STOPWORDS + ["très", "œuf", "l'", ""])
+    tricky_texts = [
+        "",
+        "le",
+        "Le chat, le chien... et LA souris!",
+        "l'ours d'la forêt est très gros",
+        "Les  chats   sont   super ",
+        "Un œuf, des Œufs; ﬁn, ﬀ, ﬆ, ß.",
+        "Tres\ttres\nTrès’très‘la la",
+        "the cat is on the mat, donc ya pis yer",
+        "été à la plage 123 le 4le le4",
+    ]
+    ascii_alphabet = "abcLeSsT' .,-!?\n1"
+    alphabet = ascii_alphabet + "àéÉœﬁ’‘"
+    rng = random.Random(42)
+    for chars in [ascii_alphabet, alphabet]:
+        tricky_texts += ["".join(rng.choice(chars) for _ in range(rng.randint(0, 40))) for _ in range(500)]
+
+    for text in tricky_texts:
+        expected = remove_stopwords_char_by_char(text, compiled_stopwords.safe_stopwords)
+        assert compiled_stopwords.remove_from_string(text) == expected, text